@@ -20,5 +20,14 @@ TRUST_CONNECTION="yes"
 GIT_URL=os.getenv("GIT_URL")
 GIT_PORT=os.getenv("GIT_PORT")
 GIT_PREFIX=os.getenv("GIT_PREFIX")
+GITEA_REPO_ROOT=os.getenv("GITEA_REPO_ROOT")
+GITEA_TOKEN=os.getenv("GITEA_TOKEN")
+GITEA_DB_TYPE=os.getenv("GITEA_DB_TYPE", "mssql")
+GITEA_DB_HOST=os.getenv("GITEA_DB_HOST")
+GITEA_DB_PORT=os.getenv("GITEA_DB_PORT")
+GITEA_DB=os.getenv("GITEA_DB", "gitea")
+GITEA_DB_USER=os.getenv("GITEA_DB_USER")
+GITEA_DB_PASSWORD=os.getenv("GITEA_DB_PASSWORD")
+GITEA_DB_SSL=os.getenv("GITEA_DB_SSL", "").lower() == "yes"
 
 
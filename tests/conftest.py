@@ -0,0 +1,51 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Передает запросы функции app(method, path, headers, body) -> (status, headers, body)"""
+    
+    app = None
+    
+    def _handle(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        status, headers, payload = self.app(self.command, self.path, self.headers, body)
+        
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode("utf-8")
+            headers = {"Content-Type": "application/json", **headers}
+        
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    do_GET = do_POST = do_PATCH = do_DELETE = _handle
+    
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def http_stub():
+    """Запускает локальный HTTP-сервер, отвечающий функцией app; возвращает его адрес"""
+    servers = []
+    
+    def start(app):
+        handler = type("Handler", (StubHandler,), {"app": staticmethod(app)})
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+    
+    yield start
+    
+    for server in servers:
+        server.shutdown()
+        server.server_close()
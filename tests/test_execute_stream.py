@@ -0,0 +1,96 @@
+import sqlite3
+
+import pytest
+
+from utils.db_utils.base import DBConnection
+
+
+class SQLiteConnection(DBConnection):
+    """Подключение к SQLite в памяти для проверки общих методов DBConnection"""
+    
+    def __init__(self, owns_transaction=False):
+        super().__init__()
+        self.owns_transaction = owns_transaction
+        self.commits = 0
+    
+    def connect(self):
+        self.connection = sqlite3.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        self.cursor.execute("CREATE TABLE items (id INTEGER, name TEXT)")
+        self.cursor.executemany("INSERT INTO items VALUES (?, ?)", [(i, f"item-{i}") for i in range(1, 8)])
+        self.connection.commit()
+        return True
+    
+    def _starts_transaction(self):
+        return self.owns_transaction
+
+
+class CountingConnection:
+    """Обертка соединения SQLite, считающая commit"""
+    
+    def __init__(self, connection, owner):
+        self._connection = connection
+        self._owner = owner
+    
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+    
+    def commit(self):
+        self._owner.commits += 1
+        self._connection.commit()
+
+
+@pytest.fixture
+def db():
+    connection = SQLiteConnection()
+    connection.connect()
+    connection.connection = CountingConnection(connection.connection, connection)
+    yield connection
+    connection.disconnect()
+
+
+def test_stream_yields_batches_of_tuples(db):
+    batches = list(db.execute_stream("SELECT id, name FROM items ORDER BY id", batch_size=3))
+    
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert batches[0][0] == (1, "item-1")
+    assert all(isinstance(row, tuple) for batch in batches for row in batch)
+
+
+def test_stream_passes_parameters(db):
+    batches = list(db.execute_stream("SELECT id FROM items WHERE id > ?", [5], batch_size=10))
+    
+    assert batches == [[(6,), (7,)]]
+
+
+def test_stream_of_empty_result_yields_nothing(db):
+    assert list(db.execute_stream("SELECT id FROM items WHERE id > 100")) == []
+
+
+def test_stream_leaves_foreign_transaction_open(db):
+    list(db.execute_stream("SELECT id FROM items"))
+    
+    assert db.commits == 0
+
+
+def test_stream_ends_transaction_it_started(db):
+    db.owns_transaction = True
+    
+    list(db.execute_stream("SELECT id FROM items", batch_size=2))
+    
+    assert db.commits == 1
+
+
+def test_abandoned_stream_still_ends_its_transaction(db):
+    db.owns_transaction = True
+    
+    stream = db.execute_stream("SELECT id FROM items", batch_size=2)
+    next(stream)
+    stream.close()
+    
+    assert db.commits == 1
+
+
+def test_stream_requires_connection():
+    with pytest.raises(ConnectionError):
+        next(SQLiteConnection().execute_stream("SELECT 1"))
@@ -0,0 +1,435 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+from git import Actor, Repo
+
+from utils.git_utils.fs_utils import remove_tree
+from utils.git_utils.git_utils import GitManager, MANIFEST_FILE
+
+
+def paged_api(items, max_page_size=50, total_header=True, fail_page=None, requested=None):
+    """Страницы списка Gitea: сервер урезает limit до max_page_size (MAX_RESPONSE_ITEMS)"""
+    def app(method, path, headers, body):
+        query = parse_qs(urlparse(path).query)
+        page = int(query["page"][0])
+        limit = min(int(query["limit"][0]), max_page_size)
+        if requested is not None:
+            requested.append(page)
+        if page == fail_page:
+            return 500, {}, {"message": "boom"}
+        response_headers = {"X-Total-Count": str(len(items))} if total_header else {}
+        return 200, response_headers, items[(page - 1) * limit:page * limit]
+    return app
+
+
+def discovered_labs(count):
+    return lambda *args: {1: (True, [
+        {"name": f"lab{n}", "size": n, "updated": "2026-01-01", "branch": "main"} for n in range(count)
+    ])}
+
+
+def track_concurrency(manager, monkeypatch):
+    """Подменяет clone_repository и возвращает список с максимальным числом одновременных клонирований"""
+    lock = threading.Lock()
+    state = {"active": 0}
+    peak = [0]
+    
+    def clone_repository(user_num, repo_name, repo_path, **options):
+        with lock:
+            state["active"] += 1
+            peak[0] = max(peak[0], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return True, "ok"
+    
+    monkeypatch.setattr(manager, "clone_repository", clone_repository)
+    return peak
+
+
+def test_host_limit_follows_worker_count_by_default(tmp_path, monkeypatch):
+    manager = GitManager("http://gitea:3000", "224-user-")
+    monkeypatch.setattr(manager, "discover_repositories", discovered_labs(8))
+    peak = track_concurrency(manager, monkeypatch)
+    
+    results = manager.batch_clone_user_repositories(1, 1, str(tmp_path), max_workers=8)
+    
+    assert all(result["success"] for result in results)
+    assert peak[0] > 4
+
+
+def test_explicit_host_limit_caps_concurrency(tmp_path, monkeypatch):
+    manager = GitManager("http://gitea:3000", "224-user-")
+    monkeypatch.setattr(manager, "discover_repositories", discovered_labs(8))
+    peak = track_concurrency(manager, monkeypatch)
+    
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path), max_workers=8, per_host_limit=2)
+    
+    assert peak[0] == 2
+
+
+def test_pages_are_fetched_by_total_count(http_stub):
+    requested = []
+    url = http_stub(paged_api(list(range(120)), requested=requested))
+    
+    success, items = GitManager(url, "224-user-", requests.Session())._get_all_pages(f"{url}/api/v1/repos")
+    
+    assert success
+    assert items == list(range(120))
+    assert sorted(requested) == [1, 2, 3]
+
+
+def test_short_server_pages_without_total_count_are_all_read(http_stub):
+    # Регрессия: страница короче API_PAGE_LIMIT не должна считаться последней
+    url = http_stub(paged_api(list(range(70)), max_page_size=30, total_header=False))
+    
+    success, items = GitManager(url, "224-user-", requests.Session())._get_all_pages(f"{url}/api/v1/repos")
+    
+    assert success
+    assert items == list(range(70))
+
+
+def test_short_server_pages_with_total_count_are_all_read(http_stub):
+    url = http_stub(paged_api(list(range(70)), max_page_size=30))
+    
+    success, items = GitManager(url, "224-user-", requests.Session())._get_all_pages(f"{url}/api/v1/repos")
+    
+    assert success
+    assert items == list(range(70))
+
+
+def test_empty_list_needs_one_request(http_stub):
+    requested = []
+    url = http_stub(paged_api([], total_header=False, requested=requested))
+    
+    assert GitManager(url, "224-user-", requests.Session())._get_all_pages(f"{url}/api/v1/repos") == (True, [])
+    assert requested == [1]
+
+
+def test_failed_page_is_reported(http_stub):
+    url = http_stub(paged_api(list(range(120)), fail_page=2))
+    
+    success, error = GitManager(url, "224-user-", requests.Session())._get_all_pages(f"{url}/api/v1/repos")
+    
+    assert not success
+    assert error.startswith("500")
+
+
+def gitea_api(search=None, users=None, search_status=200):
+    """Поиск репозиториев и списки репозиториев пользователей"""
+    requested = []
+    
+    def app(method, path, headers, body):
+        parsed = urlparse(path)
+        requested.append(parsed.path)
+        if parsed.path == "/api/v1/repos/search":
+            if search_status != 200:
+                return search_status, {}, {"message": "search disabled"}
+            data = search or []
+            return 200, {"X-Total-Count": str(len(data))}, {"ok": True, "data": data}
+        user = parsed.path.split("/")[4]
+        repos = [{"name": name} for name in (users or {}).get(user, [])]
+        return 200, {"X-Total-Count": str(len(repos))}, repos
+    
+    return app, requested
+
+
+def found(owner, name, size=1):
+    return {"owner": {"login": owner}, "name": name, "size": size,
+            "updated_at": "2026-01-01T00:00:00Z", "default_branch": "main"}
+
+
+def test_search_groups_repositories_by_user(http_stub):
+    app, requested = gitea_api(search=[
+        found("224-User-2", "lab2"), found("224-user-2", "lab1"), found("224-user-1", "lab1"),
+        found("224-user-9", "lab1"),
+    ])
+    url = http_stub(app)
+    
+    success, repositories = GitManager(url, "224-user-", requests.Session()).search_cabinet_repositories(1, 3)
+    
+    assert success
+    assert [repo["name"] for repo in repositories[2]] == ["lab1", "lab2"]
+    assert repositories[1][0] == {"name": "lab1", "size": 1, "updated": "2026-01-01T00:00:00Z", "branch": "main"}
+    assert repositories[3] == []
+    assert 9 not in repositories
+    assert requested == ["/api/v1/repos/search"]
+
+
+def test_discovery_falls_back_to_users_when_search_finds_nothing(http_stub):
+    app, requested = gitea_api(users={"224-user-1": ["lab1"], "224-user-2": []})
+    url = http_stub(app)
+    
+    discovered = GitManager(url, "224-user-", requests.Session()).discover_repositories(1, 2)
+    
+    assert discovered[1] == (True, [{"name": "lab1", "size": None, "updated": None, "branch": None}])
+    assert discovered[2] == (True, [])
+    assert requested == ["/api/v1/repos/search", "/api/v1/users/224-user-1/repos", "/api/v1/users/224-user-2/repos"]
+
+
+def test_discovery_falls_back_to_users_when_search_fails(http_stub):
+    app, _ = gitea_api(users={"224-user-1": ["lab1"]}, search_status=404)
+    url = http_stub(app)
+    manager = GitManager(url, "224-user-", requests.Session())
+    
+    assert not manager.search_cabinet_repositories(1, 1)[0]
+    assert manager.discover_repositories(1, 1)[1][1][0]["name"] == "lab1"
+
+
+def recording_manager(monkeypatch, updated="2026-01-01"):
+    """GitManager с одним репозиторием и подмененным клонированием; возвращает (manager, cloned)"""
+    manager = GitManager("http://gitea:3000", "224-user-")
+    cloned = []
+    
+    def clone_repository(user_num, repo_name, repo_path, **options):
+        os.makedirs(repo_path, exist_ok=True)
+        cloned.append(options)
+        return True, "ok"
+    
+    monkeypatch.setattr(manager, "clone_repository", clone_repository)
+    monkeypatch.setattr(manager, "discover_repositories", lambda *args: {
+        1: (True, [{"name": "lab1", "size": 1, "updated": updated, "branch": "main"}])
+    })
+    return manager, cloned
+
+
+def test_unchanged_repository_is_skipped(tmp_path, monkeypatch):
+    manager, cloned = recording_manager(monkeypatch)
+    options = {"mode": "shallow", "update": True}
+    
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path), skip_unchanged=True, clone_options=options)
+    results = manager.batch_clone_user_repositories(1, 1, str(tmp_path), skip_unchanged=True, clone_options=options)
+    
+    assert len(cloned) == 1
+    assert results[0]["message"] == "Без изменений с прошлого сбора"
+    manifest = json.loads((tmp_path / MANIFEST_FILE).read_text(encoding="utf-8"))
+    assert manifest == {"Компьютер 1/lab1": {"updated": "2026-01-01", "options": {"mode": "shallow"}}}
+
+
+def test_changed_repository_is_collected_again(tmp_path, monkeypatch):
+    manager, cloned = recording_manager(monkeypatch)
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path), skip_unchanged=True)
+    
+    manager, cloned = recording_manager(monkeypatch, updated="2026-02-01")
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path), skip_unchanged=True)
+    
+    assert len(cloned) == 1
+
+
+def test_changed_clone_options_collect_again(tmp_path, monkeypatch):
+    manager, cloned = recording_manager(monkeypatch)
+    
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path), skip_unchanged=True,
+                                          clone_options={"mode": "snapshot"})
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path), skip_unchanged=True,
+                                          clone_options={"mode": "full"})
+    
+    assert [options["mode"] for options in cloned] == ["snapshot", "full"]
+
+
+def test_old_manifest_format_and_missing_directory_collect_again(tmp_path, monkeypatch):
+    (tmp_path / MANIFEST_FILE).write_text(json.dumps({"Компьютер 1/lab1": "2026-01-01"}), encoding="utf-8")
+    manager, cloned = recording_manager(monkeypatch)
+    
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path), skip_unchanged=True)
+    (tmp_path / "Компьютер 1" / "lab1").rmdir()
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path), skip_unchanged=True)
+    
+    assert len(cloned) == 2
+
+
+def test_manifest_is_ignored_without_skip_unchanged(tmp_path, monkeypatch):
+    manager, cloned = recording_manager(monkeypatch)
+    
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path))
+    manager.batch_clone_user_repositories(1, 1, str(tmp_path))
+    
+    assert len(cloned) == 2
+
+
+AUTHOR = Actor("Преподаватель", "teacher@example.com")
+
+
+def commit_files(repo, files, message):
+    for name, content in files.items():
+        path = os.path.join(repo.working_tree_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+    repo.index.add(list(files))
+    return repo.index.commit(message, author=AUTHOR, committer=AUTHOR)
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """
+    Bare-репозиторий 224-user-1/lab1 на "сервере" file:// с тремя коммитами в main
+    и веткой feature; возвращает (manager, рабочая копия преподавателя)
+    """
+    server = tmp_path / "server"
+    work = Repo.init(tmp_path / "work", initial_branch="main")
+    commit_files(work, {"src/main.py": "v1", "docs/readme.md": "docs"}, "Первый коммит")
+    commit_files(work, {"src/main.py": "v2"}, "Второй коммит")
+    commit_files(work, {"src/main.py": "v3"}, "Третий коммит")
+    work.create_head("feature")
+    
+    Repo.init(server / "224-user-1" / "lab1", bare=True, initial_branch="main")
+    work.create_remote("origin", f"file://{server}/224-user-1/lab1")
+    work.git.push("origin", "main", "feature")
+    
+    return GitManager(f"file://{server}/224-user-", "224-user-"), work
+
+
+def branches(repo):
+    return sorted(ref.remote_head for ref in repo.remotes.origin.refs if ref.remote_head != "HEAD")
+
+
+def test_full_clone_keeps_history_and_branches(origin, tmp_path):
+    manager, _ = origin
+    
+    success, message = manager.clone_repository(1, "lab1", str(tmp_path / "full"))
+    clone = Repo(tmp_path / "full")
+    
+    assert success, message
+    assert len(list(clone.iter_commits())) == 3
+    assert branches(clone) == ["feature", "main"]
+
+
+def test_shallow_single_branch_clone(origin, tmp_path):
+    manager, _ = origin
+    
+    success, message = manager.clone_repository(1, "lab1", str(tmp_path / "shallow"), mode="shallow",
+                                                single_branch=True)
+    clone = Repo(tmp_path / "shallow")
+    
+    assert success, message
+    assert len(list(clone.iter_commits())) == 1
+    assert branches(clone) == ["main"]
+    assert (tmp_path / "shallow" / "src" / "main.py").read_text(encoding="utf-8") == "v3"
+
+
+def test_sparse_clone_checks_out_selected_directories(origin, tmp_path):
+    manager, _ = origin
+    
+    success, message = manager.clone_repository(1, "lab1", str(tmp_path / "sparse"), sparse_paths=["src"])
+    
+    assert success, message
+    assert (tmp_path / "sparse" / "src" / "main.py").exists()
+    assert not (tmp_path / "sparse" / "docs").exists()
+
+
+
+def test_existing_directory_is_reported_without_update(origin, tmp_path):
+    manager, _ = origin
+    (tmp_path / "busy").mkdir()
+    (tmp_path / "busy" / "notes.txt").write_text("студент", encoding="utf-8")
+    
+    success, message = manager.clone_repository(1, "lab1", str(tmp_path / "busy"))
+    
+    assert not success
+    assert "уже существует" in message
+
+
+def test_update_fetches_and_discards_local_changes(origin, tmp_path):
+    manager, work = origin
+    target = tmp_path / "lab1"
+    manager.clone_repository(1, "lab1", str(target))
+    (target / "src" / "main.py").write_text("правка студента", encoding="utf-8")
+    (target / "scratch.txt").write_text("лишний файл", encoding="utf-8")
+    commit_files(work, {"src/main.py": "v4"}, "Четвертый коммит")
+    work.git.push("origin", "main")
+    
+    success, message = manager.clone_repository(1, "lab1", str(target), update=True)
+    
+    assert success, message
+    assert message == "Обновлен репозиторий lab1"
+    assert (target / "src" / "main.py").read_text(encoding="utf-8") == "v4"
+    assert not (target / "scratch.txt").exists()
+
+
+def test_update_replaces_directory_that_is_not_a_clone(origin, tmp_path):
+    manager, _ = origin
+    target = tmp_path / "lab1"
+    target.mkdir()
+    (target / "notes.txt").write_text("студент", encoding="utf-8")
+    
+    success, message = manager.clone_repository(1, "lab1", str(target), update=True)
+    
+    assert success, message
+    assert "заменен" in message
+    assert not (target / "notes.txt").exists()
+    assert Repo(target).head.commit.message == "Третий коммит"
+    assert sorted(os.listdir(tmp_path)) == ["lab1", "server", "work"]
+
+
+def test_failed_update_keeps_existing_directory(origin, tmp_path):
+    manager, _ = origin
+    target = tmp_path / "lab2"
+    target.mkdir()
+    (target / "notes.txt").write_text("студент", encoding="utf-8")
+    
+    success, _ = manager.clone_repository(1, "lab2", str(target), update=True)
+    
+    assert not success
+    assert (target / "notes.txt").exists()
+    assert sorted(os.listdir(tmp_path)) == ["lab2", "server", "work"]
+
+
+def test_reference_cache_is_mirrored_then_fetched(origin, tmp_path):
+    manager, work = origin
+    cache_root = tmp_path / "cache"
+    
+    references, errors = manager.prepare_reference_cache(["224-user-1/lab1/"], str(cache_root))
+    mirror = Repo(references["lab1"])
+    
+    assert errors == []
+    assert mirror.bare
+    assert references["lab1"] == str(cache_root / "224-user-1" / "lab1.git")
+    
+    new_commit = commit_files(work, {"src/main.py": "v4"}, "Четвертый коммит")
+    work.git.push("origin", "main")
+    references, errors = manager.prepare_reference_cache(["224-user-1/lab1"], str(cache_root))
+    
+    assert errors == []
+    assert Repo(references["lab1"]).commit("main").hexsha == new_commit.hexsha
+
+
+def test_invalid_and_missing_templates_are_reported(origin, tmp_path):
+    manager, _ = origin
+    
+    references, errors = manager.prepare_reference_cache(["lab1", "224-user-1/missing"], str(tmp_path / "cache"))
+    
+    assert references == {}
+    assert len(errors) == 2
+    assert "владелец/репозиторий" in errors[0]
+    assert errors[1].startswith("Шаблон 224-user-1/missing")
+
+
+def test_clone_borrows_objects_from_reference(origin, tmp_path):
+    manager, _ = origin
+    references, _ = manager.prepare_reference_cache(["224-user-1/lab1"], str(tmp_path / "cache"))
+    
+    success, message = manager.clone_repository(1, "lab1", str(tmp_path / "borrowed"), reference=references["lab1"])
+    alternates = tmp_path / "borrowed" / ".git" / "objects" / "info" / "alternates"
+    
+    assert success, message
+    assert alternates.read_text(encoding="utf-8").strip() == os.path.join(references["lab1"], "objects")
+
+
+def test_dissociated_clone_does_not_depend_on_reference(origin, tmp_path):
+    manager, _ = origin
+    references, _ = manager.prepare_reference_cache(["224-user-1/lab1"], str(tmp_path / "cache"))
+    
+    success, message = manager.clone_repository(1, "lab1", str(tmp_path / "own"), reference=references["lab1"],
+                                                dissociate=True)
+    
+    assert success, message
+    assert not (tmp_path / "own" / ".git" / "objects" / "info" / "alternates").exists()
+    
+    remove_tree(references["lab1"])
+    assert len(list(Repo(tmp_path / "own").iter_commits())) == 3
@@ -0,0 +1,120 @@
+import threading
+from urllib.parse import urlparse
+
+import requests
+
+from utils.git_utils.gitea_provisioning import GiteaProvisioner
+
+
+class FakeGitea:
+    """Минимальный API Gitea для пользователей и репозиториев"""
+    
+    def __init__(self, users=(), repositories=(), fail_user=None):
+        self.users = {user: "old" for user in users}
+        self.repositories = set(repositories)
+        self.fail_user = fail_user
+        self.generated = []
+        self.lock = threading.Lock()
+    
+    def __call__(self, method, path, headers, body):
+        if headers.get("Authorization") != "token admin-token":
+            return 401, {}, {"message": "token is required"}
+        
+        parts = urlparse(path).path.strip("/").split("/")[2:]
+        with self.lock:
+            if method == "GET" and parts[0] == "users":
+                return (200, {}, {"login": parts[1]}) if parts[1] in self.users else (404, {}, {})
+            if method == "POST" and parts == ["admin", "users"]:
+                if body["username"] == self.fail_user:
+                    return 422, {}, {"message": "email already used"}
+                self.users[body["username"]] = body["password"]
+                return 201, {}, {"login": body["username"]}
+            if method == "PATCH" and parts[:2] == ["admin", "users"]:
+                self.users[parts[2]] = body["password"]
+                return 200, {}, {}
+            if method == "GET" and parts[0] == "repos":
+                return (200, {}, {}) if (parts[1], parts[2]) in self.repositories else (404, {}, {})
+            if method == "POST" and parts[:2] == ["admin", "users"] and parts[3] == "repos":
+                self.repositories.add((parts[2], body["name"]))
+                return 201, {}, {}
+            if method == "POST" and parts[0] == "repos" and parts[3] == "generate":
+                self.generated.append((parts[1], parts[2], body["owner"]))
+                self.repositories.add((body["owner"], body["name"]))
+                return 201, {}, {}
+        return 404, {}, {"message": "not found"}
+
+
+def make_provisioner(base_url):
+    return GiteaProvisioner(base_url, "admin-token", max_workers=3, session=requests.Session())
+
+
+def test_creates_missing_users_and_repositories(http_stub):
+    gitea = FakeGitea(users=["224-user-1"], repositories=[("224-user-1", "lab1")])
+    provisioner = make_provisioner(http_stub(gitea))
+    progress = []
+    
+    results = provisioner.provision_users(
+        "224-user-", 1, 3, "pass", ["lab1", "teacher/lab2"],
+        progress_callback=lambda processed, total, result: progress.append((processed, total))
+    )
+    
+    by_user = {result["user"]: result for result in results}
+    assert all(result["success"] for result in results)
+    assert by_user["224-user-1"]["created_user"] is False
+    assert by_user["224-user-1"]["created_repos"] == ["lab2"]
+    assert by_user["224-user-3"]["created_user"] is True
+    assert by_user["224-user-3"]["created_repos"] == ["lab1", "lab2"]
+    assert gitea.users["224-user-1"] == "old"
+    assert sorted(gitea.generated) == [("teacher", "lab2", f"224-user-{n}") for n in (1, 2, 3)]
+    assert [total for _, total in progress] == [3, 3, 3]
+
+
+def test_second_run_changes_nothing(http_stub):
+    gitea = FakeGitea()
+    provisioner = make_provisioner(http_stub(gitea))
+    
+    provisioner.provision_users("224-user-", 1, 2, "pass", ["lab1"])
+    results = provisioner.provision_users("224-user-", 1, 2, "pass", ["lab1"])
+    
+    assert [result["message"] for result in results] == ["Без изменений", "Без изменений"]
+
+
+def test_reset_passwords_updates_existing_users(http_stub):
+    gitea = FakeGitea(users=["224-user-1"])
+    provisioner = make_provisioner(http_stub(gitea))
+    
+    result = provisioner.provision_user("224-user-1", "new", reset_passwords=True)
+    
+    assert result["success"]
+    assert result["message"] == "Пароль сброшен"
+    assert gitea.users["224-user-1"] == "new"
+
+
+def test_api_errors_are_reported_per_user(http_stub):
+    gitea = FakeGitea(fail_user="224-user-2")
+    provisioner = make_provisioner(http_stub(gitea))
+    
+    results = {result["user"]: result for result in provisioner.provision_users("224-user-", 1, 2, "pass")}
+    
+    assert results["224-user-1"]["success"]
+    assert not results["224-user-2"]["success"]
+    assert "422" in results["224-user-2"]["message"]
+    assert "email already used" in results["224-user-2"]["message"]
+
+
+def test_invalid_token_fails(http_stub):
+    provisioner = GiteaProvisioner(http_stub(FakeGitea()), "wrong", session=requests.Session())
+    
+    result = provisioner.provision_user("224-user-1", "pass")
+    
+    assert not result["success"]
+    assert "401" in result["message"]
+
+
+def test_unreachable_server_is_a_request_error():
+    provisioner = GiteaProvisioner("http://127.0.0.1:9", "admin-token", session=requests.Session(), timeout=2)
+    
+    result = provisioner.provision_user("224-user-1", "pass")
+    
+    assert not result["success"]
+    assert result["message"].startswith("Ошибка запроса")
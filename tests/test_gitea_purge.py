@@ -0,0 +1,173 @@
+import sqlite3
+
+import pytest
+
+from utils.db_utils.gitea_schema import SchemaGraph
+from utils.db_utils import gitea_utils
+from utils.db_utils.gitea_utils import GiteaDBCleaner
+
+
+REFERENCES = [
+    ("issue", "repo_id", "repository", "id"),
+    ("comment", "issue_id", "issue", "id"),
+]
+
+
+class SQLiteCursor:
+    """Курсор SQLite, принимающий маркеры параметров psycopg2 (%s)"""
+    
+    def __init__(self, cursor):
+        self._cursor = cursor
+    
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+    
+    def execute(self, query, params=()):
+        return self._cursor.execute(query.replace("%s", "?"), params)
+
+
+class SQLiteConnection:
+    """Соединение SQLite в роли соединения psycopg2 для очистки Gitea"""
+    
+    def __init__(self, connection):
+        self._connection = connection
+        self.commits = 0
+    
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+    
+    def cursor(self):
+        return SQLiteCursor(self._connection.cursor())
+    
+    def commit(self):
+        self.commits += 1
+        self._connection.commit()
+
+
+@pytest.fixture
+def cleaner():
+    db = sqlite3.connect(":memory:")
+    db.executescript("""
+        CREATE TABLE "user" (id INTEGER PRIMARY KEY, name TEXT, lower_name TEXT);
+        CREATE TABLE repository (id INTEGER PRIMARY KEY, owner_id INTEGER, owner_name TEXT, name TEXT);
+        CREATE TABLE issue (id INTEGER PRIMARY KEY, repo_id INTEGER);
+        CREATE TABLE comment (id INTEGER PRIMARY KEY, issue_id INTEGER);
+        
+        INSERT INTO "user" VALUES (1, '224-user-1', '224-user-1'), (2, '1224-user-1', '1224-user-1');
+        INSERT INTO repository VALUES (10, 1, '224-user-1', 'lab1'), (11, 1, '224-user-1', 'lab2'),
+                                      (20, 2, '1224-user-1', 'lab1');
+        INSERT INTO issue VALUES (100, 10), (101, 11), (200, 20);
+        INSERT INTO comment VALUES (1000, 100), (1001, 100), (2000, 200);
+    """)
+    
+    cleaner = GiteaDBCleaner("postgres")
+    cleaner.connection.connection = SQLiteConnection(db)
+    cleaner.is_connected = True
+    cleaner.get_schema_graph = lambda: SchemaGraph(REFERENCES)
+    yield cleaner
+    db.close()
+
+
+def remaining(cleaner, table):
+    return [row[0] for row in cleaner.connection.connection.execute(f"SELECT id FROM {table} ORDER BY id")]
+
+
+def test_purge_removes_cabinet_repositories_with_dependent_rows(cleaner):
+    success, message, report = cleaner.purge_repositories_by_cabinet("224")
+    
+    assert success, message
+    assert sorted(repo["name"] for repo in report["repositories"]) == ["lab1", "lab2"]
+    assert report["counts"] == {"comment": 2, "issue": 2, "repository": 2}
+    assert remaining(cleaner, "repository") == [20]
+    assert remaining(cleaner, "issue") == [200]
+    assert remaining(cleaner, "comment") == [2000]
+
+
+def test_purge_without_matching_owners_deletes_nothing(cleaner):
+    success, message, report = cleaner.purge_repositories_by_cabinet("225")
+    
+    assert success
+    assert "не найдены" in message
+    assert report["repositories"] == []
+    assert remaining(cleaner, "repository") == [10, 11, 20]
+
+
+def test_purge_is_rolled_back_on_error(cleaner):
+    cleaner.get_schema_graph = lambda: SchemaGraph(REFERENCES + [("missing", "repo_id", "repository", "id")])
+    
+    success, message, report = cleaner.purge_repositories_by_cabinet("224")
+    
+    assert not success
+    assert "изменения отменены" in message
+    assert report["counts"] == {}
+    assert remaining(cleaner, "comment") == [1000, 1001, 2000]
+    assert remaining(cleaner, "repository") == [10, 11, 20]
+
+
+def test_delete_by_cabinet_returns_repository_count(cleaner):
+    success, _, deleted_count = cleaner.delete_repositories_by_cabinet("224")
+    
+    assert success
+    assert deleted_count == 2
+
+
+def test_build_delete_mssql_uses_top_and_output():
+    cleaner = GiteaDBCleaner("mssql")
+    
+    assert cleaner._build_delete("issue", "repo_id IN (1)") == "DELETE FROM [issue] WHERE repo_id IN (1)"
+    assert cleaner._build_delete("repository", "id IN (1)", chunk_size=500, returning=("id", "name")) == (
+        "DELETE TOP (500) FROM [repository] OUTPUT deleted.[id], deleted.[name] WHERE id IN (1)"
+    )
+
+
+def test_build_delete_postgres_chunks_by_ctid():
+    cleaner = GiteaDBCleaner("postgres")
+    
+    assert cleaner._build_delete("issue", "repo_id IN (1)", returning=("id",)) == (
+        'DELETE FROM "issue" WHERE repo_id IN (1) RETURNING "id"'
+    )
+    assert cleaner._build_delete("issue", "repo_id IN (1)", chunk_size=500) == (
+        'DELETE FROM "issue" WHERE ctid = ANY(ARRAY(SELECT ctid FROM "issue" WHERE repo_id IN (1) LIMIT 500))'
+    )
+
+
+def test_rate_limiter_sleeps_until_average_rate_is_met(monkeypatch):
+    now = [100.0]
+    sleeps = []
+    monkeypatch.setattr(gitea_utils.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(gitea_utils.time, "sleep", sleeps.append)
+    
+    limiter = gitea_utils._RateLimiter(rows_per_second=100)
+    limiter.wait(50)
+    now[0] += 2
+    limiter.wait(50)
+    
+    assert sleeps == [0.5]
+    assert gitea_utils._RateLimiter().wait(10_000) is None
+
+
+def test_chunked_purge_throttles_final_partial_chunk(cleaner, monkeypatch):
+    waits = []
+    monkeypatch.setattr(gitea_utils._RateLimiter, "wait", lambda self, rows: waits.append(rows))
+    
+    def build_delete(table, condition, chunk_size=None, returning=None):
+        # В SQLite нет ctid, порция отбирается по rowid
+        query = f'DELETE FROM "{table}" WHERE rowid IN (SELECT rowid FROM "{table}" WHERE {condition} LIMIT {chunk_size})'
+        if returning:
+            query += " RETURNING " + ", ".join(returning)
+        return query
+    
+    cleaner._build_delete = build_delete
+    progress = []
+    
+    success, message, report = cleaner.purge_repositories_by_cabinet(
+        "224", chunk_size=3, rows_per_second=10,
+        progress_callback=lambda table, deleted, total: progress.append((table, deleted, total))
+    )
+    
+    assert success, message
+    assert report["counts"] == {"comment": 2, "issue": 2, "repository": 2}
+    assert progress == [("comment", 2, 2), ("issue", 2, 2), ("repository", 2, 2)]
+    # Последняя неполная порция каждой таблицы тоже проходит через ограничитель
+    assert waits == [2, 2, 2]
+    assert remaining(cleaner, "repository") == [20]
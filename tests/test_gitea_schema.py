@@ -0,0 +1,101 @@
+from utils.db_utils.gitea_schema import SchemaGraph, get_schema_graph, clear_schema_graph_cache
+
+
+def quote(name):
+    return f'"{name}"'
+
+
+REFERENCES = [
+    ("issue", "repo_id", "repository", "id"),
+    ("comment", "issue_id", "issue", "id"),
+    ("reaction", "comment_id", "comment", "id"),
+    ("reaction", "issue_id", "issue", "id"),
+    ("access_token", "uid", "user", "id"),
+]
+
+
+def test_delete_levels_go_from_deepest_table_to_root():
+    graph = SchemaGraph(REFERENCES)
+    
+    assert graph.levels == {"issue": 1, "comment": 2, "reaction": 3}
+    assert graph.delete_levels() == [["reaction"], ["comment"], ["issue"]]
+
+
+def test_unreachable_tables_are_ignored():
+    graph = SchemaGraph(REFERENCES)
+    
+    assert "access_token" not in graph.parents
+    assert "user" not in graph.levels
+
+
+def test_tables_without_mutual_dependencies_share_a_level():
+    graph = SchemaGraph([
+        ("issue", "repo_id", "repository", "id"),
+        ("release", "repo_id", "repository", "id"),
+        ("attachment", "release_id", "release", "id"),
+    ])
+    
+    assert graph.delete_levels() == [["attachment"], ["issue", "release"]]
+
+
+def test_cycle_is_broken_and_reported():
+    graph = SchemaGraph([
+        ("a", "repo_id", "repository", "id"),
+        ("b", "a_id", "a", "id"),
+        ("a", "b_id", "b", "id"),
+    ])
+    
+    assert graph.dropped == [("a", ("b_id", "b", "id"))]
+    assert graph.delete_levels() == [["b"], ["a"]]
+
+
+def test_self_references_are_skipped():
+    graph = SchemaGraph([
+        ("comment", "repo_id", "repository", "id"),
+        ("comment", "parent_id", "comment", "id"),
+    ])
+    
+    assert graph.parents == {"comment": [("repo_id", "repository", "id")]}
+
+
+def test_condition_nests_subqueries_up_to_root_ids():
+    graph = SchemaGraph(REFERENCES)
+    
+    assert graph.condition("issue", "SELECT id FROM ids", quote) == '"repo_id" IN (SELECT id FROM ids)'
+    assert graph.condition("comment", "SELECT id FROM ids", quote) == (
+        '"issue_id" IN (SELECT "id" FROM "issue" WHERE "repo_id" IN (SELECT id FROM ids))'
+    )
+    assert graph.condition("reaction", "SELECT id FROM ids", quote).count(" OR ") == 1
+
+
+def test_discover_uses_conventions_only_for_existing_columns():
+    columns = {
+        "repository": {"id", "owner_id"},
+        "issue": {"id", "repo_id"},
+        "comment": {"id", "issue_id"},
+        "review": {"id", "issue_id"},
+        "notice": {"id", "review_id"},
+        "orphan": {"id", "project_id"},
+    }
+    
+    graph = SchemaGraph.discover(columns, foreign_keys=[("label", "repo_id", "repository", "id")])
+    
+    assert graph.levels == {"issue": 1, "comment": 2, "review": 2, "notice": 3, "label": 1}
+
+
+def test_schema_graph_cache_builds_once_per_key():
+    clear_schema_graph_cache()
+    calls = []
+    
+    def build():
+        calls.append(1)
+        return SchemaGraph(REFERENCES)
+    
+    first = get_schema_graph(("postgres", "host", 5432, "gitea"), build)
+    second = get_schema_graph(("postgres", "host", 5432, "gitea"), build)
+    clear_schema_graph_cache(("postgres", "host", 5432, "gitea"))
+    third = get_schema_graph(("postgres", "host", 5432, "gitea"), build)
+    
+    assert first is second
+    assert third is not first
+    assert len(calls) == 2
@@ -0,0 +1,90 @@
+import os
+
+from utils.git_utils import fs_utils
+from utils.git_utils.gitea_storage import GiteaRepositoryStorage
+
+
+def make_repository(root, owner, name, size=10):
+    path = root / owner / f"{name}.git"
+    (path / "objects").mkdir(parents=True)
+    (path / "objects" / "pack").write_bytes(b"x" * size)
+    (path / "HEAD").write_bytes(b"ref")
+    return path
+
+
+def test_repository_paths_are_lowercase(tmp_path):
+    storage = GiteaRepositoryStorage(str(tmp_path))
+    
+    assert storage.repository_paths("224-User-1", "Lab1") == [
+        os.path.join(str(tmp_path), "224-user-1", "lab1.git"),
+        os.path.join(str(tmp_path), "224-user-1", "lab1.wiki.git"),
+    ]
+
+
+def test_dry_run_measures_without_removing(tmp_path):
+    repository = make_repository(tmp_path, "224-user-1", "lab1", size=10)
+    storage = GiteaRepositoryStorage(str(tmp_path))
+    
+    report = storage.remove([("224-user-1", "lab1"), ("224-user-2", "lab1")], dry_run=True)
+    
+    assert report["found"] == ["224-user-1/lab1"]
+    assert report["missing"] == ["224-user-2/lab1"]
+    assert report["bytes"] == 13
+    assert report["files"] == 2
+    assert repository.exists()
+
+
+def test_remove_deletes_repository_and_wiki(tmp_path):
+    repository = make_repository(tmp_path, "224-user-1", "lab1")
+    wiki = make_repository(tmp_path, "224-user-1", "lab1.wiki")
+    other = make_repository(tmp_path, "224-user-1", "lab2")
+    progress = []
+    storage = GiteaRepositoryStorage(str(tmp_path), max_workers=2)
+    
+    report = storage.remove([("224-user-1", "lab1")], progress_callback=lambda *args: progress.append(args[:2]))
+    
+    assert report["found"] == ["224-user-1/lab1"]
+    assert not repository.exists()
+    assert not wiki.exists()
+    assert other.exists()
+    assert progress == [(1, 1)]
+
+
+def test_read_only_files_are_removed(tmp_path):
+    repository = make_repository(tmp_path, "224-user-1", "lab1")
+    os.chmod(repository / "objects" / "pack", 0o400)
+    
+    report = GiteaRepositoryStorage(str(tmp_path)).remove([("224-user-1", "lab1")])
+    
+    assert report["errors"] == []
+    assert not repository.exists()
+
+
+def test_remove_tree_retries_after_clearing_read_only(tmp_path, monkeypatch):
+    target = tmp_path / "pack"
+    target.write_bytes(b"x")
+    os.chmod(target, 0o400)
+    failed = []
+    
+    def remove_once_writable(path):
+        failed.append(path)
+        assert os.stat(path).st_mode & 0o200
+        os.remove(path)
+    
+    fs_utils._make_writable(remove_once_writable, str(target), None)
+    fs_utils.remove_tree(str(tmp_path / "missing"))
+    
+    assert failed == [str(target)]
+    assert not target.exists()
+
+
+def test_paths_outside_root_are_rejected(tmp_path):
+    root = tmp_path / "repositories"
+    root.mkdir()
+    outside = make_repository(tmp_path, "victim", "data")
+    
+    report = GiteaRepositoryStorage(str(root)).remove([("..", "victim/data")])
+    
+    assert len(report["errors"]) == 1
+    assert report["found"] == []
+    assert outside.exists()
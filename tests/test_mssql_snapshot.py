@@ -0,0 +1,74 @@
+from utils.db_utils.mssql_utils import MSSQLCleaner
+from utils.db_utils.result import QueryResult
+
+
+class FakeCursor:
+    def __init__(self, executed):
+        self.executed = executed
+    
+    def execute(self, statement):
+        self.executed.append(statement)
+    
+    def nextset(self):
+        return False
+
+
+class FakeODBCConnection:
+    def __init__(self):
+        self.autocommit = False
+        self.executed = []
+    
+    def cursor(self):
+        return FakeCursor(self.executed)
+
+
+class FakeMSSQLConnection:
+    """MSSQLConnection, отвечающий на запрос списка снимков"""
+    
+    def __init__(self, snapshots):
+        self.snapshots = snapshots
+        self.connection = FakeODBCConnection()
+    
+    def execute_query(self, query, params=None):
+        if query.startswith("SELECT name FROM sys.databases"):
+            return QueryResult(["name"], [(name,) for name in self.snapshots])
+        return None
+
+
+def make_cleaner(snapshots):
+    cleaner = MSSQLCleaner(FakeMSSQLConnection(snapshots))
+    cleaner.is_connected = True
+    return cleaner
+
+
+def test_restore_runs_as_one_batch():
+    cleaner = make_cleaner(["user224-1_snapshot"])
+    
+    assert cleaner.restore_from_snapshot("user224-1")
+    
+    executed = cleaner.connection.connection.executed
+    assert len(executed) == 1
+    batch = executed[0]
+    assert batch.index("SET SINGLE_USER") < batch.index("FROM DATABASE_SNAPSHOT = N'user224-1_snapshot'")
+    assert batch.rstrip().endswith("ALTER DATABASE [user224-1] SET MULTI_USER;")
+    assert not cleaner.connection.connection.autocommit
+
+
+def test_restore_escapes_names():
+    cleaner = make_cleaner(["it's]_snapshot"])
+    
+    assert cleaner.restore_from_snapshot("db]x")
+    
+    batch = cleaner.connection.connection.executed[0]
+    assert "[db]]x]" in batch
+    assert "N'it''s]_snapshot'" in batch
+
+
+def test_restore_requires_exactly_one_snapshot():
+    cleaner = make_cleaner([])
+    assert not cleaner.restore_from_snapshot("user224-1")
+    assert "не найден" in cleaner.last_error
+    
+    cleaner = make_cleaner(["a", "b"])
+    assert not cleaner.restore_from_snapshot("user224-1")
+    assert cleaner.connection.connection.executed == []
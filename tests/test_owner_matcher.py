@@ -0,0 +1,52 @@
+from utils.db_utils.owner_matcher import (
+    PrefixOwnerMatcher, NamesOwnerMatcher, RangeOwnerMatcher, SubstringOwnerMatcher, cabinet_owner_matcher
+)
+
+
+def test_prefix_uses_driver_placeholder_and_lowercases():
+    assert PrefixOwnerMatcher("224-").condition("postgres") == ("u.lower_name LIKE %s ESCAPE '!'", ["224-%"])
+    assert PrefixOwnerMatcher("ABC-").condition("mssql", alias="o") == ("o.lower_name LIKE ? ESCAPE '!'", ["abc-%"])
+
+
+def test_prefix_escapes_like_wildcards():
+    _, params = PrefixOwnerMatcher("2_4%!").condition("postgres")
+    
+    assert params == ["2!_4!%!!%"]
+
+
+def test_prefix_escapes_bracket_only_for_mssql():
+    assert PrefixOwnerMatcher("a[b").condition("mssql")[1] == ["a![b%"]
+    assert PrefixOwnerMatcher("a[b").condition("postgres")[1] == ["a[b%"]
+
+
+def test_names_matcher_deduplicates_and_sorts():
+    sql, params = NamesOwnerMatcher(["224-User-2", "224-user-1", "224-USER-2"]).condition("mssql")
+    
+    assert sql == "u.lower_name IN (?, ?)"
+    assert params == ["224-user-1", "224-user-2"]
+
+
+def test_names_matcher_without_names_matches_nothing():
+    assert NamesOwnerMatcher([]).condition("postgres") == ("1 = 0", [])
+
+
+def test_names_matcher_from_range():
+    matcher = NamesOwnerMatcher.from_range("224-user-{n}", 1, 3)
+    
+    assert matcher.names == ["224-user-1", "224-user-2", "224-user-3"]
+
+
+def test_range_matcher():
+    assert RangeOwnerMatcher("224-A", "224-Z").condition("postgres") == (
+        "u.lower_name BETWEEN %s AND %s", ["224-a", "224-z"]
+    )
+
+
+def test_cabinet_owner_matcher():
+    strict = cabinet_owner_matcher("224")
+    loose = cabinet_owner_matcher(224, loose=True)
+    
+    assert isinstance(strict, PrefixOwnerMatcher) and strict.prefix == "224-"
+    assert isinstance(loose, SubstringOwnerMatcher)
+    assert loose.condition("mssql") == ("u.name LIKE ?", ["%224%"])
+    assert loose.condition("postgres") == ("u.name ~ %s", ["224"])
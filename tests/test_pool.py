@@ -0,0 +1,165 @@
+import threading
+
+import pytest
+
+from utils.db_utils.pool import ConnectionPool, make_pool_key
+
+
+class FakeConnection:
+    def __init__(self, key):
+        self.key = key
+        self.closed = False
+        self.resets = 0
+    
+    def close(self):
+        self.closed = True
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.opened = []
+        self.alive = True
+    
+    def _open(self, key, password):
+        connection = FakeConnection(key)
+        self.opened.append(connection)
+        return connection
+    
+    def _is_alive(self, connection):
+        return self.alive and not connection.closed
+    
+    def _reset(self, connection):
+        connection.resets += 1
+
+
+def key(database="db", password="secret"):
+    return make_pool_key("localhost", "5432", database, "postgres", False, password)
+
+
+def test_released_connection_is_reused():
+    pool = FakePool(max_size=2)
+    
+    first = pool.acquire(key(), "secret")
+    pool.release(first)
+    second = pool.acquire(key(), "secret")
+    
+    assert second is first
+    assert first.resets == 1
+    assert len(pool.opened) == 1
+
+
+def test_acquire_times_out_when_key_is_exhausted():
+    pool = FakePool(max_size=1, acquire_timeout=0.05)
+    pool.acquire(key(), "secret")
+    
+    with pytest.raises(ConnectionError):
+        pool.acquire(key(), "secret")
+
+
+def test_limit_is_per_key():
+    pool = FakePool(max_size=1, acquire_timeout=0.05)
+    
+    first = pool.acquire(key("db1"), "secret")
+    second = pool.acquire(key("db2"), "secret")
+    
+    assert first is not second
+
+
+def test_waiting_acquire_gets_released_connection():
+    pool = FakePool(max_size=1, acquire_timeout=5)
+    first = pool.acquire(key(), "secret")
+    acquired = []
+    
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(key(), "secret")))
+    waiter.start()
+    pool.release(first)
+    waiter.join(timeout=5)
+    
+    assert acquired == [first]
+
+
+def test_password_must_match_key():
+    pool = FakePool()
+    
+    with pytest.raises(ValueError):
+        pool.acquire(key(password="secret"), "wrong")
+
+
+def test_different_password_does_not_reuse_idle_connection():
+    pool = FakePool()
+    
+    first = pool.acquire(key(password="secret"), "secret")
+    pool.release(first)
+    second = pool.acquire(key(password="other"), "other")
+    
+    assert second is not first
+    assert key(password="secret") != key(password="other")
+
+
+def test_dead_idle_connection_is_replaced():
+    pool = FakePool(health_check_interval=0)
+    
+    first = pool.acquire(key(), "secret")
+    pool.release(first)
+    pool.alive = False
+    second = pool.acquire(key(), "secret")
+    
+    assert second is not first
+    assert first.closed
+
+
+def test_discard_database_closes_idle_connections():
+    pool = FakePool()
+    
+    connection = pool.acquire(key("db1"), "secret")
+    pool.release(connection)
+    pool.discard_database("db1")
+    
+    assert connection.closed
+    assert pool.acquire(key("db1"), "secret") is not connection
+
+
+def test_warm_opens_min_size_connections():
+    pool = FakePool(min_size=3, max_size=5)
+    
+    pool.warm(key(), "secret")
+    
+    assert len(pool.opened) == 3
+
+
+def test_max_size_must_be_positive():
+    with pytest.raises(ValueError):
+        FakePool(max_size=0)
+
+
+def test_available_counts_free_slots_per_key():
+    pool = FakePool(max_size=3)
+    
+    connection = pool.acquire(key(), "secret")
+    
+    assert pool.available(key()) == 2
+    assert pool.available(key("other")) == 3
+    
+    pool.release(connection)
+    assert pool.available(key()) == 3
+
+
+def test_bulk_postgres_workers_fit_in_pool():
+    pytest.importorskip("psycopg2")
+    from utils.db_utils.postgres_utils import PostgresCleaner, PostgresConnection
+    
+    pool = FakePool(max_size=4)
+    connection = PostgresConnection(pool)
+    connection.pool_key = key("postgres")
+    admin = pool.acquire(connection.pool_key, "secret")
+    cleaner = PostgresCleaner(connection)
+    
+    assert cleaner._worker_limit(50) == 3
+    assert cleaner._worker_limit(2) == 2
+    
+    tab_lease = pool.acquire(connection.pool_key, "secret")
+    assert cleaner._worker_limit(50) == 2
+    
+    pool.release(tab_lease)
+    pool.release(admin)
@@ -0,0 +1,49 @@
+import pytest
+
+from utils.db_utils.result import QueryResult
+
+
+@pytest.fixture
+def result():
+    return QueryResult(["id", "name"], [(1, "user224-1"), (2, "user224-2")])
+
+
+def test_sequence_protocol(result):
+    assert len(result) == 2
+    assert list(result) == [(1, "user224-1"), (2, "user224-2")]
+    assert result[1] == (2, "user224-2")
+    assert not result.empty
+    assert QueryResult(["id"], []).empty
+
+
+def test_column_by_name_or_position(result):
+    assert result.column("name") == ["user224-1", "user224-2"]
+    assert result.column(0) == [1, 2]
+
+
+def test_unknown_column_raises(result):
+    with pytest.raises(KeyError):
+        result.column("missing")
+
+
+def test_first(result):
+    assert result.first() == 1
+    assert result.first("name") == "user224-1"
+    assert QueryResult(["id"], []).first(default="none") == "none"
+
+
+def test_records(result):
+    assert list(result.records()) == [{"id": 1, "name": "user224-1"}, {"id": 2, "name": "user224-2"}]
+
+
+def test_to_dataframe(result):
+    pytest.importorskip("pandas")
+    
+    frame = result.to_dataframe()
+    
+    assert list(frame.columns) == ["id", "name"]
+    assert frame["name"].tolist() == ["user224-1", "user224-2"]
+
+
+def test_repr_does_not_dump_rows(result):
+    assert repr(result) == "QueryResult(columns=('id', 'name'), rows=2)"
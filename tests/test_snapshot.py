@@ -0,0 +1,171 @@
+import io
+import os
+import tarfile
+
+import pytest
+import requests
+
+from utils.git_utils.git_utils import GitManager, extract_archive
+
+
+def make_archive(entries, compression="gz"):
+    """entries: список (имя, содержимое bytes | None для каталога | ("link", цель))"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=f"w:{compression}") as archive:
+        for name, content in entries:
+            info = tarfile.TarInfo(name)
+            if content is None:
+                info.type = tarfile.DIRTYPE
+                archive.addfile(info)
+            elif isinstance(content, tuple):
+                info.type = tarfile.SYMTYPE
+                info.linkname = content[1]
+                archive.addfile(info)
+            else:
+                info.size = len(content)
+                info.mode = 0o755 if name.endswith(".sh") else 0o644
+                archive.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+class Stream(io.RawIOBase):
+    """Файловый объект без перемотки, как тело HTTP-ответа"""
+    
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        chunk = self.data.read(len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+REPOSITORY = [
+    ("lab1/", None),
+    ("lab1/README.md", b"readme"),
+    ("lab1/src/", None),
+    ("lab1/src/main.py", b"print(1)"),
+    ("lab1/run.sh", b"#!/bin/sh"),
+    ("lab1/docs/guide.md", b"guide"),
+]
+
+
+def test_extracts_stream_without_top_directory(tmp_path):
+    files = extract_archive(Stream(make_archive(REPOSITORY)), str(tmp_path / "out"))
+    
+    assert files == 4
+    assert (tmp_path / "out" / "README.md").read_bytes() == b"readme"
+    assert (tmp_path / "out" / "src" / "main.py").read_bytes() == b"print(1)"
+    assert os.access(tmp_path / "out" / "run.sh", os.X_OK)
+
+
+def test_uncompressed_archive_is_detected(tmp_path):
+    assert extract_archive(Stream(make_archive(REPOSITORY, compression="")), str(tmp_path / "out")) == 4
+
+
+def test_sparse_paths_limit_extraction(tmp_path):
+    files = extract_archive(Stream(make_archive(REPOSITORY)), str(tmp_path / "out"), ["src", "docs/"])
+    
+    assert files == 2
+    assert sorted(os.listdir(tmp_path / "out")) == ["docs", "src"]
+
+
+@pytest.mark.parametrize("name", ["lab1/../../evil", "/etc/evil", "lab1/src/../../../evil", "lab1\\..\\..\\evil"])
+def test_path_traversal_is_rejected(tmp_path, name):
+    archive = make_archive([("lab1/ok", b"ok"), (name, b"evil")])
+    
+    with pytest.raises(ValueError):
+        extract_archive(Stream(archive), str(tmp_path / "out"))
+    
+    assert not (tmp_path / "evil").exists()
+
+
+def test_symlinks_are_skipped(tmp_path):
+    archive = make_archive([("lab1/file", b"data"), ("lab1/link", ("link", "/etc/passwd"))])
+    
+    assert extract_archive(Stream(archive), str(tmp_path / "out")) == 1
+    assert not os.path.lexists(tmp_path / "out" / "link")
+
+
+@pytest.fixture
+def gitea(http_stub):
+    """Локальный сервер с архивом lab1 пользователя 224-user-1 (ветка main)"""
+    requests_log = []
+    archive = make_archive(REPOSITORY)
+    
+    def app(method, path, headers, body):
+        requests_log.append(path)
+        if path == "/api/v1/repos/224-user-1/lab1":
+            return 200, {}, {"name": "lab1", "default_branch": "main"}
+        if path == "/224-user-1/lab1/archive/main.tar.gz":
+            return 200, {"Content-Type": "application/gzip"}, archive
+        return 404, {}, {"message": "not found"}
+    
+    base_url = http_stub(app)
+    manager = GitManager(f"{base_url}/224-user-", "224-user-", session=requests.Session())
+    return manager, requests_log
+
+
+def test_download_snapshot(gitea, tmp_path):
+    manager, requests_log = gitea
+    target = tmp_path / "Компьютер 1" / "lab1"
+    
+    success, message = manager.download_snapshot(1, "lab1", str(target), branch="main")
+    
+    assert success, message
+    assert (target / "src" / "main.py").read_bytes() == b"print(1)"
+    assert requests_log == ["/224-user-1/lab1/archive/main.tar.gz"]
+    assert os.listdir(tmp_path / "Компьютер 1") == ["lab1"]
+
+
+def test_download_snapshot_looks_up_default_branch(gitea, tmp_path):
+    manager, requests_log = gitea
+    
+    success, message = manager.download_snapshot(1, "lab1", str(tmp_path / "lab1"))
+    
+    assert success, message
+    assert requests_log[0] == "/api/v1/repos/224-user-1/lab1"
+
+
+def test_existing_target_requires_update(gitea, tmp_path):
+    manager, _ = gitea
+    target = tmp_path / "lab1"
+    target.mkdir()
+    (target / "stale.txt").write_text("stale")
+    
+    success, _ = manager.download_snapshot(1, "lab1", str(target), branch="main")
+    assert not success
+    assert (target / "stale.txt").exists()
+    
+    success, message = manager.download_snapshot(1, "lab1", str(target), branch="main", update=True)
+    assert success, message
+    assert not (target / "stale.txt").exists()
+    assert sorted(os.listdir(tmp_path)) == ["lab1"]
+
+
+def test_missing_archive_leaves_no_files(gitea, tmp_path):
+    manager, _ = gitea
+    
+    success, message = manager.download_snapshot(1, "lab1", str(tmp_path / "lab1"), branch="dev")
+    
+    assert not success
+    assert "404" in message
+    assert os.listdir(tmp_path) == []
+
+
+def test_snapshot_mode_runs_through_batch_clone(gitea, tmp_path, monkeypatch):
+    manager, _ = gitea
+    monkeypatch.setattr(manager, "discover_repositories", lambda *args: {
+        1: (True, [{"name": "lab1", "size": 1, "updated": "2026-01-01", "branch": "main"}]),
+        2: (True, []),
+    })
+    
+    results = manager.batch_clone_user_repositories(
+        1, 2, str(tmp_path), max_workers=2, clone_options={"mode": "snapshot"}
+    )
+    
+    assert [(result["repo_name"], result["success"]) for result in results] == [("lab1", True)]
+    assert (tmp_path / "Компьютер 1" / "lab1" / "README.md").exists()
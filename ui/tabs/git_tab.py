@@ -3,19 +3,41 @@ import threading
 import customtkinter as ctk
 from tkinter import messagebox
 from ..theme import Theme
-from utils.git_utils import GitManager
+from utils.git_utils import GitManager, GiteaRepositoryStorage, GiteaProvisioner
+from utils.git_utils.git_utils import REFERENCE_CACHE_DIR
 from utils.db_utils.gitea_utils import GiteaDBCleaner
+from utils.db_utils.owner_matcher import cabinet_owner_matcher
+from utils.db_utils.parallel import parse_max_workers
 import config
 
 class GitTab:
+    # Способы получения списка репозиториев: (название в интерфейсе, значение discovery)
+    DISCOVERY_MODES = [
+        ("Поиск через API", "search"),
+        ("API по пользователям", "users"),
+        ("База данных Gitea", "database"),
+    ]
+    
+    # Режимы клонирования: (название в интерфейсе, режим GitManager.clone_repository)
+    CLONE_MODES = [
+        ("Полный", "full"),
+        ("Последний коммит (depth=1)", "shallow"),
+        ("Частичный (blob:none)", "partial"),
+        ("Снимок без истории (архив)", "snapshot"),
+    ]
+    
     def __init__(self, parent):
         self.parent = parent
         
         self.base_git_url = os.getenv("GIT_URL")
         self.git_prefix = os.getenv("GIT_PREFIX")
+        # Ограничение одновременных клонирований с сервера Gitea (по умолчанию равно числу потоков)
+        self.per_host_limit = parse_max_workers(os.getenv("GIT_PER_HOST_LIMIT"), default=None)
         self.desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
         
         self.git_manager = GitManager(self.base_git_url, self.git_prefix)
+        # Настройки базы данных Gitea, введенные в диалоге удаления: (db_type, db_config)
+        self.gitea_db_settings = None
         
         self.setup_ui()
         
@@ -114,6 +136,33 @@ class GitTab:
         self.to_entry.grid(row=0, column=3, padx=5, pady=5, sticky="w")
         self.to_entry.insert(0, "10")
         
+        self.workers_label = ctk.CTkLabel(self.range_frame, text="Потоков:")
+        self.workers_label.grid(row=0, column=4, padx=(20, 5), pady=5, sticky="w")
+        
+        self.workers_entry = ctk.CTkEntry(self.range_frame, width=60)
+        self.workers_entry.grid(row=0, column=5, padx=5, pady=5, sticky="w")
+        self.workers_entry.insert(0, os.getenv("GIT_WORKERS", "4"))
+        
+        self.discovery_label = ctk.CTkLabel(self.range_frame, text="Список репозиториев:")
+        self.discovery_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        
+        self.discovery_var = ctk.StringVar(value=self.DISCOVERY_MODES[0][0])
+        self.discovery_menu = ctk.CTkOptionMenu(
+            self.range_frame,
+            values=[title for title, _ in self.DISCOVERY_MODES],
+            variable=self.discovery_var,
+            width=200
+        )
+        self.discovery_menu.grid(row=1, column=1, columnspan=2, padx=5, pady=5, sticky="w")
+        
+        self.skip_unchanged_var = ctk.BooleanVar(value=False)
+        self.skip_unchanged_check = ctk.CTkCheckBox(
+            self.range_frame,
+            text="Пропускать неизмененные",
+            variable=self.skip_unchanged_var
+        )
+        self.skip_unchanged_check.grid(row=1, column=3, columnspan=3, padx=(20, 5), pady=5, sticky="w")
+        
         self.path_frame = ctk.CTkFrame(self.config_frame)
         self.path_frame.pack(fill="x", padx=10, pady=(0, 10))
         
@@ -133,6 +182,65 @@ class GitTab:
         )
         self.browse_button.grid(row=0, column=2, padx=5, pady=5, sticky="e")
         
+        self.clone_mode_frame = ctk.CTkFrame(self.config_frame)
+        self.clone_mode_frame.pack(fill="x", padx=10, pady=(0, 10))
+        
+        self.clone_mode_label = ctk.CTkLabel(self.clone_mode_frame, text="Режим клонирования:")
+        self.clone_mode_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        
+        self.clone_mode_var = ctk.StringVar(value=self.CLONE_MODES[0][0])
+        self.clone_mode_menu = ctk.CTkOptionMenu(
+            self.clone_mode_frame,
+            values=[title for title, _ in self.CLONE_MODES],
+            variable=self.clone_mode_var,
+            width=260
+        )
+        self.clone_mode_menu.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        
+        self.single_branch_var = ctk.BooleanVar(value=False)
+        self.single_branch_check = ctk.CTkCheckBox(
+            self.clone_mode_frame,
+            text="Только основная ветка",
+            variable=self.single_branch_var
+        )
+        self.single_branch_check.grid(row=0, column=2, padx=(20, 5), pady=5, sticky="w")
+        
+        self.sparse_label = ctk.CTkLabel(self.clone_mode_frame, text="Только каталоги:")
+        self.sparse_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        
+        self.sparse_entry = ctk.CTkEntry(
+            self.clone_mode_frame,
+            width=260,
+            placeholder_text="src, docs (пусто - все файлы)"
+        )
+        self.sparse_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        
+        self.update_var = ctk.BooleanVar(value=False)
+        self.update_check = ctk.CTkCheckBox(
+            self.clone_mode_frame,
+            text="Обновлять существующие",
+            variable=self.update_var
+        )
+        self.update_check.grid(row=1, column=2, padx=(20, 5), pady=5, sticky="w")
+        
+        self.reference_label = ctk.CTkLabel(self.clone_mode_frame, text="Шаблоны (общий кэш):")
+        self.reference_label.grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        
+        self.reference_entry = ctk.CTkEntry(
+            self.clone_mode_frame,
+            width=260,
+            placeholder_text="teacher/lab1, teacher/lab2"
+        )
+        self.reference_entry.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+        
+        self.dissociate_var = ctk.BooleanVar(value=False)
+        self.dissociate_check = ctk.CTkCheckBox(
+            self.clone_mode_frame,
+            text="Независимые копии",
+            variable=self.dissociate_var
+        )
+        self.dissociate_check.grid(row=2, column=2, padx=(20, 5), pady=5, sticky="w")
+        
         self.progress_frame = ctk.CTkFrame(self.main_frame)
         self.progress_frame.pack(fill="x", padx=10, pady=(0, 10))
         
@@ -197,6 +305,14 @@ class GitTab:
             **Theme.get_button_colors("danger") if hasattr(Theme, 'get_button_colors') else {"fg_color": "#d32f2f", "hover_color": "#b71c1c"}
         )
         self.delete_button.pack(side="right", padx=(0, 10), pady=10)
+        
+        self.provision_button = ctk.CTkButton(
+            self.action_frame, 
+            text="Подготовить кабинет",
+            command=self.show_provision_dialog,
+            **Theme.get_button_colors("success")
+        )
+        self.provision_button.pack(side="right", padx=(0, 10), pady=10)
     
     def browse_directory(self):
         """Открывает диалог выбора директории"""
@@ -245,6 +361,11 @@ class GitTab:
                 self.update_status("Начальный номер должен быть меньше или равен конечному")
                 return
                 
+            max_workers = int(self.workers_entry.get() or 1)
+            if max_workers <= 0:
+                self.update_status("Количество потоков должно быть положительным числом")
+                return
+            
             save_path = self.path_entry.get()
             if not os.path.exists(save_path):
                 self.update_status(f"Путь {save_path} не существует")
@@ -282,24 +403,59 @@ class GitTab:
             
             threading.Thread(
                 target=self.clone_repositories_thread,
-                args=(from_user, to_user, save_path),
+                args=(from_user, to_user, save_path, max_workers,
+                      dict(self.DISCOVERY_MODES)[self.discovery_var.get()], self.skip_unchanged_var.get(),
+                      self.get_clone_options(), self.get_reference_templates()),
                 daemon=True
             ).start()
             
         except ValueError:
-            self.update_status("Ошибка: введите корректные числа для номеров пользователей")
+            self.update_status("Ошибка: введите корректные числа для номеров пользователей и потоков")
     
-    def clone_repositories_thread(self, from_user, to_user, save_path):
+    def clone_repositories_thread(self, from_user, to_user, save_path, max_workers=1,
+                                  discovery="search", skip_unchanged=False, clone_options=None,
+                                  reference_templates=None):
         """Выполняет клонирование репозиториев в отдельном потоке"""
         self.git_manager.set_base_url(self.base_git_url)
         self.git_manager.set_prefix(self.git_prefix)
         
-        results = self.git_manager.batch_clone_user_repositories(
-            from_user, 
-            to_user, 
-            save_path,
-            self.update_progress
-        )
+        references = None
+        if reference_templates:
+            self.update_status("Обновление общего кэша объектов шаблонов...")
+            references, errors = self.git_manager.prepare_reference_cache(
+                reference_templates, os.path.join(save_path, REFERENCE_CACHE_DIR)
+            )
+            for error in errors:
+                self.log_message(f"⚠️ {error}. Репозитории будут клонированы без кэша")
+            if references:
+                self.log_message(f"Общий кэш объектов: {', '.join(sorted(references))}")
+        
+        db_cleaner = None
+        if discovery == "database":
+            db_cleaner, message = self.connect_gitea_database()
+            if db_cleaner is None:
+                self.log_message(f"❌ {message}")
+                self.update_status("Ошибка подключения к базе данных Gitea")
+                self.clone_button.configure(state="normal")
+                return
+        
+        try:
+            results = self.git_manager.batch_clone_user_repositories(
+                from_user, 
+                to_user, 
+                save_path,
+                self.update_progress,
+                max_workers=max_workers,
+                per_host_limit=self.per_host_limit,
+                discovery=discovery,
+                db_cleaner=db_cleaner,
+                skip_unchanged=skip_unchanged,
+                clone_options=clone_options,
+                references=references
+            )
+        finally:
+            if db_cleaner:
+                db_cleaner.disconnect()
         
         for result in results:
             user_num = result["user_number"]
@@ -324,13 +480,138 @@ class GitTab:
         
         self.clone_button.configure(state="normal")
     
+    def get_clone_options(self):
+        """Возвращает параметры клонирования из полей вкладки"""
+        sparse_paths = [path.strip() for path in self.sparse_entry.get().split(",") if path.strip()]
+        return {
+            'mode': dict(self.CLONE_MODES)[self.clone_mode_var.get()],
+            'single_branch': self.single_branch_var.get(),
+            'sparse_paths': sparse_paths or None,
+            'update': self.update_var.get(),
+            'dissociate': self.dissociate_var.get()
+        }
+    
+    def get_reference_templates(self):
+        """Возвращает шаблоны для общего кэша объектов из поля вкладки"""
+        return [template.strip() for template in self.reference_entry.get().split(",") if template.strip()]
+    
+    def connect_gitea_database(self):
+        """
+        Подключается к базе данных Gitea
+        
+        Используются настройки, введенные в диалоге удаления репозиториев, а если диалог
+        еще не открывался - настройки GITEA_DB_* из config.py.
+        
+        Returns:
+            tuple: (GiteaDBCleaner или None, сообщение)
+        """
+        if self.gitea_db_settings:
+            db_type, db_config = self.gitea_db_settings
+        elif config.GITEA_DB_HOST:
+            db_type, db_config = gitea_db_settings_from_config()
+        else:
+            return None, ("Не заданы настройки базы данных Gitea: укажите GITEA_DB_* в .env "
+                          "или подключитесь к базе в диалоге удаления репозиториев")
+        
+        return connect_gitea_cleaner(db_type, db_config)
+    
+    def get_server_url(self):
+        """Возвращает адрес сервера Gitea по полям хоста и порта"""
+        git_host = self.url_entry.get().strip()
+        git_port = self.port_entry.get().strip()
+        
+        if git_port and git_port != "80" and git_port != "443":
+            return f"http://{git_host}:{git_port}"
+        return f"http://{git_host}"
+    
+    def show_provision_dialog(self):
+        """Показывает диалог подготовки кабинета"""
+        try:
+            from_user = int(self.from_entry.get())
+            to_user = int(self.to_entry.get())
+        except ValueError:
+            self.update_status("Ошибка: введите корректные числа для номеров пользователей")
+            return
+        
+        if from_user <= 0 or from_user > to_user:
+            self.update_status("Укажите корректный диапазон пользователей")
+            return
+        
+        if not self.url_entry.get().strip() or not self.prefix_entry.get().strip():
+            self.update_status("Укажите URL сервера Git и префикс пользователя")
+            return
+        
+        dialog = ProvisionDialog(
+            self.parent,
+            self.prefix_entry.get().strip(),
+            from_user,
+            to_user,
+            self.provision_callback
+        )
+        dialog.show()
+    
+    def provision_callback(self, options):
+        """Callback для подготовки пользователей и репозиториев кабинета"""
+        self.log_message(
+            f"Подготовка пользователей {options['prefix']}{options['from_user']}"
+            f"...{options['prefix']}{options['to_user']} на {self.get_server_url()}..."
+        )
+        
+        self.provision_button.configure(state="disabled")
+        self.progress_bar.set(0)
+        
+        threading.Thread(
+            target=self.provision_thread,
+            args=(self.get_server_url(), options),
+            daemon=True
+        ).start()
+    
+    def provision_thread(self, server_url, options):
+        """Выполняет подготовку кабинета в отдельном потоке"""
+        try:
+            provisioner = GiteaProvisioner(server_url, options['token'])
+            
+            def on_user_done(processed, total, result):
+                self.progress_bar.set(processed / total)
+                status = "✅" if result["success"] else "❌"
+                self.log_message(f"{status} {result['user']}: {result['message']}")
+                self.update_status(f"Обработано {processed} из {total} пользователей")
+            
+            results = provisioner.provision_users(
+                options['prefix'],
+                options['from_user'],
+                options['to_user'],
+                options['password'],
+                repositories=options['repositories'],
+                reset_passwords=options['reset_passwords'],
+                progress_callback=on_user_done
+            )
+            
+            failed = sum(1 for result in results if not result["success"])
+            created_users = sum(1 for result in results if result["created_user"])
+            created_repos = sum(len(result["created_repos"]) for result in results)
+            
+            self.log_message(
+                f"Подготовка завершена: создано пользователей {created_users}, "
+                f"репозиториев {created_repos}, ошибок {failed}"
+            )
+            self.update_status(f"Готово. Ошибок: {failed}")
+            
+        except Exception as e:
+            self.log_message(f"❌ Критическая ошибка: {str(e)}")
+            self.update_status("Критическая ошибка при подготовке кабинета")
+        
+        finally:
+            self.provision_button.configure(state="normal")
+    
     def show_delete_dialog(self):
         """Показывает диалог удаления репозиториев"""
         dialog = DeleteRepositoriesDialog(self.parent, self.delete_repositories_callback)
         dialog.show()
     
-    def delete_repositories_callback(self, cabinet_number, db_type, db_config):
+    def delete_repositories_callback(self, cabinet_number, db_type, db_config, options=None):
         """Callback для удаления репозиториев из базы данных Gitea"""
+        self.gitea_db_settings = (db_type, db_config)
         self.log_message(f"Начинаем удаление репозиториев для кабинета {cabinet_number} из базы данных {db_type.upper()}...")
         
         # Отключаем кнопки во время операции
@@ -339,35 +620,20 @@ class GitTab:
         
         threading.Thread(
             target=self.delete_repositories_thread,
-            args=(cabinet_number, db_type, db_config),
+            args=(cabinet_number, db_type, db_config, options or {}),
             daemon=True
         ).start()
     
-    def delete_repositories_thread(self, cabinet_number, db_type, db_config):
+    def delete_repositories_thread(self, cabinet_number, db_type, db_config, options):
         """Выполняет удаление репозиториев в отдельном потоке"""
         try:
-            cleaner = GiteaDBCleaner(db_type=db_type)
+            matcher = cabinet_owner_matcher(cabinet_number, loose=options.get('loose_match', False))
+            chunk_size = options.get('chunk_size')
             
             # Подключаемся к базе данных
-            if db_type == "mssql":
-                success, message = cleaner.connect_mssql(
-                    server=db_config.get('server'),
-                    database=db_config.get('database', 'gitea'),
-                    username=db_config.get('username'),
-                    password=db_config.get('password'),
-                    trusted_connection=db_config.get('trusted_connection', True)
-                )
-            else:  # postgres
-                success, message = cleaner.connect_postgres(
-                    host=db_config.get('host'),
-                    port=db_config.get('port', 5432),
-                    database=db_config.get('database', 'gitea'),
-                    username=db_config.get('username'),
-                    password=db_config.get('password'),
-                    use_ssl=db_config.get('use_ssl', False)
-                )
+            cleaner, message = connect_gitea_cleaner(db_type, db_config)
             
-            if not success:
+            if cleaner is None:
                 self.log_message(f"❌ Ошибка подключения: {message}")
                 self.update_status("Ошибка подключения к базе данных")
                 return
@@ -385,7 +651,7 @@ class GitTab:
             self.log_message(f"✅ {message}")
             
             # Получаем список репозиториев для удаления
-            success, message, repositories = cleaner.get_repositories_by_cabinet(cabinet_number)
+            success, message, repositories = cleaner.get_repositories_by_cabinet(cabinet_number, matcher)
             if not success:
                 self.log_message(f"❌ {message}")
                 self.update_status("Ошибка при поиске репозиториев")
@@ -402,11 +668,49 @@ class GitTab:
             for repo in repositories:
                 self.log_message(f"   - {repo['name']} (ID: {repo['id']}, Владелец: {repo['owner']})")
             
+            storage = None
+            if options.get('storage_root'):
+                storage = GiteaRepositoryStorage(options['storage_root'])
+            
+            if storage and options.get('dry_run'):
+                storage_report = storage.measure((repo['owner'], repo['name']) for repo in repositories)
+                self.log_storage_report(storage_report, "Будет освобождено на диске")
+                self.update_status("Пробный запуск завершен, ничего не удалено")
+                cleaner.disconnect()
+                return
+            
             # Удаляем репозитории
-            success, message, deleted_count = cleaner.delete_repositories_by_cabinet(cabinet_number)
+            if chunk_size:
+                self.log_message(
+                    f"ℹ️ Удаление порциями по {chunk_size} строк"
+                    + (f", не более {options['rows_per_second']} строк/с" if options.get('rows_per_second') else "")
+                )
+            
+            def on_chunk(table, deleted, table_total):
+                if chunk_size:
+                    self.log_message(f"   {table}: -{deleted} (всего {table_total})")
+            
+            success, message, report = cleaner.purge_repositories_by_cabinet(
+                cabinet_number,
+                matcher,
+                chunk_size=chunk_size,
+                rows_per_second=options.get('rows_per_second'),
+                progress_callback=on_chunk
+            )
+            deleted_count = len(report['repositories'])
             
             if success:
                 self.log_message(f"✅ {message}")
+                for table, count in report['counts'].items():
+                    self.log_message(f"   - {table}: {count}")
+                
+                if storage and report['repositories']:
+                    self.log_message(f"Удаляем каталоги репозиториев из {storage.root}...")
+                    storage_report = storage.remove(
+                        (repo['owner'], repo['name']) for repo in report['repositories']
+                    )
+                    self.log_storage_report(storage_report, "Освобождено на диске")
+                
                 self.update_status(f"Успешно удалено {deleted_count} репозиториев")
             else:
                 self.log_message(f"❌ {message}")
@@ -422,6 +726,75 @@ class GitTab:
             # Включаем кнопки обратно
             self.clone_button.configure(state="normal")
             self.delete_button.configure(state="normal")
+    
+    def log_storage_report(self, report, title):
+        """Выводит в лог отчет об удалении каталогов репозиториев"""
+        size_mb = report['bytes'] / (1024 * 1024)
+        self.log_message(
+            f"💾 {title}: {size_mb:.1f} МБ, файлов: {report['files']}, "
+            f"каталогов: {len(report['found'])}, не найдено на диске: {len(report['missing'])}"
+        )
+        for error in report['errors']:
+            self.log_message(f"   ❌ {error}")
+
+
+def gitea_db_settings_from_config():
+    """
+    Возвращает настройки подключения к базе данных Gitea из config.py (GITEA_DB_*)
+    
+    Returns:
+        tuple: (db_type, db_config) в формате DeleteRepositoriesDialog
+    """
+    if config.GITEA_DB_TYPE == "mssql":
+        return "mssql", {
+            'server': config.GITEA_DB_HOST,
+            'database': config.GITEA_DB,
+            'username': config.GITEA_DB_USER,
+            'password': config.GITEA_DB_PASSWORD,
+            'trusted_connection': not config.GITEA_DB_USER
+        }
+    return "postgres", {
+        'host': config.GITEA_DB_HOST,
+        'port': int(config.GITEA_DB_PORT or 5432),
+        'database': config.GITEA_DB,
+        'username': config.GITEA_DB_USER,
+        'password': config.GITEA_DB_PASSWORD,
+        'use_ssl': config.GITEA_DB_SSL
+    }
+
+
+def connect_gitea_cleaner(db_type, db_config):
+    """
+    Подключается к базе данных Gitea
+    
+    Args:
+        db_type: Тип базы данных ("mssql" или "postgres")
+        db_config: Параметры подключения в формате DeleteRepositoriesDialog
+    
+    Returns:
+        tuple: (GiteaDBCleaner или None, сообщение)
+    """
+    cleaner = GiteaDBCleaner(db_type=db_type)
+    
+    if db_type == "mssql":
+        success, message = cleaner.connect_mssql(
+            server=db_config.get('server'),
+            database=db_config.get('database', 'gitea'),
+            username=db_config.get('username'),
+            password=db_config.get('password'),
+            trusted_connection=db_config.get('trusted_connection', True)
+        )
+    else:  # postgres
+        success, message = cleaner.connect_postgres(
+            host=db_config.get('host'),
+            port=db_config.get('port', 5432),
+            database=db_config.get('database', 'gitea'),
+            username=db_config.get('username'),
+            password=db_config.get('password'),
+            use_ssl=db_config.get('use_ssl', False)
+        )
+    
+    return (cleaner if success else None), message
 
 
 class DeleteRepositoriesDialog:
@@ -436,7 +809,7 @@ class DeleteRepositoriesDialog:
         """Показывает диалог"""
         self.dialog = ctk.CTkToplevel(self.parent)
         self.dialog.title("Удаление репозиториев Gitea")
-        self.dialog.geometry("500x720")
+        self.dialog.geometry("500x920")
         self.dialog.resizable(False, False)
         
         # Центрируем диалог
@@ -472,7 +845,54 @@ class DeleteRepositoriesDialog:
             width=100,
             placeholder_text="224"
         )
-        self.cabinet_entry.pack(pady=(0, 10))
+        self.cabinet_entry.pack(pady=(0, 5))
+        
+        # По умолчанию удаляются только владельцы вида "224-...", нестрогий поиск - по явному выбору
+        self.loose_match_var = ctk.BooleanVar(value=False)
+        self.loose_match_check = ctk.CTkCheckBox(
+            cabinet_frame,
+            text="Нестрогий поиск (номер кабинета в любой части имени)",
+            variable=self.loose_match_var
+        )
+        self.loose_match_check.pack(pady=(0, 10))
+        
+        # Удаление порциями, чтобы не блокировать живой экземпляр Gitea
+        throttle_frame = ctk.CTkFrame(main_frame)
+        throttle_frame.pack(fill="x", pady=(0, 15))
+        
+        chunk_label = ctk.CTkLabel(throttle_frame, text="Размер порции (0 - одной транзакцией):")
+        chunk_label.grid(row=0, column=0, padx=(10, 5), pady=(10, 5), sticky="w")
+        
+        self.chunk_size_entry = ctk.CTkEntry(throttle_frame, width=80)
+        self.chunk_size_entry.insert(0, "0")
+        self.chunk_size_entry.grid(row=0, column=1, padx=5, pady=(10, 5), sticky="w")
+        
+        rate_label = ctk.CTkLabel(throttle_frame, text="Строк в секунду (0 - без ограничения):")
+        rate_label.grid(row=1, column=0, padx=(10, 5), pady=(0, 10), sticky="w")
+        
+        self.rows_per_second_entry = ctk.CTkEntry(throttle_frame, width=80)
+        self.rows_per_second_entry.insert(0, "0")
+        self.rows_per_second_entry.grid(row=1, column=1, padx=5, pady=(0, 10), sticky="w")
+        
+        # Каталоги репозиториев на диске сервера Gitea
+        storage_frame = ctk.CTkFrame(main_frame)
+        storage_frame.pack(fill="x", pady=(0, 15))
+        
+        storage_label = ctk.CTkLabel(storage_frame, text="Каталог репозиториев Gitea на диске (необязательно):")
+        storage_label.pack(padx=10, pady=(10, 5), anchor="w")
+        
+        self.storage_root_entry = ctk.CTkEntry(storage_frame, width=440, placeholder_text="/var/lib/gitea/data/gitea-repositories")
+        if config.GITEA_REPO_ROOT:
+            self.storage_root_entry.insert(0, config.GITEA_REPO_ROOT)
+        self.storage_root_entry.pack(padx=10, pady=(0, 5))
+        
+        self.dry_run_var = ctk.BooleanVar(value=False)
+        self.dry_run_check = ctk.CTkCheckBox(
+            storage_frame,
+            text="Только оценить объем на диске (ничего не удалять)",
+            variable=self.dry_run_var
+        )
+        self.dry_run_check.pack(padx=10, pady=(0, 10), anchor="w")
         
         # Фрейм для выбора типа БД
         db_type_frame = ctk.CTkFrame(main_frame)
@@ -485,7 +905,7 @@ class DeleteRepositoriesDialog:
         )
         db_type_label.pack(pady=(10, 5))
         
-        self.db_type_var = ctk.StringVar(value="mssql")
+        self.db_type_var = ctk.StringVar(value=config.GITEA_DB_TYPE)
         
         db_radio_frame = ctk.CTkFrame(db_type_frame)
         db_radio_frame.pack(pady=(0, 10))
@@ -581,7 +1001,7 @@ class DeleteRepositoriesDialog:
             server_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
             
             self.server_entry = ctk.CTkEntry(fields_frame, width=200)
-            self.server_entry.insert(0, config.MS_HOST or "localhost")
+            self.server_entry.insert(0, config.GITEA_DB_HOST or config.MS_HOST or "localhost")
             self.server_entry.grid(row=0, column=1, padx=5, pady=5, sticky="w")
             
             # База данных
@@ -589,11 +1009,11 @@ class DeleteRepositoriesDialog:
             db_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
             
             self.database_entry = ctk.CTkEntry(fields_frame, width=200)
-            self.database_entry.insert(0, "gitea")  # MS SQL по умолчанию gitea
+            self.database_entry.insert(0, config.GITEA_DB)
             self.database_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w")
             
             # Windows аутентификация
-            self.trusted_var = ctk.BooleanVar(value=True)
+            self.trusted_var = ctk.BooleanVar(value=not config.GITEA_DB_USER)
             self.trusted_check = ctk.CTkCheckBox(
                 fields_frame,
                 text="Windows аутентификация",
@@ -605,13 +1025,13 @@ class DeleteRepositoriesDialog:
             # Пользователь и пароль (скрыты по умолчанию)
             self.username_label = ctk.CTkLabel(fields_frame, text="Пользователь:")
             self.username_entry = ctk.CTkEntry(fields_frame, width=200)
-            if config.MS_USER:
-                self.username_entry.insert(0, config.MS_USER)
+            if config.GITEA_DB_USER or config.MS_USER:
+                self.username_entry.insert(0, config.GITEA_DB_USER or config.MS_USER)
             
             self.password_label = ctk.CTkLabel(fields_frame, text="Пароль:")
             self.password_entry = ctk.CTkEntry(fields_frame, width=200, show="*")
-            if config.MS_PASSWORD:
-                self.password_entry.insert(0, config.MS_PASSWORD)
+            if config.GITEA_DB_PASSWORD or config.MS_PASSWORD:
+                self.password_entry.insert(0, config.GITEA_DB_PASSWORD or config.MS_PASSWORD)
             
             self.on_trusted_change()  # Установить видимость полей
             
@@ -622,7 +1042,7 @@ class DeleteRepositoriesDialog:
             host_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
             
             self.host_entry = ctk.CTkEntry(fields_frame, width=200)
-            self.host_entry.insert(0, config.PG_HOST or "localhost")
+            self.host_entry.insert(0, config.GITEA_DB_HOST or config.PG_HOST or "localhost")
             self.host_entry.grid(row=0, column=1, padx=5, pady=5, sticky="w")
             
             # Порт
@@ -630,7 +1050,7 @@ class DeleteRepositoriesDialog:
             port_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
             
             self.port_entry = ctk.CTkEntry(fields_frame, width=200)
-            self.port_entry.insert(0, config.PG_PORT or "5432")
+            self.port_entry.insert(0, config.GITEA_DB_PORT or config.PG_PORT or "5432")
             self.port_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w")
             
             # База данных
@@ -638,7 +1058,7 @@ class DeleteRepositoriesDialog:
             db_label.grid(row=2, column=0, padx=5, pady=5, sticky="w")
             
             self.database_entry = ctk.CTkEntry(fields_frame, width=200)
-            self.database_entry.insert(0, config.PG_DB or "gitea")
+            self.database_entry.insert(0, config.GITEA_DB)
             self.database_entry.grid(row=2, column=1, padx=5, pady=5, sticky="w")
             
             # Пользователь
@@ -646,8 +1066,8 @@ class DeleteRepositoriesDialog:
             username_label.grid(row=3, column=0, padx=5, pady=5, sticky="w")
             
             self.username_entry = ctk.CTkEntry(fields_frame, width=200)
-            if config.PG_USER:
-                self.username_entry.insert(0, config.PG_USER)
+            if config.GITEA_DB_USER or config.PG_USER:
+                self.username_entry.insert(0, config.GITEA_DB_USER or config.PG_USER)
             self.username_entry.grid(row=3, column=1, padx=5, pady=5, sticky="w")
             
             # Пароль
@@ -655,12 +1075,12 @@ class DeleteRepositoriesDialog:
             password_label.grid(row=4, column=0, padx=5, pady=5, sticky="w")
             
             self.password_entry = ctk.CTkEntry(fields_frame, width=200, show="*")
-            if config.PG_PASSWORD:
-                self.password_entry.insert(0, config.PG_PASSWORD)
+            if config.GITEA_DB_PASSWORD or config.PG_PASSWORD:
+                self.password_entry.insert(0, config.GITEA_DB_PASSWORD or config.PG_PASSWORD)
             self.password_entry.grid(row=4, column=1, padx=5, pady=5, sticky="w")
             
             # SSL
-            self.ssl_var = ctk.BooleanVar(value=False)
+            self.ssl_var = ctk.BooleanVar(value=config.GITEA_DB_SSL)
             self.ssl_check = ctk.CTkCheckBox(
                 fields_frame,
                 text="Использовать SSL",
@@ -702,8 +1122,36 @@ class DeleteRepositoriesDialog:
             messagebox.showerror("Ошибка", "Номер кабинета должен быть числом")
             return
         
-        # Подтверждение удаления
-        if not messagebox.askyesno(
+        try:
+            chunk_size = int(self.chunk_size_entry.get().strip() or 0)
+            rows_per_second = int(self.rows_per_second_entry.get().strip() or 0)
+            if chunk_size < 0 or rows_per_second < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Ошибка", "Размер порции и скорость должны быть неотрицательными числами")
+            return
+        if rows_per_second and not chunk_size:
+            # Без порций все удаляется одной транзакцией, ограничивать скорость нечему
+            messagebox.showerror("Ошибка", "Ограничение скорости работает только вместе с размером порции")
+            return
+        
+        options = {
+            'loose_match': self.loose_match_var.get(),
+            'chunk_size': chunk_size or None,
+            'rows_per_second': rows_per_second or None,
+            'storage_root': self.storage_root_entry.get().strip(),
+            'dry_run': self.dry_run_var.get()
+        }
+        
+        if options['dry_run'] and not options['storage_root']:
+            messagebox.showerror("Ошибка", "Для оценки объема укажите каталог репозиториев Gitea")
+            return
+        if options['storage_root'] and not os.path.isdir(options['storage_root']):
+            messagebox.showerror("Ошибка", f"Каталог {options['storage_root']} не найден")
+            return
+        
+        # Подтверждение удаления (пробный запуск ничего не удаляет)
+        if not options['dry_run'] and not messagebox.askyesno(
             "Подтверждение удаления",
             f"Вы уверены, что хотите удалить все репозитории для кабинета {cabinet_number}?\n\n"
             f"Это действие необратимо!",
@@ -753,7 +1201,7 @@ class DeleteRepositoriesDialog:
         
         # Закрываем диалог и вызываем callback
         self.close_dialog()
-        self.callback(cabinet_number, db_type, db_config)
+        self.callback(cabinet_number, db_type, db_config, options)
     
     def test_connection(self):
         """Тестирует подключение к базе данных"""
@@ -822,3 +1270,128 @@ class DeleteRepositoriesDialog:
         """Закрывает диалог"""
         if self.dialog:
             self.dialog.destroy()
+
+
+class ProvisionDialog:
+    """Диалог для массового создания пользователей кабинета и их репозиториев в Gitea"""
+    
+    def __init__(self, parent, prefix, from_user, to_user, callback):
+        self.parent = parent
+        self.prefix = prefix
+        self.from_user = from_user
+        self.to_user = to_user
+        self.callback = callback
+        self.dialog = None
+    
+    def show(self):
+        """Показывает диалог"""
+        self.dialog = ctk.CTkToplevel(self.parent)
+        self.dialog.title("Подготовка кабинета")
+        self.dialog.geometry("500x420")
+        self.dialog.resizable(False, False)
+        
+        self.dialog.transient(self.parent)
+        self.dialog.grab_set()
+        
+        main_frame = ctk.CTkFrame(self.dialog)
+        main_frame.pack(fill="both", expand=True, padx=20, pady=20)
+        
+        title_label = ctk.CTkLabel(
+            main_frame,
+            text=f"Пользователи {self.prefix}{self.from_user} ... {self.prefix}{self.to_user}",
+            font=ctk.CTkFont(size=16, weight="bold")
+        )
+        title_label.pack(pady=(0, 15))
+        
+        fields_frame = ctk.CTkFrame(main_frame)
+        fields_frame.pack(fill="x", pady=(0, 15))
+        
+        token_label = ctk.CTkLabel(fields_frame, text="Токен администратора:")
+        token_label.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        
+        self.token_entry = ctk.CTkEntry(fields_frame, width=250, show="*")
+        if config.GITEA_TOKEN:
+            self.token_entry.insert(0, config.GITEA_TOKEN)
+        self.token_entry.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        
+        password_label = ctk.CTkLabel(fields_frame, text="Пароль пользователей:")
+        password_label.grid(row=1, column=0, padx=5, pady=5, sticky="w")
+        
+        self.password_entry = ctk.CTkEntry(fields_frame, width=250, show="*")
+        self.password_entry.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        
+        repos_label = ctk.CTkLabel(fields_frame, text="Репозитории:")
+        repos_label.grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        
+        self.repos_entry = ctk.CTkEntry(fields_frame, width=250, placeholder_text="lab1, teacher/template")
+        self.repos_entry.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+        
+        hint_label = ctk.CTkLabel(
+            fields_frame,
+            text="Через запятую: имя - пустой репозиторий, владелец/имя - из шаблона",
+            font=ctk.CTkFont(size=11),
+            text_color="gray"
+        )
+        hint_label.grid(row=3, column=0, columnspan=2, padx=5, pady=(0, 5), sticky="w")
+        
+        self.reset_var = ctk.BooleanVar(value=False)
+        reset_check = ctk.CTkCheckBox(
+            fields_frame,
+            text="Сбросить пароль существующим пользователям",
+            variable=self.reset_var
+        )
+        reset_check.grid(row=4, column=0, columnspan=2, padx=5, pady=(5, 10), sticky="w")
+        
+        buttons_frame = ctk.CTkFrame(main_frame)
+        buttons_frame.pack(fill="x", pady=(10, 0))
+        
+        cancel_button = ctk.CTkButton(
+            buttons_frame,
+            text="Отмена",
+            command=self.close_dialog,
+            fg_color="gray",
+            hover_color="darkgray"
+        )
+        cancel_button.pack(side="right", padx=(10, 10), pady=10)
+        
+        start_button = ctk.CTkButton(
+            buttons_frame,
+            text="Подготовить",
+            command=self.on_confirm
+        )
+        start_button.pack(side="right", padx=10, pady=10)
+        
+        self.token_entry.focus()
+    
+    def on_confirm(self):
+        """Обработчик подтверждения"""
+        token = self.token_entry.get().strip()
+        password = self.password_entry.get()
+        
+        if not token:
+            messagebox.showerror("Ошибка", "Укажите токен администратора Gitea")
+            return
+        
+        if len(password) < 8:
+            messagebox.showerror("Ошибка", "Пароль должен быть не короче 8 символов")
+            return
+        
+        repositories = [name.strip() for name in self.repos_entry.get().split(",") if name.strip()]
+        
+        options = {
+            'token': token,
+            'password': password,
+            'prefix': self.prefix,
+            'from_user': self.from_user,
+            'to_user': self.to_user,
+            'repositories': repositories,
+            'reset_passwords': self.reset_var.get()
+        }
+        
+        self.close_dialog()
+        self.callback(options)
+    
+    def close_dialog(self):
+        """Закрывает диалог"""
+        if self.dialog:
+            self.dialog.destroy()
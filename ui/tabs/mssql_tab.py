@@ -1,9 +1,10 @@
 import customtkinter as ctk
 from ..theme import Theme
 import threading
+import time
 import tkinter as tk
 import os
-from utils.db_utils import MSSQLConnection, MSSQLCleaner
+from utils.db_utils import MSSQLConnection, MSSQLCleaner, parse_max_workers, format_parallel_results
 
 
 class MSSQLTab:
@@ -54,6 +55,14 @@ class MSSQLTab:
         )
         self.cleanup_auth_combobox.grid(row=0, column=3, padx=5, pady=5, sticky="w")
         
+        self.workers_label = ctk.CTkLabel(self.cleanup_server_frame, text="Потоков:")
+        self.workers_label.grid(row=0, column=4, padx=(20, 5), pady=5, sticky="w")
+        
+        self.workers_entry = ctk.CTkEntry(self.cleanup_server_frame, width=50)
+        ms_workers = os.getenv("MS_WORKERS", "4")
+        self.workers_entry.insert(0, ms_workers)
+        self.workers_entry.grid(row=0, column=5, padx=5, pady=5, sticky="w")
+        
         self.cleanup_username_label = ctk.CTkLabel(self.cleanup_server_frame, text="Пользователь:")
         self.cleanup_password_label = ctk.CTkLabel(self.cleanup_server_frame, text="Пароль:")
         self.cleanup_username_entry = ctk.CTkEntry(self.cleanup_server_frame, width=150)
@@ -151,6 +160,22 @@ class MSSQLTab:
         )
         self.delete_db_button.pack(side="right", padx=5, pady=5)
         
+        self.restore_snapshot_button = ctk.CTkButton(
+            self.cleanup_action_frame, 
+            text="Сбросить к снимку",
+            **Theme.get_button_colors("success"),
+            command=self.restore_selected_databases
+        )
+        self.restore_snapshot_button.pack(side="right", padx=5, pady=5)
+        
+        self.create_snapshot_button = ctk.CTkButton(
+            self.cleanup_action_frame, 
+            text="Создать снимки",
+            **Theme.get_button_colors(),
+            command=self.snapshot_selected_databases
+        )
+        self.create_snapshot_button.pack(side="right", padx=5, pady=5)
+        
         self.status_frame = ctk.CTkFrame(self.main_frame)
         self.status_frame.pack(fill="x", padx=10, pady=5)
         
@@ -202,13 +227,13 @@ class MSSQLTab:
             return
             
         try:
-            dbs = self.cleaner.connection.get_all_databases()
-            
             self.listbox.delete(0, tk.END)
-            for _, row in dbs.iterrows():
-                self.listbox.insert(tk.END, row['name'])
+            count = 0
+            for names in self.cleaner.connection.stream_all_databases():
+                self.listbox.insert(tk.END, *names)
+                count += len(names)
                 
-            self.update_cleanup_status(f"Список баз данных обновлен. Найдено {len(dbs)} баз данных.")
+            self.update_cleanup_status(f"Список баз данных обновлен. Найдено {count} баз данных.")
             
         except Exception as e:
             self.update_cleanup_status(f"Ошибка обновления списка: {str(e)}")
@@ -265,6 +290,7 @@ class MSSQLTab:
         password = None if trusted_connection else self.cleanup_password_entry.get()
 
         results = {}
+        started = time.perf_counter()
         try:
             self.cleaner.disconnect()
             self.cleaner.connect(
@@ -274,32 +300,15 @@ class MSSQLTab:
                 trusted_connection=trusted_connection
             )
 
-            deleted_count = 0
-            for db in databases:
-                try:
-                    if isinstance(db, tuple):
-                        db_name = db[0]
-                    else:
-                        db_name = db
-
-                    self.update_cleanup_status(f"Удаление базы данных {db_name}...")
-
-                    success = self.cleaner.drop_database(db_name)
-                    results[db_name] = success
-                    if success:
-                        deleted_count += 1
-                except Exception as e:
-                    if isinstance(db, tuple):
-                        db_name = db[0]
-                    else:
-                        db_name = db
-                    results[db_name] = False
-                    self.update_cleanup_results(f"Ошибка при удалении {db_name}: {str(e)}")
+            max_workers = parse_max_workers(self.workers_entry.get())
+            for result in self.cleaner.drop_databases(databases, max_workers):
+                results[result["database"]] = result
+                self.update_cleanup_status(f"Удалено {len(results)} из {len(databases)} баз данных ({result['database']})")
 
+            deleted_count = sum(1 for result in results.values() if result["success"])
             report = f"Результаты удаления баз данных:\n\nУдалено {deleted_count} из {len(databases)} баз данных.\n\n"
-            for db, success in results.items():
-                status = "Успешно" if success else "Ошибка"
-                report += f"{db}: {status}\n"
+            report += format_parallel_results(databases, results)
+            report += f"\nОбщее время: {time.perf_counter() - started:.2f} с"
 
             self.update_cleanup_results(report)
             self.update_cleanup_status("Удаление завершено")
@@ -334,37 +343,108 @@ class MSSQLTab:
         return messagebox.askyesno("Подтверждение удаления", message, icon="warning")
     
     def _clean_databases_thread(self, databases):
-        """Выполняет очистку баз данных в отдельном потоке"""
+        """Выполняет параллельную очистку баз данных в отдельном потоке"""
         self.update_cleanup_status(f"Начало очистки {len(databases)} баз данных...")
         self.update_cleanup_results("Процесс очистки запущен. Пожалуйста, подождите...")
         
         results = {}
-        for db in databases:
-            try:
-                if isinstance(db, tuple):
-                    db_name = db[0]
-                else:
-                    db_name = db
-                    
-                self.update_cleanup_status(f"Очистка базы данных {db_name}...")
-                success = self.cleaner.drop_all_tables_in_database(db_name)
-                results[db_name] = success
-            except Exception as e:
-                if isinstance(db, tuple):
-                    db_name = db[0]
-                else:
-                    db_name = db
-                results[db_name] = False
-                self.update_cleanup_results(f"Ошибка при очистке {db_name}: {str(e)}")
+        started = time.perf_counter()
+        try:
+            max_workers = parse_max_workers(self.workers_entry.get())
+            for result in self.cleaner.drop_all_tables_in_databases(databases, max_workers):
+                results[result["database"]] = result
+                self.update_cleanup_status(f"Очищено {len(results)} из {len(databases)} баз данных ({result['database']})")
+        except Exception as e:
+            self.update_cleanup_results(f"Ошибка при очистке: {str(e)}")
+            self.update_cleanup_status("Очистка завершена с ошибками")
+            return
                 
         report = "Результаты очистки баз данных:\n\n"
-        for db, success in results.items():
-            status = "Успешно" if success else "Ошибка"
-            report += f"{db}: {status}\n"
+        report += format_parallel_results(databases, results)
+        report += f"\nОбщее время: {time.perf_counter() - started:.2f} с"
             
         self.update_cleanup_results(report)
         self.update_cleanup_status("Очистка завершена")
     
+    def get_selected_databases(self):
+        """Возвращает выбранные базы данных или None, если действие невозможно"""
+        if not hasattr(self.cleaner, 'is_connected') or not self.cleaner.is_connected:
+            self.update_cleanup_status("Ошибка: не подключено к серверу")
+            return None
+            
+        selection = self.listbox.curselection()
+        if not selection:
+            self.update_cleanup_status("Ошибка: не выбраны базы данных")
+            return None
+        
+        return [self.listbox.get(i) for i in selection]
+    
+    def snapshot_selected_databases(self):
+        """Создает снимки выбранных баз данных"""
+        selected_dbs = self.get_selected_databases()
+        if not selected_dbs:
+            return
+        
+        from tkinter import messagebox
+        message = "Будут созданы (или пересозданы) снимки следующих баз данных:\n\n"
+        message += "\n".join(selected_dbs[:10])
+        if len(selected_dbs) > 10:
+            message += f"\n... и еще {len(selected_dbs) - 10} баз данных"
+        message += "\n\nСуществующие снимки этих баз будут заменены. Хотите продолжить?"
+        
+        if not messagebox.askyesno("Подтверждение создания снимков", message):
+            return
+        
+        threading.Thread(
+            target=self._bulk_operation_thread,
+            args=(selected_dbs, self.cleaner.create_snapshots, "Создание снимков")
+        ).start()
+    
+    def restore_selected_databases(self):
+        """Возвращает выбранные базы данных к состоянию снимков"""
+        selected_dbs = self.get_selected_databases()
+        if not selected_dbs:
+            return
+        
+        from tkinter import messagebox
+        message = "Следующие базы данных будут возвращены к состоянию своих снимков:\n\n"
+        message += "\n".join(selected_dbs[:10])
+        if len(selected_dbs) > 10:
+            message += f"\n... и еще {len(selected_dbs) - 10} баз данных"
+        message += "\n\nВсе подключения будут закрыты, изменения после создания снимка будут потеряны! Хотите продолжить?"
+        
+        if not messagebox.askyesno("Подтверждение сброса", message, icon="warning"):
+            return
+        
+        threading.Thread(
+            target=self._bulk_operation_thread,
+            args=(selected_dbs, self.cleaner.restore_from_snapshots, "Сброс к снимку")
+        ).start()
+    
+    def _bulk_operation_thread(self, databases, operation, title):
+        """Выполняет параллельную операцию над базами данных в отдельном потоке"""
+        self.update_cleanup_status(f"{title}: начало обработки {len(databases)} баз данных...")
+        self.update_cleanup_results(f"{title}: процесс запущен. Пожалуйста, подождите...")
+        
+        results = {}
+        started = time.perf_counter()
+        try:
+            max_workers = parse_max_workers(self.workers_entry.get())
+            for result in operation(databases, max_workers):
+                results[result["database"]] = result
+                self.update_cleanup_status(f"{title}: обработано {len(results)} из {len(databases)} баз данных ({result['database']})")
+        except Exception as e:
+            self.update_cleanup_results(f"{title}: ошибка: {str(e)}")
+            self.update_cleanup_status(f"{title}: завершено с ошибками")
+            return
+        
+        report = f"{title}. Результаты:\n\n"
+        report += format_parallel_results(databases, results)
+        report += f"\nОбщее время: {time.perf_counter() - started:.2f} с"
+        
+        self.update_cleanup_results(report)
+        self.update_cleanup_status(f"{title}: завершено")
+    
     def confirm_cleanup(self, databases):
         """Запрашивает подтверждение действия очистки"""
         from tkinter import messagebox
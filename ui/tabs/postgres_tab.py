@@ -1,9 +1,10 @@
 import customtkinter as ctk
 from ..theme import Theme
 import threading
+import time
 import tkinter as tk
 import os
-from utils.db_utils import PostgresConnection, PostgresCleaner
+from utils.db_utils import PostgresConnection, PostgresCleaner, parse_max_workers, format_parallel_results
 
 
 class PostgresTab:
@@ -73,6 +74,30 @@ class PostgresTab:
         )
         self.cleanup_ssl_checkbox.grid(row=2, column=0, columnspan=2, padx=5, pady=5, sticky="w")
         
+        self.atomic_var = ctk.BooleanVar(value=os.getenv("PG_ATOMIC_CLEANUP", "").lower() == "yes")
+        self.atomic_checkbox = ctk.CTkCheckBox(
+            self.cleanup_server_frame, 
+            text="Очищать всю схему одной транзакцией (таблицы, представления, функции, типы)", 
+            variable=self.atomic_var
+        )
+        self.atomic_checkbox.grid(row=3, column=0, columnspan=4, padx=5, pady=5, sticky="w")
+        
+        self.template_label = ctk.CTkLabel(self.cleanup_server_frame, text="Шаблон:")
+        self.template_label.grid(row=4, column=0, padx=5, pady=5, sticky="w")
+        
+        self.template_entry = ctk.CTkEntry(self.cleanup_server_frame, width=200)
+        pg_template = os.getenv("PG_TEMPLATE_DB", "user224-template")
+        self.template_entry.insert(0, pg_template)
+        self.template_entry.grid(row=4, column=1, padx=5, pady=5, sticky="w")
+        
+        self.make_template_button = ctk.CTkButton(
+            self.cleanup_server_frame, 
+            text="Сделать выбранную базу шаблоном",
+            **Theme.get_button_colors(),
+            command=self.make_template_from_selected
+        )
+        self.make_template_button.grid(row=4, column=2, columnspan=2, padx=(20, 5), pady=5, sticky="w")
+        
         self.schema_frame = ctk.CTkFrame(self.cleanup_server_frame)
         self.schema_frame.grid(row=2, column=2, columnspan=2, padx=5, pady=5, sticky="w")
         
@@ -84,6 +109,14 @@ class PostgresTab:
         self.schema_entry.insert(0, pg_schema)
         self.schema_entry.pack(side="left", padx=5)
         
+        self.workers_label = ctk.CTkLabel(self.schema_frame, text="Потоков:")
+        self.workers_label.pack(side="left", padx=(15, 5))
+        
+        self.workers_entry = ctk.CTkEntry(self.schema_frame, width=50)
+        pg_workers = os.getenv("PG_WORKERS", "4")
+        self.workers_entry.insert(0, pg_workers)
+        self.workers_entry.pack(side="left", padx=5)
+        
         self.cleanup_buttons_frame = ctk.CTkFrame(self.cleanup_connection_frame)
         self.cleanup_buttons_frame.pack(fill="x", padx=10, pady=5)
         
@@ -154,6 +187,14 @@ class PostgresTab:
         )
         self.delete_db_button.pack(side="right", padx=5, pady=5)
         
+        self.reset_button = ctk.CTkButton(
+            self.cleanup_action_frame, 
+            text="Сбросить из шаблона",
+            **Theme.get_button_colors("success"),
+            command=self.reset_selected_databases
+        )
+        self.reset_button.pack(side="right", padx=5, pady=5)
+        
         self.status_frame = ctk.CTkFrame(self.main_frame)
         self.status_frame.pack(fill="x", padx=10, pady=5)
         
@@ -206,13 +247,13 @@ class PostgresTab:
             return
             
         try:
-            dbs = self.cleaner.connection.get_all_databases()
-            
             self.listbox.delete(0, tk.END)
-            for _, row in dbs.iterrows():
-                self.listbox.insert(tk.END, row['datname'])
+            count = 0
+            for names in self.cleaner.connection.stream_all_databases():
+                self.listbox.insert(tk.END, *names)
+                count += len(names)
                 
-            self.update_cleanup_status(f"Список баз данных обновлен. Найдено {len(dbs)} баз данных.")
+            self.update_cleanup_status(f"Список баз данных обновлен. Найдено {count} баз данных.")
             
         except Exception as e:
             self.update_cleanup_status(f"Ошибка обновления списка: {str(e)}")
@@ -234,7 +275,7 @@ class PostgresTab:
         if not self.confirm_cleanup(selected_dbs):
             return
         
-        threading.Thread(target=self._clean_databases_thread, args=(selected_dbs, schema)).start()
+        threading.Thread(target=self._clean_databases_thread, args=(selected_dbs, schema, self.atomic_var.get())).start()
     
     def delete_selected_databases(self):
         """Удаляет выбранные базы данных"""
@@ -266,33 +307,35 @@ class PostgresTab:
         use_ssl = self.cleanup_ssl_var.get()
         
         results = {}
-        for db in databases:
-            try:
-                self.update_cleanup_status(f"Удаление базы данных {db}...")
-                self.cleaner.disconnect()
-                self.cleaner.connect(
-                    host=host,
-                    port=port,
-                    database="postgres",
-                    username=username,
-                    password=password,
-                    use_ssl=use_ssl
-                )
-                success = self.cleaner.drop_database(db)
-                results[db] = success
-            except Exception as e:
-                results[db] = False
-                self.update_cleanup_results(f"Ошибка при удалении {db}: {str(e)}")
+        started = time.perf_counter()
+        try:
+            # Одно административное соединение на всю пачку (или по одному на поток)
+            self.cleaner.connect(
+                host=host,
+                port=port,
+                database="postgres",
+                username=username,
+                password=password,
+                use_ssl=use_ssl
+            )
+            
+            max_workers = parse_max_workers(self.workers_entry.get())
+            for result in self.cleaner.drop_databases(databases, max_workers):
+                results[result["database"]] = result
+                self.update_cleanup_status(f"Удалено {len(results)} из {len(databases)} баз данных ({result['database']})")
+        except Exception as e:
+            self.update_cleanup_results(f"Ошибка при удалении: {str(e)}")
+            self.update_cleanup_status("Удаление завершено с ошибками")
+            return
                 
         report = "Результаты удаления баз данных:\n\n"
-        for db, success in results.items():
-            status = "Успешно" if success else "Ошибка"
-            report += f"{db}: {status}\n"
+        report += format_parallel_results(databases, results)
+        report += f"\nОбщее время: {time.perf_counter() - started:.2f} с"
             
         self.update_cleanup_results(report)
         self.update_cleanup_status("Удаление завершено")
         
-        self.refresh_database_list()
+        self.parent.after(0, self.refresh_database_list)
     
     def confirm_delete_db(self, databases):
         """Запрашивает подтверждение действия удаления баз данных"""
@@ -308,8 +351,8 @@ class PostgresTab:
         
         return messagebox.askyesno("Подтверждение удаления", message, icon="warning")
     
-    def _clean_databases_thread(self, databases, schema):
-        """Выполняет очистку баз данных в отдельном потоке"""
+    def _clean_databases_thread(self, databases, schema, atomic=False):
+        """Выполняет параллельную очистку баз данных в отдельном потоке"""
         self.update_cleanup_status(f"Начало очистки {len(databases)} баз данных...")
         self.update_cleanup_results("Процесс очистки запущен. Пожалуйста, подождите...")
         
@@ -318,37 +361,149 @@ class PostgresTab:
         username = self.cleanup_username_entry.get()
         password = self.cleanup_password_entry.get()
         use_ssl = self.cleanup_ssl_var.get()
+        max_workers = parse_max_workers(self.workers_entry.get())
         
         results = {}
-        for db in databases:
-            try:
-                self.update_cleanup_status(f"Очистка базы данных {db}...")
-                
-                self.cleaner.disconnect()
-                
-                self.cleaner.connect(
-                    host=host,
-                    port=port,
-                    database=db,
-                    username=username,
-                    password=password,
-                    use_ssl=use_ssl
-                )
-                
-                success = self.cleaner.drop_all_tables_in_database(db, schema)
-                results[db] = success
-            except Exception as e:
-                results[db] = False
-                self.update_cleanup_results(f"Ошибка при очистке {db}: {str(e)}")
+        started = time.perf_counter()
+        try:
+            self.cleaner.connect(
+                host=host,
+                port=port,
+                database="postgres",
+                username=username,
+                password=password,
+                use_ssl=use_ssl
+            )
+            
+            for result in self.cleaner.drop_all_tables_in_databases(databases, schema, max_workers, atomic):
+                results[result["database"]] = result
+                self.update_cleanup_status(f"Очищено {len(results)} из {len(databases)} баз данных ({result['database']})")
+        except Exception as e:
+            self.update_cleanup_results(f"Ошибка при очистке: {str(e)}")
+            self.update_cleanup_status("Очистка завершена с ошибками")
+            return
                 
         report = "Результаты очистки баз данных:\n\n"
-        for db, success in results.items():
-            status = "Успешно" if success else "Ошибка"
-            report += f"{db}: {status}\n"
+        report += format_parallel_results(databases, results)
+        report += f"\nОбщее время: {time.perf_counter() - started:.2f} с"
             
         self.update_cleanup_results(report)
         self.update_cleanup_status("Очистка завершена")
     
+    def reset_selected_databases(self):
+        """Пересоздает выбранные базы данных из шаблона"""
+        if not hasattr(self.cleaner, 'is_connected') or not self.cleaner.is_connected:
+            self.update_cleanup_status("Ошибка: не подключено к серверу")
+            return
+            
+        selection = self.listbox.curselection()
+        if not selection:
+            self.update_cleanup_status("Ошибка: не выбраны базы данных")
+            return
+        
+        template = self.template_entry.get().strip()
+        if not template:
+            self.update_cleanup_status("Ошибка: укажите имя шаблона")
+            return
+            
+        selected_dbs = [self.listbox.get(i) for i in selection]
+        if template in selected_dbs:
+            self.update_cleanup_status("Ошибка: шаблон не может быть в списке пересоздаваемых баз")
+            return
+        
+        try:
+            template_exists = self.cleaner.database_exists(template)
+        except Exception as e:
+            self.update_cleanup_status(f"Ошибка проверки шаблона: {str(e)}")
+            return
+        
+        if not template_exists:
+            self.update_cleanup_status(
+                f"Ошибка: шаблон {template} не найден. Создайте его кнопкой \"Сделать выбранную базу шаблоном\""
+            )
+            return
+        
+        if not self.confirm_reset(selected_dbs, template):
+            return
+        
+        threading.Thread(target=self._reset_databases_thread, args=(selected_dbs, template)).start()
+    
+    def _reset_databases_thread(self, databases, template):
+        """Выполняет пересоздание баз данных из шаблона в отдельном потоке"""
+        self.update_cleanup_status(f"Начало сброса {len(databases)} баз данных из шаблона {template}...")
+        self.update_cleanup_results("Процесс сброса запущен. Пожалуйста, подождите...")
+        
+        results = {}
+        started = time.perf_counter()
+        try:
+            max_workers = parse_max_workers(self.workers_entry.get())
+            for result in self.cleaner.reset_databases_from_template(databases, template, max_workers):
+                results[result["database"]] = result
+                self.update_cleanup_status(f"Сброшено {len(results)} из {len(databases)} баз данных ({result['database']})")
+        except Exception as e:
+            self.update_cleanup_results(f"Ошибка при сбросе: {str(e)}")
+            self.update_cleanup_status("Сброс завершен с ошибками")
+            return
+        
+        report = f"Результаты сброса баз данных из шаблона {template}:\n\n"
+        report += format_parallel_results(databases, results)
+        report += f"\nОбщее время: {time.perf_counter() - started:.2f} с"
+        
+        self.update_cleanup_results(report)
+        self.update_cleanup_status("Сброс завершен")
+    
+    def make_template_from_selected(self):
+        """Создает шаблон из выбранной базы данных"""
+        if not hasattr(self.cleaner, 'is_connected') or not self.cleaner.is_connected:
+            self.update_cleanup_status("Ошибка: не подключено к серверу")
+            return
+        
+        selection = self.listbox.curselection()
+        if len(selection) != 1:
+            self.update_cleanup_status("Ошибка: выберите одну базу данных для шаблона")
+            return
+        
+        template = self.template_entry.get().strip()
+        if not template:
+            self.update_cleanup_status("Ошибка: укажите имя шаблона")
+            return
+        
+        source = self.listbox.get(selection[0])
+        
+        from tkinter import messagebox
+        message = (
+            f"Шаблон {template} будет пересоздан как копия базы данных {source}.\n\n"
+            f"Все подключения к {source} будут принудительно закрыты. Хотите продолжить?"
+        )
+        if not messagebox.askyesno("Подтверждение создания шаблона", message):
+            return
+        
+        threading.Thread(target=self._make_template_thread, args=(source, template)).start()
+    
+    def _make_template_thread(self, source, template):
+        """Создает шаблон из базы данных в отдельном потоке"""
+        self.update_cleanup_status(f"Создание шаблона {template} из базы данных {source}...")
+        
+        if self.cleaner.create_template_database(template, source_database=source):
+            self.update_cleanup_status(f"Шаблон {template} создан из базы данных {source}")
+            self.parent.after(0, self.refresh_database_list)
+        else:
+            self.update_cleanup_status(f"Ошибка создания шаблона: {self.cleaner.last_error}")
+    
+    def confirm_reset(self, databases, template):
+        """Запрашивает подтверждение сброса баз данных из шаблона"""
+        from tkinter import messagebox
+        
+        message = f"Следующие базы данных будут УДАЛЕНЫ и созданы заново из шаблона {template}:\n\n"
+        message += "\n".join(databases[:10])
+        
+        if len(databases) > 10:
+            message += f"\n... и еще {len(databases) - 10} баз данных"
+            
+        message += "\n\nВсе изменения в этих базах будут потеряны! Хотите продолжить?"
+        
+        return messagebox.askyesno("Подтверждение сброса", message, icon="warning")
+    
     def confirm_cleanup(self, databases):
         """Запрашивает подтверждение действия очистки"""
         from tkinter import messagebox
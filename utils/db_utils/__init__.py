@@ -3,15 +3,41 @@
 """
 
 from .base import DBConnection
+from .result import QueryResult
+from .pool import ConnectionPool, PoolKey, make_pool_key
+from .parallel import run_parallel, parse_max_workers, format_parallel_results
 from .mssql_utils import MSSQLConnection, MSSQLCleaner
-from .postgres_utils import PostgresConnection, PostgresCleaner
+from .postgres_utils import PostgresConnection, PostgresCleaner, PostgresConnectionPool, get_postgres_pool
+from .owner_matcher import (
+    OwnerMatcher, PrefixOwnerMatcher, NamesOwnerMatcher, RangeOwnerMatcher, SubstringOwnerMatcher,
+    cabinet_owner_matcher
+)
+from .gitea_schema import SchemaGraph, GITEA_COLUMN_REFERENCES, clear_schema_graph_cache
 from .gitea_utils import GiteaDBCleaner
 
 __all__ = [
     "DBConnection",
+    "QueryResult",
+    "ConnectionPool",
+    "PoolKey",
+    "make_pool_key",
+    "run_parallel",
+    "parse_max_workers",
+    "format_parallel_results",
     "MSSQLConnection",
     "PostgresConnection",
     "MSSQLCleaner",
     "PostgresCleaner",
+    "PostgresConnectionPool",
+    "get_postgres_pool",
+    "OwnerMatcher",
+    "PrefixOwnerMatcher",
+    "NamesOwnerMatcher",
+    "RangeOwnerMatcher",
+    "SubstringOwnerMatcher",
+    "cabinet_owner_matcher",
+    "SchemaGraph",
+    "GITEA_COLUMN_REFERENCES",
+    "clear_schema_graph_cache",
     "GiteaDBCleaner"
 ]
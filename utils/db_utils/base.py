@@ -1,4 +1,4 @@
-import pandas as pd
+from .result import QueryResult
 
 class DBConnection:
     """Базовый класс для подключения к базе данных"""
@@ -37,10 +37,57 @@ class DBConnection:
             try:
                 results = self.cursor.fetchall()
                 columns = [column[0] for column in self.cursor.description]
-                return pd.DataFrame(results, columns=columns)
+                return QueryResult(columns, [tuple(row) for row in results])
             except:
                 return None
         except Exception as e:
             if commit:
                 self.connection.rollback()
-            raise e 
\ No newline at end of file
+            raise e
+    
+    def execute_stream(self, query, params=None, batch_size=1000):
+        """
+        Выполняет SQL запрос и отдает результат пачками строк
+        
+        Строки читаются через fetchmany и не накапливаются в памяти целиком.
+        Если транзакцию начал сам запрос, она завершается после чтения, чтобы сессия
+        не оставалась "idle in transaction" с блокировками прочитанных таблиц.
+        
+        Args:
+            query: SQL запрос
+            params: Параметры запроса
+            batch_size: Количество строк в одной пачке
+            
+        Yields:
+            Список строк (кортежей) очередной пачки
+        """
+        if not self.connection:
+            raise ConnectionError("Database is not connected")
+        
+        owns_transaction = self._starts_transaction()
+        cursor = self._create_stream_cursor(batch_size)
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [tuple(row) for row in rows]
+        finally:
+            cursor.close()
+            if owns_transaction:
+                self.connection.commit()
+    
+    def _starts_transaction(self):
+        """Проверяет, начнет ли следующий запрос новую транзакцию (вне autocommit и без открытой транзакции)"""
+        return False
+    
+    def _create_stream_cursor(self, batch_size):
+        """Создает курсор для потокового чтения результата"""
+        cursor = self.connection.cursor()
+        cursor.arraysize = batch_size
+        return cursor
@@ -0,0 +1,195 @@
+"""
+Граф зависимостей таблиц Gitea для каскадного удаления репозиториев
+"""
+import threading
+
+
+# Связи, которые Gitea не объявляет внешними ключами: столбец -> (родительская таблица, столбец)
+GITEA_COLUMN_REFERENCES = {
+    "repo_id": ("repository", "id"),
+    "base_repo_id": ("repository", "id"),
+    "head_repo_id": ("repository", "id"),
+    "repository_id": ("repository", "id"),
+    "issue_id": ("issue", "id"),
+    "comment_id": ("comment", "id"),
+    "review_id": ("review", "id"),
+    "release_id": ("release", "id"),
+    "project_id": ("project", "id"),
+    "hook_id": ("webhook", "id"),
+}
+
+_graph_cache = {}
+_graph_cache_lock = threading.Lock()
+
+
+class SchemaGraph:
+    """Граф ссылок между таблицами: дочерняя таблица -> родительские"""
+    
+    def __init__(self, references, root="repository"):
+        """
+        Строит граф, оставляя только таблицы, зависящие от корневой
+        
+        Args:
+            references: Ссылки (child_table, child_column, parent_table, parent_column)
+            root: Корневая таблица, строки которой удаляются
+        """
+        self.root = root
+        self.parents = {}
+        self.dropped = []
+        
+        children = {}
+        for child, column, parent, parent_column in references:
+            if child == parent:
+                continue
+            children.setdefault(parent, set()).add(child)
+            edges = self.parents.setdefault(child, [])
+            if (column, parent, parent_column) not in edges:
+                edges.append((column, parent, parent_column))
+        
+        reachable = {root}
+        pending = [root]
+        while pending:
+            for child in children.get(pending.pop(), ()):
+                if child not in reachable:
+                    reachable.add(child)
+                    pending.append(child)
+        
+        self.parents = {
+            child: [edge for edge in edges if edge[1] in reachable]
+            for child, edges in self.parents.items()
+            if child in reachable and child != root
+        }
+        self._drop_cycles(children)
+        self.levels = self._compute_levels()
+    
+    @classmethod
+    def discover(cls, columns, foreign_keys=(), conventions=None, root="repository"):
+        """
+        Строит граф по объявленным внешним ключам и соглашениям об именах столбцов
+        
+        Args:
+            columns: Словарь table -> множество столбцов
+            foreign_keys: Объявленные ключи (child_table, child_column, parent_table, parent_column)
+            conventions: Словарь column -> (parent_table, parent_column), по умолчанию GITEA_COLUMN_REFERENCES
+            root: Корневая таблица
+        """
+        if conventions is None:
+            conventions = GITEA_COLUMN_REFERENCES
+        
+        references = list(foreign_keys)
+        for table, table_columns in columns.items():
+            for column in table_columns:
+                parent, parent_column = conventions.get(column, (None, None))
+                if parent is not None and parent_column in columns.get(parent, ()):
+                    references.append((table, column, parent, parent_column))
+        
+        return cls(references, root=root)
+    
+    def delete_levels(self):
+        """
+        Возвращает порядок удаления: уровни от самых глубоких зависимых таблиц к корню
+        
+        Корневая таблица в результат не входит. Таблицы одного уровня друг от друга не зависят.
+        
+        Returns:
+            list: Список уровней, каждый - отсортированный список таблиц
+        """
+        by_level = {}
+        for table, level in self.levels.items():
+            by_level.setdefault(level, []).append(table)
+        return [sorted(by_level[level]) for level in sorted(by_level, reverse=True)]
+    
+    def condition(self, table, root_ids_sql, quote):
+        """
+        Возвращает условие отбора удаляемых строк таблицы через вложенные подзапросы к родителям
+        
+        Args:
+            table: Имя таблицы
+            root_ids_sql: Подзапрос, возвращающий id удаляемых строк корневой таблицы
+            quote: Функция экранирования имен
+        """
+        return " OR ".join(
+            f"{quote(column)} IN ({self._selection(parent, parent_column, root_ids_sql, quote)})"
+            for column, parent, parent_column in self.parents[table]
+        )
+    
+    def _selection(self, table, column, root_ids_sql, quote):
+        """Возвращает подзапрос значений столбца у удаляемых строк таблицы"""
+        if table == self.root:
+            if column == "id":
+                return root_ids_sql
+            return f"SELECT {quote(column)} FROM {quote(table)} WHERE {quote('id')} IN ({root_ids_sql})"
+        
+        condition = self.condition(table, root_ids_sql, quote)
+        return f"SELECT {quote(column)} FROM {quote(table)} WHERE {condition}"
+    
+    def _drop_cycles(self, children):
+        """Убирает ссылки, замыкающие циклы, чтобы граф можно было упорядочить"""
+        state = {}
+        stack = [(self.root, iter(sorted(children.get(self.root, ()))))]
+        state[self.root] = "active"
+        
+        while stack:
+            parent, iterator = stack[-1]
+            child = next(iterator, None)
+            if child is None:
+                state[parent] = "done"
+                stack.pop()
+                continue
+            if child not in self.parents:
+                continue
+            if state.get(child) == "active":
+                self.dropped.extend((child, edge) for edge in self.parents[child] if edge[1] == parent)
+                self.parents[child] = [edge for edge in self.parents[child] if edge[1] != parent]
+            elif child not in state:
+                state[child] = "active"
+                stack.append((child, iter(sorted(children.get(child, ())))))
+    
+    def _compute_levels(self):
+        """Вычисляет уровень таблицы как длину самого длинного пути до корня"""
+        levels = {}
+        
+        def level_of(table):
+            if table == self.root:
+                return 0
+            if table not in levels:
+                levels[table] = 1 + max(level_of(parent) for _, parent, _ in self.parents[table])
+            return levels[table]
+        
+        for table in list(self.parents):
+            if not self.parents[table]:
+                del self.parents[table]
+        for table in self.parents:
+            level_of(table)
+        return levels
+
+
+def get_schema_graph(key, build):
+    """
+    Возвращает граф схемы из кэша или строит его
+    
+    Args:
+        key: Ключ базы данных (тип СУБД, сервер, имя базы)
+        build: Функция без аргументов, строящая SchemaGraph
+    """
+    with _graph_cache_lock:
+        graph = _graph_cache.get(key)
+    if graph is None:
+        graph = build()
+        with _graph_cache_lock:
+            graph = _graph_cache.setdefault(key, graph)
+    return graph
+
+
+def clear_schema_graph_cache(key=None):
+    """
+    Сбрасывает кэш графов схемы (например, после обновления Gitea)
+    
+    Args:
+        key: Ключ базы данных или None, чтобы сбросить кэш целиком
+    """
+    with _graph_cache_lock:
+        if key is None:
+            _graph_cache.clear()
+        else:
+            _graph_cache.pop(key, None)
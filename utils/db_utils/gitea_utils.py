@@ -1,8 +1,29 @@
 """
 Утилиты для работы с базой данных Gitea
 """
+import time
 from .mssql_utils import MSSQLConnection
 from .postgres_utils import PostgresConnection
+from .owner_matcher import NamesOwnerMatcher, cabinet_owner_matcher
+from .gitea_schema import SchemaGraph, get_schema_graph
+
+
+class _RateLimiter:
+    """Ограничивает среднюю скорость удаления строк"""
+    
+    def __init__(self, rows_per_second=None):
+        self.rows_per_second = rows_per_second
+        self.started_at = time.monotonic()
+        self.rows = 0
+    
+    def wait(self, rows):
+        """Учитывает удаленные строки и ждет, если скорость превышает ограничение"""
+        self.rows += rows
+        if not self.rows_per_second:
+            return
+        delay = self.rows / self.rows_per_second - (time.monotonic() - self.started_at)
+        if delay > 0:
+            time.sleep(delay)
 
 
 class GiteaDBCleaner:
@@ -24,6 +45,7 @@ class GiteaDBCleaner:
             raise ValueError("Поддерживаются только 'mssql' и 'postgres'")
         
         self.is_connected = False
+        self._schema_key = None
     
     def connect_mssql(self, server=None, database="gitea", username=None, password=None, trusted_connection=True):
         """
@@ -48,6 +70,7 @@ class GiteaDBCleaner:
                 trusted_connection=trusted_connection
             )
             self.is_connected = True
+            self._schema_key = ("mssql", server, database)
             return True, "Соединение с MS SQL Server успешно установлено"
         except Exception as e:
             self.is_connected = False
@@ -101,6 +124,7 @@ class GiteaDBCleaner:
                 use_ssl=use_ssl
             )
             self.is_connected = True
+            self._schema_key = ("postgres", host, port, database)
             return True, f"Соединение с PostgreSQL успешно установлено ({host}:{port}/{database})"
         except ImportError as e:
             self.is_connected = False
@@ -175,6 +199,7 @@ class GiteaDBCleaner:
         if self.connection:
             self.connection.disconnect()
         self.is_connected = False
+        self._schema_key = None
     
     def test_gitea_tables(self):
         """
@@ -209,7 +234,7 @@ class GiteaDBCleaner:
             result = self.connection.execute_query(query)
             
             if result is not None and not result.empty:
-                found_tables = result.iloc[:, 0].tolist()
+                found_tables = result.column(0)
                 missing_tables = [table for table in required_tables if table not in found_tables]
                 
                 if missing_tables:
@@ -222,12 +247,13 @@ class GiteaDBCleaner:
         except Exception as e:
             return False, f"Ошибка при проверке таблиц: {str(e)}", None
     
-    def get_repositories_by_cabinet(self, cabinet_number):
+    def get_repositories_by_cabinet(self, cabinet_number, matcher=None):
         """
         Получает список репозиториев, принадлежащих пользователям с номером кабинета
         
         Args:
             cabinet_number: Номер кабинета (например, "224")
+            matcher: Условие отбора владельцев OwnerMatcher (по умолчанию имена с префиксом "224-")
             
         Returns:
             tuple: (success, message, repositories_list)
@@ -236,53 +262,26 @@ class GiteaDBCleaner:
             return False, "Не подключено к базе данных", []
         
         try:
-            cabinet_str = str(cabinet_number)
-            
-            # Ищем репозитории по владельцу (owner_name):
-            # 224-user-1, 224-user-2, 224-student-5, etc.
-            if self.db_type == "mssql":
-                query = """
-                SELECT r.id, r.name, r.description, u.name as owner_name
-                FROM repository r
-                LEFT JOIN [user] u ON r.owner_id = u.id
-                WHERE u.name LIKE ? OR u.name LIKE ? OR u.name LIKE ? OR u.name LIKE ?
-                ORDER BY u.name, r.name
-                """
-                # Универсальные паттерны поиска для всех возможных форматов с номером кабинета
-                params = [
-                    f"{cabinet_str}-%",      # 224-user-1, 224-student-5
-                    f"{cabinet_str}_%",      # 224_user_1
-                    f"{cabinet_str}%",       # 224meme, 224anything
-                    f"%{cabinet_str}%"       # любой префикс + 224 + любой суффикс (user224, admin224meme, etc.)
-                ]
-            else:  # postgres
-                query = """
-                SELECT r.id, r.name, r.description, u.name as owner_name
-                FROM repository r
-                LEFT JOIN "user" u ON r.owner_id = u.id
-                WHERE u.name ~ %s
-                ORDER BY u.name, r.name
-                """
-                # Универсальное регулярное выражение для PostgreSQL
-                # Ищет ВСЕ возможные форматы с номером кабинета:
-                # - 224-user-*, 224-student-*, 224_user_*, 224meme, 224anything
-                # - user224, admin224, student224, test224meme
-                # - любые комбинации с номером кабинета в любой позиции
-                pattern = f".*{cabinet_str}.*"
-                params = [pattern]
-            
-            result = self.connection.execute_query(query, params)
+            owner_filter, params = self._cabinet_owner_filter(cabinet_number, matcher)
+            query = f"""
+            SELECT r.id, r.name, r.description, u.name as owner_name
+            FROM {self._quote('user')} u
+            INNER JOIN repository r ON r.owner_id = u.id
+            WHERE {owner_filter}
+            ORDER BY u.name, r.name
+            """
             
-            if result is not None and not result.empty:
-                repositories = []
-                for _, row in result.iterrows():
+            repositories = []
+            for batch in self.connection.execute_stream(query, params):
+                for repo_id, name, description, owner_name in batch:
                     repositories.append({
-                        'id': row['id'],
-                        'name': row['name'], 
-                        'description': row['description'] if row['description'] else '',
-                        'owner': row['owner_name'] if row['owner_name'] else 'Unknown'
+                        'id': repo_id,
+                        'name': name, 
+                        'description': description if description else '',
+                        'owner': owner_name if owner_name else 'Unknown'
                     })
-                
+            
+            if repositories:
                 return True, f"Найдено {len(repositories)} репозиториев пользователей кабинета {cabinet_number}", repositories
             else:
                 return True, f"Репозитории пользователей кабинета {cabinet_number} не найдены", []
@@ -290,112 +289,297 @@ class GiteaDBCleaner:
         except Exception as e:
             return False, f"Ошибка при поиске репозиториев: {str(e)}", []
     
-    def delete_repositories_by_cabinet(self, cabinet_number):
+    def get_repositories_by_owners(self, owner_names):
         """
-        Удаляет все репозитории, которые начинаются с номера кабинета
+        Получает репозитории указанных владельцев с размером, веткой по умолчанию и временем последнего изменения
+        
+        Используется для клонирования: один запрос вместо обращения к API для каждого пользователя.
+        
+        Args:
+            owner_names: Имена владельцев
+            
+        Returns:
+            tuple: (success, message, repositories_list), список отсортирован по убыванию размера
+        """
+        if not self.is_connected:
+            return False, "Не подключено к базе данных", []
+        
+        try:
+            owner_filter, params = NamesOwnerMatcher(owner_names).condition(self.db_type, alias="u")
+            query = f"""
+            SELECT u.name, r.name, r.size, r.updated_unix, r.default_branch
+            FROM {self._quote('user')} u
+            INNER JOIN repository r ON r.owner_id = u.id
+            WHERE {owner_filter}
+            ORDER BY r.size DESC, u.name, r.name
+            """
+            
+            repositories = []
+            for batch in self.connection.execute_stream(query, params):
+                for owner_name, name, size, updated_unix, default_branch in batch:
+                    repositories.append({
+                        'owner': owner_name,
+                        'name': name,
+                        'size': size or 0,
+                        'updated_unix': updated_unix,
+                        'default_branch': default_branch
+                    })
+            
+            return True, f"Найдено {len(repositories)} репозиториев", repositories
+            
+        except Exception as e:
+            return False, f"Ошибка при поиске репозиториев: {str(e)}", []
+    
+    def delete_repositories_by_cabinet(self, cabinet_number, matcher=None):
+        """
+        Удаляет все репозитории пользователей кабинета
         
         Args:
             cabinet_number: Номер кабинета (например, "224")
+            matcher: Условие отбора владельцев OwnerMatcher (по умолчанию имена с префиксом "224-")
             
         Returns:
             tuple: (success, message, deleted_count)
         """
+        success, message, report = self.purge_repositories_by_cabinet(cabinet_number, matcher)
+        return success, message, len(report['repositories'])
+    
+    def purge_repositories_by_cabinet(self, cabinet_number, matcher=None, chunk_size=None,
+                                      rows_per_second=None, progress_callback=None):
+        """
+        Удаляет репозитории пользователей кабинета и связанные с ними записи
+        
+        Идентификаторы репозиториев один раз собираются во временную таблицу. Зависимые таблицы
+        очищаются по уровням графа схемы (см. get_schema_graph), начиная с самых глубоких:
+        каждая таблица - одним DELETE с вложенными подзапросами к родительским таблицам.
+        
+        По умолчанию все выполняется в одной транзакции: при ошибке не удаляется ничего.
+        С chunk_size строки удаляются порциями (DELETE TOP (n) в MS SQL Server, пакеты по ctid
+        в PostgreSQL) с фиксацией после каждой порции, чтобы не держать блокировки на живом
+        экземпляре Gitea. При ошибке в этом режиме отменяется только текущая порция.
+        
+        Args:
+            cabinet_number: Номер кабинета (например, "224")
+            matcher: Условие отбора владельцев OwnerMatcher (по умолчанию имена с префиксом "224-")
+            chunk_size: Максимальное количество строк в одной порции (None - одной транзакцией)
+            rows_per_second: Ограничение скорости удаления в строках в секунду (None - без ограничения), только вместе с chunk_size
+            progress_callback: Функция progress_callback(table, deleted, table_total),
+                вызывается после каждой порции
+            
+        Returns:
+            tuple: (success, message, report), где report - словарь с ключами
+                repositories (список удаленных репозиториев) и counts (удалено строк по таблицам)
+        """
+        report = {'repositories': [], 'counts': {}}
+        
         if not self.is_connected:
-            return False, "Не подключено к базе данных", 0
+            return False, "Не подключено к базе данных", report
+        
+        connection = self.connection.connection
+        cursor = connection.cursor()
+        rate_limiter = _RateLimiter(rows_per_second)
+        
+        def delete_rows(table, condition, returning=None):
+            total, returned = 0, []
+            query = self._build_delete(table, condition, chunk_size, returning)
+            while True:
+                cursor.execute(query)
+                if returning:
+                    rows = cursor.fetchall()
+                    returned.extend(rows)
+                    deleted = len(rows)
+                else:
+                    deleted = cursor.rowcount
+                total += deleted
+                report['counts'][table] = total
+                
+                if chunk_size:
+                    connection.commit()
+                    rate_limiter.wait(deleted)
+                if progress_callback:
+                    progress_callback(table, deleted, total)
+                if not chunk_size or deleted < chunk_size:
+                    return returned
         
         try:
-            # Сначала получаем список репозиториев для удаления
-            success, message, repositories = self.get_repositories_by_cabinet(cabinet_number)
+            graph = self.get_schema_graph()
+            ids_table = self._create_purge_ids_table(cursor)
             
-            if not success:
-                return False, message, 0
+            owner_filter, params = self._cabinet_owner_filter(cabinet_number, matcher)
+            cursor.execute(f"""
+                INSERT INTO {ids_table} (id)
+                SELECT r.id
+                FROM {self._quote('user')} u
+                INNER JOIN repository r ON r.owner_id = u.id
+                WHERE {owner_filter}
+            """, params)
+            if chunk_size:
+                connection.commit()
             
-            if not repositories:
-                return True, f"Репозитории для кабинета {cabinet_number} не найдены", 0
+            root_ids_sql = f"SELECT id FROM {ids_table}"
+            for level in graph.delete_levels():
+                for table in level:
+                    delete_rows(table, graph.condition(table, root_ids_sql, self._quote))
             
-            deleted_count = 0
-            errors = []
+            deleted_repositories = delete_rows(
+                'repository', f"id IN ({root_ids_sql})", returning=('id', 'owner_name', 'name')
+            )
+            report['repositories'] = [
+                {'id': repo_id, 'owner': owner_name, 'name': name}
+                for repo_id, owner_name, name in deleted_repositories
+            ]
             
-            # Удаляем репозитории по одному
-            for repo in repositories:
-                try:
-                    repo_id = repo['id']
-                    repo_name = repo['name']
-                    
-                    # Начинаем транзакцию для каждого репозитория
-                    if self.db_type == "mssql":
-                        # Удаляем связанные записи из других таблиц
-                        queries = [
-                            "DELETE FROM access WHERE repo_id = ?",
-                            "DELETE FROM collaboration WHERE repo_id = ?", 
-                            "DELETE FROM issue WHERE repo_id = ?",
-                            "DELETE FROM pull_request WHERE base_repo_id = ? OR head_repo_id = ?",
-                            "DELETE FROM release WHERE repo_id = ?",
-                            "DELETE FROM star WHERE repo_id = ?",
-                            "DELETE FROM watch WHERE repo_id = ?",
-                            "DELETE FROM webhook WHERE repo_id = ?",
-                            "DELETE FROM action WHERE repo_id = ?",
-                            "DELETE FROM repository WHERE id = ?"
-                        ]
-                        
-                        # Выполняем удаление связанных записей
-                        for query in queries[:-1]:  # Все кроме последнего
-                            try:
-                                if "pull_request" in query:
-                                    self.connection.execute_query(query, [repo_id, repo_id], commit=True)
-                                else:
-                                    self.connection.execute_query(query, [repo_id], commit=True)
-                            except Exception:
-                                # Игнорируем ошибки для таблиц, которых может не быть
-                                pass
-                        
-                        # Удаляем сам репозиторий
-                        self.connection.execute_query(queries[-1], [repo_id], commit=True)
-                        
-                    else:  # postgres
-                        # Удаляем связанные записи из других таблиц
-                        queries = [
-                            "DELETE FROM access WHERE repo_id = %s",
-                            "DELETE FROM collaboration WHERE repo_id = %s",
-                            "DELETE FROM issue WHERE repo_id = %s", 
-                            "DELETE FROM pull_request WHERE base_repo_id = %s OR head_repo_id = %s",
-                            "DELETE FROM release WHERE repo_id = %s",
-                            "DELETE FROM star WHERE repo_id = %s",
-                            "DELETE FROM watch WHERE repo_id = %s",
-                            "DELETE FROM webhook WHERE repo_id = %s",
-                            "DELETE FROM action WHERE repo_id = %s",
-                            "DELETE FROM repository WHERE id = %s"
-                        ]
-                        
-                        # Выполняем удаление связанных записей
-                        for query in queries[:-1]:  # Все кроме последнего
-                            try:
-                                if "pull_request" in query:
-                                    self.connection.execute_query(query, [repo_id, repo_id], commit=True)
-                                else:
-                                    self.connection.execute_query(query, [repo_id], commit=True)
-                            except Exception:
-                                # Игнорируем ошибки для таблиц, которых может не быть
-                                pass
-                        
-                        # Удаляем сам репозиторий
-                        self.connection.execute_query(queries[-1], [repo_id], commit=True)
-                    
-                    deleted_count += 1
-                    print(f"Удален репозиторий: {repo_name} (ID: {repo_id})")
-                    
-                except Exception as e:
-                    error_msg = f"Ошибка при удалении репозитория {repo_name}: {str(e)}"
-                    errors.append(error_msg)
-                    print(error_msg)
+            cursor.execute(f"DROP TABLE {ids_table}")
+            connection.commit()
             
-            if errors:
-                error_summary = f"Удалено {deleted_count} репозиториев. Ошибки: {'; '.join(errors[:3])}"
-                if len(errors) > 3:
-                    error_summary += f" и еще {len(errors) - 3} ошибок"
-                return True, error_summary, deleted_count
-            else:
-                return True, f"Успешно удалено {deleted_count} репозиториев для кабинета {cabinet_number}", deleted_count
-                
         except Exception as e:
-            return False, f"Критическая ошибка при удалении репозиториев: {str(e)}", 0
+            connection.rollback()
+            if chunk_size:
+                return False, f"Очистка прервана, уже удаленные порции не восстанавливаются: {str(e)}", report
+            report['counts'] = {}
+            return False, f"Ошибка при удалении репозиториев, изменения отменены: {str(e)}", report
+        
+        finally:
+            cursor.close()
+        
+        deleted_count = len(report['repositories'])
+        if not deleted_count:
+            return True, f"Репозитории для кабинета {cabinet_number} не найдены", report
+        
+        related_count = sum(count for table, count in report['counts'].items() if table != 'repository')
+        return True, (
+            f"Успешно удалено {deleted_count} репозиториев для кабинета {cabinet_number} "
+            f"и {related_count} связанных записей"
+        ), report
+    
+    def _build_delete(self, table, condition, chunk_size=None, returning=None):
+        """
+        Строит DELETE по условию, при chunk_size - удаляющий не больше chunk_size строк
+        
+        Args:
+            table: Имя таблицы
+            condition: Условие отбора строк
+            chunk_size: Максимальное количество строк за один запуск (None - без ограничения)
+            returning: Столбцы удаленных строк, которые нужно вернуть (OUTPUT/RETURNING)
+        """
+        quoted_table = self._quote(table)
+        
+        if self.db_type == "mssql":
+            top = f" TOP ({int(chunk_size)})" if chunk_size else ""
+            output = ""
+            if returning:
+                output = " OUTPUT " + ", ".join(f"deleted.{self._quote(column)}" for column in returning)
+            return f"DELETE{top} FROM {quoted_table}{output} WHERE {condition}"
+        
+        # PostgreSQL не поддерживает DELETE ... LIMIT, порция отбирается по физическому адресу строки
+        if chunk_size:
+            condition = (
+                f"ctid = ANY(ARRAY(SELECT ctid FROM {quoted_table} WHERE {condition} LIMIT {int(chunk_size)}))"
+            )
+        query = f"DELETE FROM {quoted_table} WHERE {condition}"
+        if returning:
+            query += " RETURNING " + ", ".join(self._quote(column) for column in returning)
+        return query
+    
+    def _quote(self, name):
+        """Экранирует имя таблицы или столбца для текущей СУБД"""
+        if self.db_type == "mssql":
+            return f"[{name}]"
+        return f'"{name}"'
+    
+    def _cabinet_owner_filter(self, cabinet_number, matcher=None):
+        """
+        Возвращает условие отбора владельцев репозиториев кабинета
+        
+        Условие ссылается на таблицу пользователей под псевдонимом u.
+        
+        Args:
+            cabinet_number: Номер кабинета (например, "224")
+            matcher: Условие отбора владельцев OwnerMatcher (по умолчанию имена с префиксом "224-")
+        
+        Returns:
+            tuple: (sql_condition, params)
+        """
+        if matcher is None:
+            matcher = cabinet_owner_matcher(cabinet_number)
+        return matcher.condition(self.db_type, alias="u")
+    
+    def _create_purge_ids_table(self, cursor):
+        """
+        Создает временную таблицу для идентификаторов удаляемых репозиториев
+        
+        Returns:
+            str: Имя временной таблицы
+        """
+        if self.db_type == "mssql":
+            cursor.execute("IF OBJECT_ID('tempdb..#purge_repo_ids') IS NOT NULL DROP TABLE #purge_repo_ids")
+            cursor.execute("CREATE TABLE #purge_repo_ids (id BIGINT PRIMARY KEY)")
+            return "#purge_repo_ids"
+        
+        # Таблица переживает фиксации между порциями, поэтому удаляется явно в конце очистки
+        cursor.execute("DROP TABLE IF EXISTS purge_repo_ids")
+        cursor.execute("CREATE TEMP TABLE purge_repo_ids (id BIGINT PRIMARY KEY)")
+        return "purge_repo_ids"
+    
+    def get_schema_graph(self):
+        """
+        Возвращает граф зависимостей таблиц от repository
+        
+        Граф строится по объявленным внешним ключам и соглашениям об именах столбцов Gitea
+        (GITEA_COLUMN_REFERENCES) и кэшируется на уровне модуля для каждой базы данных,
+        поэтому повторные очистки не читают схему заново.
+        
+        Returns:
+            SchemaGraph: Граф схемы
+        """
+        return get_schema_graph(self._schema_key, self._discover_schema_graph)
+    
+    def _discover_schema_graph(self):
+        """Читает столбцы и внешние ключи текущей схемы и строит граф"""
+        if self.db_type == "mssql":
+            columns_query = """
+            SELECT c.TABLE_NAME, c.COLUMN_NAME
+            FROM INFORMATION_SCHEMA.COLUMNS c
+            INNER JOIN INFORMATION_SCHEMA.TABLES t
+                ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+            WHERE c.TABLE_SCHEMA = SCHEMA_NAME() AND t.TABLE_TYPE = 'BASE TABLE'
+            """
+            foreign_keys_query = """
+            SELECT OBJECT_NAME(fkc.parent_object_id), pc.name, OBJECT_NAME(fkc.referenced_object_id), rc.name
+            FROM sys.foreign_key_columns fkc
+            INNER JOIN sys.columns pc
+                ON pc.object_id = fkc.parent_object_id AND pc.column_id = fkc.parent_column_id
+            INNER JOIN sys.columns rc
+                ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+            WHERE OBJECT_SCHEMA_NAME(fkc.parent_object_id) = SCHEMA_NAME()
+            """
+        else:  # postgres
+            columns_query = """
+            SELECT c.table_name, c.column_name
+            FROM information_schema.columns c
+            INNER JOIN information_schema.tables t
+                ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+            WHERE c.table_schema = current_schema() AND t.table_type = 'BASE TABLE'
+            """
+            foreign_keys_query = """
+            SELECT cl.relname, a.attname, rcl.relname, ra.attname
+            FROM pg_constraint con
+            INNER JOIN pg_class cl ON cl.oid = con.conrelid
+            INNER JOIN pg_class rcl ON rcl.oid = con.confrelid
+            CROSS JOIN LATERAL unnest(con.conkey, con.confkey) AS k(attnum, ref_attnum)
+            INNER JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attnum = k.attnum
+            INNER JOIN pg_attribute ra ON ra.attrelid = con.confrelid AND ra.attnum = k.ref_attnum
+            WHERE con.contype = 'f'
+            AND cl.relnamespace = (SELECT oid FROM pg_namespace WHERE nspname = current_schema())
+            """
+        
+        columns = {}
+        for batch in self.connection.execute_stream(columns_query):
+            for table, column in batch:
+                columns.setdefault(table, set()).add(column)
+        
+        foreign_keys = []
+        for batch in self.connection.execute_stream(foreign_keys_query):
+            foreign_keys.extend(tuple(row) for row in batch)
+        
+        return SchemaGraph.discover(columns, foreign_keys)
@@ -1,13 +1,107 @@
 """
 Утилиты для работы с MS SQL Server
 """
+import ntpath
+import posixpath
 import pyodbc
 from .base import DBConnection
+from .parallel import run_parallel
+
+
+# Удаление всех внешних ключей и таблиц базы данных одним пакетом.
+# Каждый объект удаляется в своем TRY/CATCH, ошибки возвращаются последним SELECT.
+DROP_ALL_TABLES_BATCH = """
+SET NOCOUNT ON;
+USE [{database}];
+
+DECLARE @statements TABLE (id int IDENTITY(1, 1) PRIMARY KEY, object_name nvarchar(800), statement nvarchar(max));
+DECLARE @errors TABLE (object_name nvarchar(800), error nvarchar(4000));
+DECLARE @id int = 0, @object_name nvarchar(800), @statement nvarchar(max), @fatal nvarchar(4000);
+
+INSERT INTO @statements (object_name, statement)
+SELECT
+    QUOTENAME(OBJECT_SCHEMA_NAME(fk.parent_object_id)) + N'.' + QUOTENAME(OBJECT_NAME(fk.parent_object_id)) + N'.' + QUOTENAME(fk.name),
+    N'ALTER TABLE ' + QUOTENAME(OBJECT_SCHEMA_NAME(fk.parent_object_id)) + N'.' + QUOTENAME(OBJECT_NAME(fk.parent_object_id)) +
+    N' DROP CONSTRAINT ' + QUOTENAME(fk.name)
+FROM sys.foreign_keys fk;
+
+INSERT INTO @statements (object_name, statement)
+SELECT
+    QUOTENAME(s.name) + N'.' + QUOTENAME(t.name),
+    N'DROP TABLE ' + QUOTENAME(s.name) + N'.' + QUOTENAME(t.name)
+FROM sys.tables t
+INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+WHERE t.is_ms_shipped = 0;
+
+WHILE 1 = 1
+BEGIN
+    SELECT TOP (1) @id = id, @object_name = object_name, @statement = statement
+    FROM @statements
+    WHERE id > @id
+    ORDER BY id;
+
+    IF @@ROWCOUNT = 0
+        BREAK;
+
+    BEGIN TRY
+        EXEC sp_executesql @statement;
+    END TRY
+    BEGIN CATCH
+        IF XACT_STATE() = -1
+        BEGIN
+            -- Транзакция больше не может фиксировать изменения, дальше продолжать нельзя
+            SET @fatal = ERROR_MESSAGE();
+            BREAK;
+        END;
+        INSERT INTO @errors (object_name, error) VALUES (@object_name, ERROR_MESSAGE());
+    END CATCH;
+END;
+
+SELECT object_name, error FROM @errors
+UNION ALL
+SELECT @object_name, @fatal WHERE @fatal IS NOT NULL;
+"""
+
+# Восстановление базы из снимка одним пакетом: между переводом в однопользовательский режим
+# и RESTORE нет паузы, в которую переподключившийся клиент мог бы занять единственное соединение.
+# Многопользовательский режим возвращается и при ошибке восстановления.
+RESTORE_SNAPSHOT_BATCH = """
+SET NOCOUNT ON;
+ALTER DATABASE [{database}] SET SINGLE_USER WITH ROLLBACK IMMEDIATE;
+BEGIN TRY
+    RESTORE DATABASE [{database}] FROM DATABASE_SNAPSHOT = N'{snapshot}';
+END TRY
+BEGIN CATCH
+    ALTER DATABASE [{database}] SET MULTI_USER;
+    THROW;
+END CATCH;
+ALTER DATABASE [{database}] SET MULTI_USER;
+"""
+
+
+def _clean_database_name(database_name):
+    """Приводит имя базы данных, пришедшее из списка, к обычной строке"""
+    if isinstance(database_name, tuple):
+        database_name = database_name[0]
+    
+    if isinstance(database_name, str):
+        database_name = database_name.replace("\\", "").replace("'", "")
+        if database_name.startswith("(") and database_name.endswith(")"):
+            database_name = database_name[1:-1]
+        if database_name.endswith(","):
+            database_name = database_name[:-1]
+    
+    return database_name
 
 
 class MSSQLConnection(DBConnection):
     """Класс для подключения к MS SQL Server"""
     
+    ALL_DATABASES_QUERY = (
+        "SELECT name FROM sys.databases "
+        "WHERE name NOT IN ('master', 'tempdb', 'model', 'msdb') AND source_database_id IS NULL"
+    )
+    
     def __init__(self):
         super().__init__()
         
@@ -45,8 +139,12 @@ class MSSQLConnection(DBConnection):
     
     def get_all_databases(self):
         """Получает список всех баз данных на сервере"""
-        query = "SELECT name FROM sys.databases WHERE name NOT IN ('master', 'tempdb', 'model', 'msdb')"
-        return self.execute_query(query)
+        return self.execute_query(self.ALL_DATABASES_QUERY)
+    
+    def stream_all_databases(self, batch_size=500):
+        """Отдает имена всех баз данных на сервере пачками"""
+        for batch in self.execute_stream(self.ALL_DATABASES_QUERY, batch_size=batch_size):
+            yield [row[0] for row in batch]
     
     def get_all_tables(self, database=None):
         """Получает список всех таблиц в текущей или указанной базе данных"""
@@ -70,6 +168,8 @@ class MSSQLCleaner:
         """
         self.connection = connection or MSSQLConnection()
         self.is_connected = False
+        self.last_error = None
+        self.connect_params = {}
         
     def connect(self, server=None, username=None, password=None, trusted_connection=True):
         """
@@ -84,14 +184,15 @@ class MSSQLCleaner:
         Returns:
             True если соединение успешно
         """
+        self.connect_params = {
+            "server": server,
+            "username": username,
+            "password": password,
+            "trusted_connection": trusted_connection
+        }
+        
         try:
-            self.connection.connect(
-                server=server,
-                database="master",
-                username=username,
-                password=password,
-                trusted_connection=trusted_connection
-            )
+            self.connection.connect(database="master", **self.connect_params)
             self.is_connected = True
             return True
         except Exception as e:
@@ -111,12 +212,12 @@ class MSSQLCleaner:
             pattern: Шаблон для поиска баз данных (по умолчанию 'user224-%')
             
         Returns:
-            DataFrame с именами баз данных
+            QueryResult с именами баз данных
         """
         if not self.is_connected:
             raise ConnectionError("Not connected to the database server")
             
-        query = f"SELECT name FROM sys.databases WHERE name LIKE '{pattern}'"
+        query = f"SELECT name FROM sys.databases WHERE name LIKE '{pattern}' AND source_database_id IS NULL"
         return self.connection.execute_query(query)
         
     def get_user_databases_in_range(self, start=1, end=20, prefix="user224-"):
@@ -135,7 +236,11 @@ class MSSQLCleaner:
         
     def drop_all_tables_in_database(self, database_name):
         """
-        Удаляет все таблицы в указанной базе данных, используя SQL-запросы для получения и удаления внешних ключей
+        Удаляет все таблицы в указанной базе данных
+        
+        Внешние ключи и таблицы удаляются одним пакетом T-SQL, собранным из
+        sys.foreign_keys и sys.tables, в одной транзакции за один запрос к серверу.
+        Ошибки собираются по каждому объекту; при любой ошибке транзакция откатывается.
         
         Args:
             database_name: Имя базы данных
@@ -146,92 +251,27 @@ class MSSQLCleaner:
         if not self.is_connected:
             raise ConnectionError("Not connected to the database server")
             
-        if isinstance(database_name, tuple):
-            database_name = database_name[0] 
-        
-        if isinstance(database_name, str):
-            database_name = database_name.replace("\\", "").replace("'", "")
-            if database_name.startswith("(") and database_name.endswith(")"):
-                database_name = database_name[1:-1]
-            if database_name.endswith(","):
-                database_name = database_name[:-1]
+        database_name = _clean_database_name(database_name)
+        conn = None
         
         try:
             conn = self.connection.connection
             cursor = conn.cursor()
             
-            cursor.execute(f"USE [{database_name}]")
-            conn.commit()
-
-            cursor.execute("EXEC sp_MSforeachtable 'DISABLE TRIGGER ALL ON ?'")
-            conn.commit()
-
-            cursor.execute("""
-                SELECT 
-                    t.name AS table_name,
-                    s.name AS schema_name,
-                    t.object_id AS table_object_id
-                FROM 
-                    sys.tables t
-                    INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
-                ORDER BY
-                    t.name DESC -- Удаляем таблицы в обратном алфавитном порядке (может помочь с зависимостями)
-            """)
-            tables = cursor.fetchall()
-            
-            if not tables:
-                return True  
-            
-            for table in tables:
-                schema_name = table.schema_name
-                table_name = table.table_name
-                table_object_id = table.table_object_id
-                try:
-                    cursor.execute(f"""
-                        SELECT
-                            'ALTER TABLE [' +  OBJECT_SCHEMA_NAME(parent_object_id) +
-                            '].[' + OBJECT_NAME(parent_object_id) +
-                            '] DROP CONSTRAINT [' + name + ']' AS DropStatement
-                        FROM sys.foreign_keys
-                        WHERE referenced_object_id = {table_object_id}
-                    """)
-                    drop_statements = cursor.fetchall()
-
-                    for drop_statement in drop_statements:
-                        drop_statement_sql = drop_statement.DropStatement
-                        try:
-                            cursor.execute(drop_statement_sql)
-                            conn.commit()
-                            print(f"Внешний ключ успешно удален: {drop_statement_sql}")
-                        except Exception as e:
-                            print(f"Ошибка при удалении внешнего ключа: {drop_statement_sql}: {str(e)}")
-                            conn.rollback()
-                            return False
-
-                    drop_table_query = f"""
-                        DECLARE @sql nvarchar(max);
-                        SET @sql = N'DROP TABLE [{schema_name}].[{table_name}]';
-                        EXEC sp_executesql @sql;
-                    """
-                    try:
-                        cursor.execute(drop_table_query)
-                        conn.commit()
-                        print(f"Таблица [{schema_name}].[{table_name}] успешно удалена")
-                    except Exception as e:
-                        print(f"Ошибка при удалении таблицы [{schema_name}].[{table_name}]: {str(e)}")
-                        conn.rollback()
-                        return False
-
-                except Exception as e:
-                    print(f"Ошибка при обработке таблицы [{schema_name}].[{table_name}]: {str(e)}")
-                    conn.rollback()
-                    return False
+            cursor.execute(DROP_ALL_TABLES_BATCH.format(database=database_name.replace("]", "]]")))
+            errors = cursor.fetchall()
+            
+            if errors:
+                conn.rollback()
+                for object_name, error in errors:
+                    print(f"Ошибка при удалении {object_name or 'объекта'} в базе данных {database_name}: {error}")
+                self.last_error = "; ".join(f"{object_name}: {error}" for object_name, error in errors)
+                return False
             
-            cursor.execute("DBCC FREEPROCCACHE")
             conn.commit()
-
             return True
         except Exception as e:
+            self.last_error = str(e)
             print(f"Ошибка при удалении таблиц в базе данных {database_name}: {str(e)}")
             if conn:
                 conn.rollback()
@@ -250,19 +290,11 @@ class MSSQLCleaner:
         if not self.is_connected:
             raise ConnectionError("Not connected to the database server")
             
-        if isinstance(database_name, tuple):
-            database_name = database_name[0]
-        
-        if isinstance(database_name, str):
-            database_name = database_name.replace("\\", "").replace("'", "")
-            if database_name.startswith("(") and database_name.endswith(")"):
-                database_name = database_name[1:-1]
-            if database_name.endswith(","):
-                database_name = database_name[:-1]
+        database_name = _clean_database_name(database_name)
         
         try:
             current_db_result = self.connection.execute_query("SELECT DB_NAME() AS current_db")
-            current_db = current_db_result.iloc[0]['current_db'] if not current_db_result.empty else None
+            current_db = current_db_result.first('current_db')
             
             if current_db and str(current_db).lower() == str(database_name).lower():
                 self.connection.execute_query("USE [master]")
@@ -284,6 +316,10 @@ class MSSQLCleaner:
             conn.autocommit = True
             
             try:
+                # База со снимками не удаляется, пока снимки существуют
+                for snapshot_name in self.get_snapshots(database_name):
+                    cursor.execute(f"DROP DATABASE [{snapshot_name.replace(']', ']]')}]")
+                
                 cursor.execute(f"ALTER DATABASE [{database_name}] SET SINGLE_USER WITH ROLLBACK IMMEDIATE")
                 
                 cursor.execute(f"DROP DATABASE [{database_name}]")
@@ -293,6 +329,270 @@ class MSSQLCleaner:
                 conn.autocommit = False
                 
         except Exception as e:
+            self.last_error = str(e)
             print(f"Ошибка при удалении базы данных {database_name}: {str(e)}")
             return False
-            
\ No newline at end of file
+    
+    def _spawn(self):
+        """Создает отдельный очиститель с собственным соединением (для рабочих потоков)"""
+        cleaner = MSSQLCleaner()
+        cleaner.connect(**self.connect_params)
+        return cleaner
+    
+    def _run_parallel(self, databases, operation, max_workers):
+        """Выполняет operation(cleaner, database_name) для каждой базы в отдельном соединении"""
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        def run(database_name):
+            cleaner = self._spawn()
+            try:
+                return operation(cleaner, database_name), cleaner.last_error
+            finally:
+                cleaner.disconnect()
+        
+        return run_parallel(databases, run, max_workers)
+    
+    def drop_all_tables_in_databases(self, databases, max_workers=4):
+        """
+        Параллельно удаляет все таблицы в нескольких базах данных
+        
+        Каждый поток работает через собственное соединение pyodbc.
+        
+        Args:
+            databases: Список имен баз данных
+            max_workers: Максимальное количество одновременно очищаемых баз
+            
+        Yields:
+            Словарь с результатом по мере завершения очередной базы:
+            {"database", "success", "elapsed", "error"}
+        """
+        return self._run_parallel(
+            databases,
+            lambda cleaner, database_name: cleaner.drop_all_tables_in_database(database_name),
+            max_workers
+        )
+    
+    def drop_databases(self, databases, max_workers=4):
+        """
+        Параллельно удаляет несколько баз данных
+        
+        Args:
+            databases: Список имен баз данных
+            max_workers: Максимальное количество одновременно удаляемых баз
+            
+        Yields:
+            Словарь с результатом по мере завершения очередной базы:
+            {"database", "success", "elapsed", "error"}
+        """
+        def drop(cleaner, database_name):
+            success = cleaner.drop_database(database_name)
+            if not success and not cleaner.last_error:
+                cleaner.last_error = "База данных не найдена"
+            return success
+        
+        return self._run_parallel(databases, drop, max_workers)
+    
+    @staticmethod
+    def snapshot_name(database_name):
+        """Возвращает имя снимка для базы данных"""
+        return f"{_clean_database_name(database_name)}_snapshot"
+    
+    def get_snapshots(self, database_name):
+        """
+        Получает список снимков указанной базы данных
+        
+        Args:
+            database_name: Имя базы данных
+            
+        Returns:
+            Список имен снимков
+        """
+        result = self.connection.execute_query(
+            "SELECT name FROM sys.databases WHERE source_database_id = DB_ID(?)",
+            [_clean_database_name(database_name)]
+        )
+        return result.column(0) if result is not None else []
+    
+    def _execute_autocommit(self, *statements):
+        """Выполняет инструкции вне транзакции, дочитывая все сообщения сервера"""
+        conn = self.connection.connection
+        cursor = conn.cursor()
+        conn.autocommit = True
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+                # RESTORE и CREATE DATABASE присылают сообщения о ходе выполнения:
+                # без их вычитки инструкция может не завершиться к моменту возврата
+                while cursor.nextset():
+                    pass
+        finally:
+            conn.autocommit = False
+    
+    def create_snapshot(self, database_name):
+        """
+        Создает (или пересоздает) снимок базы данных
+        
+        Файлы снимка (*.ss) размещаются рядом с файлами данных исходной базы.
+        
+        Args:
+            database_name: Имя базы данных
+            
+        Returns:
+            True если операция успешна, иначе False
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        database_name = _clean_database_name(database_name)
+        snapshot_name = self.snapshot_name(database_name)
+        
+        try:
+            self.connection.execute_query("USE [master]")
+            
+            files = self.connection.execute_query(
+                "SELECT name, physical_name FROM sys.master_files WHERE database_id = DB_ID(?) AND type = 0",
+                [database_name]
+            )
+            if files is None or files.empty:
+                self.last_error = f"Файлы данных базы {database_name} не найдены"
+                return False
+            
+            file_specs = []
+            for logical_name, physical_name in files:
+                path = ntpath if "\\" in physical_name else posixpath
+                snapshot_file = path.join(path.dirname(physical_name), f"{snapshot_name}_{logical_name}.ss")
+                file_specs.append(
+                    f"(NAME = [{logical_name.replace(']', ']]')}], FILENAME = N'{snapshot_file.replace(chr(39), chr(39) * 2)}')"
+                )
+            
+            # Старый снимок удаляется, чтобы у базы всегда был ровно один снимок
+            statements = [
+                f"DROP DATABASE [{name.replace(']', ']]')}]" for name in self.get_snapshots(database_name)
+            ]
+            statements.append(
+                f"CREATE DATABASE [{snapshot_name.replace(']', ']]')}] ON {', '.join(file_specs)} "
+                f"AS SNAPSHOT OF [{database_name.replace(']', ']]')}]"
+            )
+            self._execute_autocommit(*statements)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Ошибка при создании снимка базы данных {database_name}: {str(e)}")
+            return False
+    
+    def restore_from_snapshot(self, database_name):
+        """
+        Возвращает базу данных к состоянию снимка
+        
+        Все сессии базы данных принудительно закрываются перед восстановлением.
+        
+        Args:
+            database_name: Имя базы данных
+            
+        Returns:
+            True если операция успешна, иначе False
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        database_name = _clean_database_name(database_name)
+        quoted_name = database_name.replace("]", "]]")
+        
+        try:
+            self.connection.execute_query("USE [master]")
+            
+            snapshots = self.get_snapshots(database_name)
+            if not snapshots:
+                self.last_error = f"Снимок базы данных {database_name} не найден"
+                return False
+            if len(snapshots) > 1:
+                self.last_error = f"У базы данных {database_name} несколько снимков: {', '.join(snapshots)}"
+                return False
+            
+            self._execute_autocommit(RESTORE_SNAPSHOT_BATCH.format(
+                database=quoted_name, snapshot=snapshots[0].replace("'", "''")
+            ))
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Ошибка при восстановлении базы данных {database_name} из снимка: {str(e)}")
+            return False
+    
+    def drop_snapshot(self, database_name):
+        """
+        Удаляет все снимки базы данных
+        
+        Args:
+            database_name: Имя базы данных
+            
+        Returns:
+            True если операция успешна, иначе False
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        try:
+            self.connection.execute_query("USE [master]")
+            self._execute_autocommit(*(
+                f"DROP DATABASE [{name.replace(']', ']]')}]" for name in self.get_snapshots(database_name)
+            ))
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Ошибка при удалении снимка базы данных {database_name}: {str(e)}")
+            return False
+    
+    def create_snapshots(self, databases, max_workers=4):
+        """
+        Параллельно создает снимки нескольких баз данных
+        
+        Args:
+            databases: Список имен баз данных
+            max_workers: Максимальное количество одновременно обрабатываемых баз
+            
+        Yields:
+            Словарь с результатом по мере завершения очередной базы:
+            {"database", "success", "elapsed", "error"}
+        """
+        return self._run_parallel(
+            databases,
+            lambda cleaner, database_name: cleaner.create_snapshot(database_name),
+            max_workers
+        )
+    
+    def restore_from_snapshots(self, databases, max_workers=4):
+        """
+        Параллельно возвращает несколько баз данных к состоянию их снимков
+        
+        Args:
+            databases: Список имен баз данных
+            max_workers: Максимальное количество одновременно обрабатываемых баз
+            
+        Yields:
+            Словарь с результатом по мере завершения очередной базы:
+            {"database", "success", "elapsed", "error"}
+        """
+        return self._run_parallel(
+            databases,
+            lambda cleaner, database_name: cleaner.restore_from_snapshot(database_name),
+            max_workers
+        )
+    
+    def drop_snapshots(self, databases, max_workers=4):
+        """
+        Параллельно удаляет снимки нескольких баз данных
+        
+        Args:
+            databases: Список имен баз данных
+            max_workers: Максимальное количество одновременно обрабатываемых баз
+            
+        Yields:
+            Словарь с результатом по мере завершения очередной базы:
+            {"database", "success", "elapsed", "error"}
+        """
+        return self._run_parallel(
+            databases,
+            lambda cleaner, database_name: cleaner.drop_snapshot(database_name),
+            max_workers
+        )
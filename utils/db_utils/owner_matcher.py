@@ -0,0 +1,135 @@
+"""
+Отбор владельцев репозиториев Gitea по имени пользователя
+"""
+
+
+class OwnerMatcher:
+    """Базовый класс условия отбора владельцев"""
+    
+    def condition(self, db_type, alias="u"):
+        """
+        Возвращает SQL условие по таблице пользователей
+        
+        Args:
+            db_type: Тип базы данных ("mssql" или "postgres")
+            alias: Псевдоним таблицы пользователей в запросе
+        
+        Returns:
+            tuple: (sql_condition, params)
+        """
+        raise NotImplementedError("Subclass must implement abstract method")
+    
+    @staticmethod
+    def _placeholder(db_type):
+        """Возвращает маркер параметра для драйвера СУБД"""
+        return "?" if db_type == "mssql" else "%s"
+
+
+class PrefixOwnerMatcher(OwnerMatcher):
+    """
+    Строгий отбор по префиксу имени: lower_name LIKE '224-%'
+    
+    Условие без ведущего шаблона, поэтому использует индекс по user.lower_name.
+    В PostgreSQL при сортировке базы, отличной от "C", для этого нужен индекс
+    с классом операторов text_pattern_ops.
+    """
+    
+    def __init__(self, prefix):
+        """
+        Args:
+            prefix: Начало имени владельца (например, "224-")
+        """
+        self.prefix = prefix.lower()
+    
+    def condition(self, db_type, alias="u"):
+        pattern = self._escape_like(self.prefix, db_type) + "%"
+        return f"{alias}.lower_name LIKE {self._placeholder(db_type)} ESCAPE '!'", [pattern]
+    
+    @staticmethod
+    def _escape_like(value, db_type):
+        """Экранирует спецсимволы LIKE символом '!'"""
+        special = "!%_[" if db_type == "mssql" else "!%_"
+        return "".join(f"!{char}" if char in special else char for char in value)
+
+
+class NamesOwnerMatcher(OwnerMatcher):
+    """Отбор по явному списку имен владельцев: lower_name IN (...)"""
+    
+    def __init__(self, names):
+        """
+        Args:
+            names: Имена владельцев
+        """
+        self.names = sorted({name.lower() for name in names})
+    
+    @classmethod
+    def from_range(cls, template, start, end):
+        """
+        Создает список имен по шаблону и диапазону номеров
+        
+        Args:
+            template: Шаблон имени с полем {n} (например, "224-user-{n}")
+            start: Первый номер
+            end: Последний номер (включительно)
+        """
+        return cls(template.format(n=n) for n in range(start, end + 1))
+    
+    def condition(self, db_type, alias="u"):
+        if not self.names:
+            return "1 = 0", []
+        placeholders = ", ".join([self._placeholder(db_type)] * len(self.names))
+        return f"{alias}.lower_name IN ({placeholders})", list(self.names)
+
+
+class RangeOwnerMatcher(OwnerMatcher):
+    """Отбор по диапазону имен владельцев: lower_name BETWEEN low AND high"""
+    
+    def __init__(self, low, high):
+        """
+        Args:
+            low: Нижняя граница имени (включительно)
+            high: Верхняя граница имени (включительно)
+        """
+        self.low = low.lower()
+        self.high = high.lower()
+    
+    def condition(self, db_type, alias="u"):
+        placeholder = self._placeholder(db_type)
+        return f"{alias}.lower_name BETWEEN {placeholder} AND {placeholder}", [self.low, self.high]
+
+
+class SubstringOwnerMatcher(OwnerMatcher):
+    """
+    Нестрогий отбор по вхождению номера кабинета в любую часть имени
+    
+    Совпадает и с лишними пользователями (1224x для кабинета 224) и всегда
+    читает таблицу пользователей целиком. Используется только по явному выбору.
+    """
+    
+    def __init__(self, cabinet_number):
+        """
+        Args:
+            cabinet_number: Номер кабинета (например, "224")
+        """
+        self.cabinet_number = str(cabinet_number)
+    
+    def condition(self, db_type, alias="u"):
+        if db_type == "mssql":
+            return f"{alias}.name LIKE ?", [f"%{self.cabinet_number}%"]
+        return f"{alias}.name ~ %s", [self.cabinet_number]
+
+
+def cabinet_owner_matcher(cabinet_number, loose=False):
+    """
+    Возвращает условие отбора владельцев кабинета
+    
+    Args:
+        cabinet_number: Номер кабинета (например, "224")
+        loose: Искать номер кабинета в любой части имени вместо префикса "224-"
+    
+    Returns:
+        OwnerMatcher: Условие отбора
+    """
+    if loose:
+        return SubstringOwnerMatcher(cabinet_number)
+    return PrefixOwnerMatcher(f"{cabinet_number}-")
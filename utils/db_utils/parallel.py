@@ -0,0 +1,79 @@
+"""
+Параллельное выполнение операций над несколькими базами данных
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+def run_parallel(databases, worker, max_workers=4):
+    """
+    Выполняет операцию для каждой базы данных в ограниченном пуле потоков
+    
+    Args:
+        databases: Список имен баз данных
+        worker: Функция worker(database_name) -> (success, error_message)
+        max_workers: Максимальное количество одновременно работающих потоков
+    
+    Yields:
+        Словарь с результатом по мере завершения очередной базы:
+        {"database", "success", "elapsed", "error"}
+    """
+    databases = list(databases)
+    if not databases:
+        return
+    
+    workers = max(1, min(int(max_workers or 1), len(databases)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-worker") as executor:
+        futures = [executor.submit(_run_timed, worker, database_name) for database_name in databases]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def parse_max_workers(value, default=1):
+    """
+    Преобразует введенное количество потоков в положительное число
+    
+    Args:
+        value: Значение из поля ввода
+        default: Значение при некорректном вводе
+    """
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def format_parallel_results(databases, results):
+    """
+    Формирует отчет по результатам run_parallel в порядке выбора баз
+    
+    Args:
+        databases: Список имен баз данных
+        results: Словарь имя базы -> результат run_parallel
+    """
+    report = ""
+    for db in databases:
+        result = results.get(db)
+        if result is None:
+            report += f"{db}: Не выполнено\n"
+        elif result["success"]:
+            report += f"{db}: Успешно ({result['elapsed']:.2f} с)\n"
+        else:
+            report += f"{db}: Ошибка ({result['elapsed']:.2f} с): {result['error']}\n"
+    return report
+
+
+def _run_timed(worker, database_name):
+    """Выполняет операцию для одной базы и замеряет время"""
+    started = time.perf_counter()
+    try:
+        success, error = worker(database_name)
+    except Exception as e:
+        success, error = False, str(e)
+    
+    return {
+        "database": database_name,
+        "success": bool(success),
+        "elapsed": time.perf_counter() - started,
+        "error": None if success else (error or "Неизвестная ошибка")
+    }
@@ -0,0 +1,265 @@
+"""
+Пул соединений с базами данных
+"""
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+
+PoolKey = namedtuple("PoolKey", ["host", "port", "database", "user", "use_ssl", "password_digest"])
+
+
+def password_digest(password):
+    """
+    Возвращает отпечаток пароля для ключа пула
+    
+    Соединения, открытые с другим паролем, попадают под другой ключ и не выдаются повторно.
+    """
+    return hashlib.sha256((password or "").encode("utf-8")).hexdigest()
+
+
+def make_pool_key(host, port, database, user, use_ssl, password):
+    """
+    Создает ключ пула по параметрам подключения
+    
+    Args:
+        host: Хост сервера
+        port: Порт сервера
+        database: Имя базы данных
+        user: Имя пользователя
+        use_ssl: Использовать SSL
+        password: Пароль (в ключ попадает только его отпечаток)
+    
+    Returns:
+        PoolKey
+    """
+    return PoolKey(host, port, database, user, bool(use_ssl), password_digest(password))
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений с ключом по параметрам подключения"""
+    
+    def __init__(self, min_size=0, max_size=5, idle_timeout=300, health_check_interval=30, acquire_timeout=30):
+        """
+        Инициализирует пул соединений
+        
+        Args:
+            min_size: Количество простаивающих соединений на ключ, которые не закрываются по таймауту
+            max_size: Максимальное количество соединений (занятых и свободных) на ключ
+            idle_timeout: Время простоя в секундах, после которого соединение закрывается
+            health_check_interval: Время простоя в секундах, после которого соединение проверяется перед выдачей
+            acquire_timeout: Максимальное время ожидания свободного соединения в секундах
+        """
+        if max_size < 1:
+            raise ValueError("max_size должен быть не меньше 1")
+        
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        
+        self._condition = threading.Condition()
+        self._idle = {}
+        self._in_use = {}
+        self._leased = {}
+    
+    def _open(self, key, password):
+        """Открывает новое соединение"""
+        raise NotImplementedError("Subclass must implement abstract method")
+    
+    def _is_alive(self, connection):
+        """Проверяет, что соединение работоспособно"""
+        raise NotImplementedError("Subclass must implement abstract method")
+    
+    def _reset(self, connection):
+        """Возвращает соединение в исходное состояние перед повторной выдачей"""
+        raise NotImplementedError("Subclass must implement abstract method")
+    
+    def _close(self, connection):
+        """Закрывает соединение, игнорируя ошибки"""
+        try:
+            connection.close()
+        except Exception:
+            pass
+    
+    def acquire(self, key, password=None):
+        """
+        Выдает соединение из пула или открывает новое
+        
+        Args:
+            key: Ключ PoolKey с параметрами подключения (см. make_pool_key)
+            password: Пароль, отпечаток которого должен совпадать с key.password_digest
+        
+        Returns:
+            Соединение с базой данных
+        """
+        if key.password_digest != password_digest(password):
+            raise ValueError("Пароль не соответствует ключу пула")
+        
+        deadline = time.monotonic() + self.acquire_timeout
+        
+        while True:
+            connection, released_at = self._reserve(key, deadline)
+            
+            if connection is None:
+                try:
+                    connection = self._open(key, password)
+                except Exception:
+                    self._forget(key)
+                    raise
+                break
+            
+            if time.monotonic() - released_at < self.health_check_interval or self._is_alive(connection):
+                break
+            
+            self._close(connection)
+            self._forget(key)
+        
+        with self._condition:
+            self._leased[id(connection)] = key
+        return connection
+    
+    def release(self, connection):
+        """
+        Возвращает соединение в пул
+        
+        Args:
+            connection: Соединение, ранее выданное методом acquire
+        """
+        with self._condition:
+            key = self._leased.pop(id(connection), None)
+        
+        if key is None:
+            self._close(connection)
+            return
+        
+        try:
+            self._reset(connection)
+        except Exception:
+            self._close(connection)
+            self._forget(key)
+            return
+        
+        with self._condition:
+            self._in_use[key] -= 1
+            self._idle.setdefault(key, []).append((connection, time.monotonic()))
+            self._condition.notify()
+    
+    def available(self, key):
+        """
+        Возвращает количество соединений, которые еще можно выдать по ключу
+        
+        Args:
+            key: Ключ PoolKey с параметрами подключения
+        """
+        with self._condition:
+            return max(0, self.max_size - self._in_use.get(key, 0))
+    
+    def warm(self, key, password=None):
+        """
+        Заранее открывает соединения до min_size
+        
+        Args:
+            key: Ключ PoolKey с параметрами подключения
+            password: Пароль
+        """
+        connections = []
+        try:
+            while True:
+                with self._condition:
+                    total = len(self._idle.get(key, [])) + self._in_use.get(key, 0)
+                if total >= self.min_size:
+                    break
+                connections.append(self.acquire(key, password))
+        finally:
+            for connection in connections:
+                self.release(connection)
+    
+    def discard_database(self, database):
+        """
+        Закрывает все свободные соединения с указанной базой данных
+        
+        Нужно перед DROP DATABASE и CREATE DATABASE ... TEMPLATE, которым мешают открытые сессии.
+        
+        Args:
+            database: Имя базы данных
+        """
+        to_close = []
+        with self._condition:
+            for key in list(self._idle):
+                if key.database == database:
+                    to_close.extend(connection for connection, _ in self._idle.pop(key))
+            self._condition.notify_all()
+        
+        for connection in to_close:
+            self._close(connection)
+    
+    def close_all(self):
+        """Закрывает все свободные соединения пула"""
+        with self._condition:
+            to_close = [connection for idle in self._idle.values() for connection, _ in idle]
+            self._idle.clear()
+            self._condition.notify_all()
+        
+        for connection in to_close:
+            self._close(connection)
+    
+    def _reserve(self, key, deadline):
+        """
+        Резервирует место в пуле под ключ
+        
+        Returns:
+            Кортеж (свободное соединение, время его возврата) или (None, None),
+            если нужно открыть новое соединение
+        """
+        connection, released_at, timed_out = None, None, False
+        expired = []
+        
+        with self._condition:
+            while True:
+                expired.extend(self._evict_expired())
+                idle = self._idle.get(key)
+                
+                if idle:
+                    connection, released_at = idle.pop()
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+                
+                if self._in_use.get(key, 0) < self.max_size:
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+                
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                self._condition.wait(remaining)
+        
+        for expired_connection in expired:
+            self._close(expired_connection)
+        
+        if timed_out:
+            raise ConnectionError(
+                f"Нет свободных соединений в пуле для {key.host}:{key.port}/{key.database} "
+                f"(максимум {self.max_size})"
+            )
+        return connection, released_at
+    
+    def _forget(self, key):
+        """Освобождает зарезервированное место без возврата соединения"""
+        with self._condition:
+            self._in_use[key] -= 1
+            self._condition.notify()
+    
+    def _evict_expired(self):
+        """Убирает из пула соединения, простаивающие дольше idle_timeout (вызывается под блокировкой)"""
+        now = time.monotonic()
+        expired = []
+        for key, idle in self._idle.items():
+            excess = len(idle) - self.min_size
+            while excess > 0 and now - idle[0][1] > self.idle_timeout:
+                expired.append(idle.pop(0)[0])
+                excess -= 1
+        return expired
@@ -1,36 +1,225 @@
 """
 Утилиты для работы с PostgreSQL
 """
+import threading
+import uuid
 import psycopg2
 from psycopg2 import sql
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from .base import DBConnection
+from .pool import ConnectionPool, make_pool_key
+from .parallel import run_parallel
+
+
+class PostgresConnectionPool(ConnectionPool):
+    """Пул соединений с PostgreSQL"""
+    
+    def _open(self, key, password):
+        """Открывает новое соединение с PostgreSQL"""
+        conn_params = {
+            "host": key.host,
+            "port": key.port,
+            "database": key.database,
+            "user": key.user,
+            "password": password
+        }
+        
+        if key.use_ssl:
+            conn_params["sslmode"] = "require"
+            
+        return psycopg2.connect(**conn_params)
+    
+    def _is_alive(self, connection):
+        """Проверяет соединение запросом SELECT 1"""
+        if connection.closed:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if not connection.autocommit:
+                connection.rollback()
+            return True
+        except Exception:
+            return False
+    
+    def _reset(self, connection):
+        """Откатывает незавершенную транзакцию и сбрасывает настройки сессии"""
+        if connection.closed:
+            raise ConnectionError("Connection is closed")
+        connection.reset()
+        connection.autocommit = False
+
+
+# Удаление всех пользовательских объектов схемы одним DO-блоком.
+# Объекты, принадлежащие расширениям, не трогаются.
+SCHEMA_WIPE_SQL = """
+DO $wipe$
+DECLARE
+    target_schema text := {schema};
+    objects text;
+BEGIN
+    SELECT string_agg(format('%I.%I', n.nspname, c.relname), ', ') INTO objects
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = target_schema AND c.relkind = 'm'
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_depend d
+        WHERE d.classid = 'pg_class'::regclass AND d.objid = c.oid AND d.deptype = 'e'
+    );
+    IF objects IS NOT NULL THEN
+        EXECUTE 'DROP MATERIALIZED VIEW IF EXISTS ' || objects || ' CASCADE';
+    END IF;
+
+    SELECT string_agg(format('%I.%I', n.nspname, c.relname), ', ') INTO objects
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = target_schema AND c.relkind = 'v'
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_depend d
+        WHERE d.classid = 'pg_class'::regclass AND d.objid = c.oid AND d.deptype = 'e'
+    );
+    IF objects IS NOT NULL THEN
+        EXECUTE 'DROP VIEW IF EXISTS ' || objects || ' CASCADE';
+    END IF;
+
+    SELECT string_agg(format('%I.%I', n.nspname, c.relname), ', ') INTO objects
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = target_schema AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_depend d
+        WHERE d.classid = 'pg_class'::regclass AND d.objid = c.oid AND d.deptype = 'e'
+    );
+    IF objects IS NOT NULL THEN
+        EXECUTE 'DROP TABLE IF EXISTS ' || objects || ' CASCADE';
+    END IF;
+
+    SELECT string_agg(format('%I.%I', n.nspname, c.relname), ', ') INTO objects
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = target_schema AND c.relkind = 'S'
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_depend d
+        WHERE d.classid = 'pg_class'::regclass AND d.objid = c.oid AND d.deptype = 'e'
+    );
+    IF objects IS NOT NULL THEN
+        EXECUTE 'DROP SEQUENCE IF EXISTS ' || objects || ' CASCADE';
+    END IF;
+
+    SELECT string_agg(format('%I.%I(%s)', n.nspname, p.proname, pg_get_function_identity_arguments(p.oid)), ', ') INTO objects
+    FROM pg_proc p
+    JOIN pg_namespace n ON n.oid = p.pronamespace
+    WHERE n.nspname = target_schema AND p.prokind = 'a'
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_depend d
+        WHERE d.classid = 'pg_proc'::regclass AND d.objid = p.oid AND d.deptype = 'e'
+    );
+    IF objects IS NOT NULL THEN
+        EXECUTE 'DROP AGGREGATE IF EXISTS ' || objects || ' CASCADE';
+    END IF;
+
+    SELECT string_agg(format('%I.%I(%s)', n.nspname, p.proname, pg_get_function_identity_arguments(p.oid)), ', ') INTO objects
+    FROM pg_proc p
+    JOIN pg_namespace n ON n.oid = p.pronamespace
+    WHERE n.nspname = target_schema AND p.prokind IN ('f', 'p')
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_depend d
+        WHERE d.classid = 'pg_proc'::regclass AND d.objid = p.oid AND d.deptype = 'e'
+    );
+    IF objects IS NOT NULL THEN
+        EXECUTE 'DROP ROUTINE IF EXISTS ' || objects || ' CASCADE';
+    END IF;
+
+    SELECT string_agg(format('%I.%I', n.nspname, t.typname), ', ') INTO objects
+    FROM pg_type t
+    JOIN pg_namespace n ON n.oid = t.typnamespace
+    WHERE n.nspname = target_schema AND t.typtype = 'd'
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_depend d
+        WHERE d.classid = 'pg_type'::regclass AND d.objid = t.oid AND d.deptype = 'e'
+    );
+    IF objects IS NOT NULL THEN
+        EXECUTE 'DROP DOMAIN IF EXISTS ' || objects || ' CASCADE';
+    END IF;
+
+    SELECT string_agg(format('%I.%I', n.nspname, t.typname), ', ') INTO objects
+    FROM pg_type t
+    JOIN pg_namespace n ON n.oid = t.typnamespace
+    LEFT JOIN pg_class c ON c.oid = t.typrelid
+    WHERE n.nspname = target_schema
+    AND (t.typtype IN ('e', 'r') OR (t.typtype = 'c' AND c.relkind = 'c'))
+    AND NOT EXISTS (
+        SELECT 1 FROM pg_depend d
+        WHERE d.classid = 'pg_type'::regclass AND d.objid = t.oid AND d.deptype = 'e'
+    );
+    IF objects IS NOT NULL THEN
+        EXECUTE 'DROP TYPE IF EXISTS ' || objects || ' CASCADE';
+    END IF;
+END
+$wipe$
+"""
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_postgres_pool():
+    """Возвращает общий для приложения пул соединений с PostgreSQL"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = PostgresConnectionPool(max_size=16)
+        return _default_pool
 
 
 class PostgresConnection(DBConnection):
     """Класс для подключения к PostgreSQL"""
     
-    def __init__(self):
+    ALL_DATABASES_QUERY = """
+        SELECT datname FROM pg_database 
+        WHERE datistemplate = false AND datname NOT IN ('postgres', 'template0', 'template1')
+        """
+    
+    def __init__(self, pool=None):
+        """
+        Инициализирует подключение к PostgreSQL
+        
+        Args:
+            pool: Пул соединений (по умолчанию общий пул приложения)
+        """
         super().__init__()
+        self.pool = pool or get_postgres_pool()
+        self.pool_key = None
         
     def connect(self, host=None, port=None, database=None, username=None, password=None, use_ssl=False):
-        """Подключение к PostgreSQL"""
-        try:
-            conn_params = {
-                "host": host,
-                "port": port,
-                "database": database,
-                "user": username,
-                "password": password
-            }
+        """Подключение к PostgreSQL через пул соединений"""
+        if self.connection:
+            self.disconnect()
             
-            if use_ssl:
-                conn_params["sslmode"] = "require"
-                
-            self.connection = psycopg2.connect(**conn_params)
+        try:
+            key = make_pool_key(host, str(port) if port else None, database, username, use_ssl, password)
+            self.connection = self.pool.acquire(key, password)
+            self.pool_key = key
             self.cursor = self.connection.cursor()
             return True
         except Exception as e:
+            if self.connection:
+                self.pool.release(self.connection)
+                self.connection = None
             raise ConnectionError(f"Failed to connect to PostgreSQL: {str(e)}")
+    
+    def disconnect(self):
+        """Возвращает соединение в пул"""
+        if self.cursor:
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
+        if self.connection:
+            self.pool.release(self.connection)
+        self.cursor = None
+        self.connection = None
             
     def test_connection(self, host=None, port=None, database=None, username=None, password=None, use_ssl=False):
         """Проверка соединения с PostgreSQL"""
@@ -53,13 +242,29 @@ class PostgresConnection(DBConnection):
         except Exception as e:
             return False, f"Ошибка соединения: {str(e)}"
     
+    def _starts_transaction(self):
+        """Проверяет, начнет ли следующий запрос новую транзакцию"""
+        return (not self.connection.autocommit
+                and self.connection.info.transaction_status == TRANSACTION_STATUS_IDLE)
+    
+    def _create_stream_cursor(self, batch_size):
+        """Создает именованный (серверный) курсор для потокового чтения"""
+        # Именованный курсор вне транзакции (autocommit) работает только с WITH HOLD
+        cursor = self.connection.cursor(
+            name=f"autonekits_stream_{uuid.uuid4().hex}",
+            withhold=self.connection.autocommit
+        )
+        cursor.itersize = batch_size
+        return cursor
+    
     def get_all_databases(self):
         """Получает список всех баз данных на сервере"""
-        query = """
-        SELECT datname FROM pg_database 
-        WHERE datistemplate = false AND datname NOT IN ('postgres', 'template0', 'template1')
-        """
-        return self.execute_query(query)
+        return self.execute_query(self.ALL_DATABASES_QUERY)
+    
+    def stream_all_databases(self, batch_size=500):
+        """Отдает имена всех баз данных на сервере пачками"""
+        for batch in self.execute_stream(self.ALL_DATABASES_QUERY, batch_size=batch_size):
+            yield [row[0] for row in batch]
     
     def get_all_tables(self, schema='public'):
         """Получает список всех таблиц в текущей базе данных"""
@@ -83,6 +288,8 @@ class PostgresCleaner:
         """
         self.connection = connection or PostgresConnection()
         self.is_connected = False
+        self.connect_params = {}
+        self.last_error = None
         
     def connect(self, host=None, port=None, database="postgres", username=None, password=None, use_ssl=False):
         """
@@ -99,20 +306,37 @@ class PostgresCleaner:
         Returns:
             True если соединение успешно
         """
+        self.connect_params = {
+            "host": host,
+            "port": port,
+            "username": username,
+            "password": password,
+            "use_ssl": use_ssl
+        }
+        
         try:
-            self.connection.connect(
-                host=host,
-                port=port,
-                database=database,
-                username=username,
-                password=password,
-                use_ssl=use_ssl
-            )
+            self.connection.connect(database=database, **self.connect_params)
             self.is_connected = True
             return True
         except Exception as e:
             self.is_connected = False
             raise e
+    
+    def connect_to(self, database):
+        """
+        Переключается на другую базу данных того же сервера
+        
+        Текущее соединение возвращается в пул, новое берется из пула.
+        
+        Args:
+            database: Имя базы данных
+            
+        Returns:
+            True если соединение успешно
+        """
+        if not self.connect_params:
+            raise ConnectionError("Not connected to the database server")
+        return self.connect(database=database, **self.connect_params)
             
     def disconnect(self):
         """Закрывает соединение с сервером"""
@@ -127,7 +351,7 @@ class PostgresCleaner:
             pattern: Шаблон для поиска баз данных (по умолчанию 'user224-%')
             
         Returns:
-            DataFrame с именами баз данных
+            QueryResult с именами баз данных
         """
         if not self.is_connected:
             raise ConnectionError("Not connected to the database server")
@@ -172,21 +396,23 @@ class PostgresCleaner:
             if current_db != database_name:
                 print(f"Внимание: текущая база данных ({current_db}) не соответствует целевой ({database_name})")
             
-            result = self.connection.execute_query(f"""
+            # Имена собираем заранее: commit после каждого DROP закрывает серверный курсор
+            table_names = []
+            for batch in self.connection.execute_stream("""
                 SELECT table_name 
                 FROM information_schema.tables 
-                WHERE table_schema = '{schema}' AND table_type = 'BASE TABLE'
-            """)
+                WHERE table_schema = %s AND table_type = 'BASE TABLE'
+            """, [schema]):
+                table_names.extend(row[0] for row in batch)
             
-            if result is None or result.empty:
+            if not table_names:
                 return True  
                 
             self.connection.execute_query(f"""
                 SET session_replication_role = 'replica';
             """, commit=True)
             
-            for _, row in result.iterrows():
-                table_name = row['table_name']
+            for table_name in table_names:
                 try:
                     query = sql.SQL("DROP TABLE IF EXISTS {}.{} CASCADE").format(
                         sql.Identifier(schema),
@@ -194,6 +420,7 @@ class PostgresCleaner:
                     )
                     self.connection.execute_query(query, commit=True)
                 except Exception as e:
+                    self.last_error = str(e)
                     print(f"Ошибка при удалении таблицы {schema}.{table_name}: {str(e)}")
             
             self.connection.execute_query(f"""
@@ -202,13 +429,96 @@ class PostgresCleaner:
                     
             return True
         except Exception as e:
+            self.last_error = str(e)
             print(f"Ошибка при удалении таблиц в базе данных {database_name}: {str(e)}")
             return False
             
+    def wipe_schema(self, database_name, schema='public'):
+        """
+        Удаляет все объекты схемы одной транзакцией за один запрос
+        
+        Удаляются таблицы, представления, материализованные представления,
+        последовательности, функции, процедуры, агрегаты, домены и типы.
+        При ошибке транзакция откатывается и база остается нетронутой.
+        
+        Args:
+            database_name: Имя базы данных
+            schema: Имя схемы (по умолчанию 'public')
+            
+        Returns:
+            True если операция успешна, иначе False
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        try:
+            current_db = self.connection.connection.info.dbname
+            if current_db != database_name:
+                print(f"Внимание: текущая база данных ({current_db}) не соответствует целевой ({database_name})")
+            
+            query = sql.SQL(SCHEMA_WIPE_SQL).format(schema=sql.Literal(schema))
+            self.connection.execute_query(query, commit=True)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Ошибка при очистке схемы {schema} в базе данных {database_name}: {str(e)}")
+            return False
+    
+    def _worker_limit(self, max_workers):
+        """
+        Ограничивает количество потоков, которым нужно соединение с той же базой, что и у очистителя
+        
+        Потоки берут соединения из пула по тому же ключу, поэтому их не может быть больше,
+        чем свободных мест в пуле: лишние потоки ждали бы соединения и падали по таймауту.
+        """
+        available = self.connection.pool.available(self.connection.pool_key)
+        return max(1, min(int(max_workers or 1), available))
+    
+    def _spawn(self, database):
+        """Создает отдельный очиститель с собственным соединением из пула (для рабочих потоков)"""
+        cleaner = PostgresCleaner(PostgresConnection(self.connection.pool))
+        cleaner.connect(database=database, **self.connect_params)
+        return cleaner
+    
+    def drop_all_tables_in_databases(self, databases, schema='public', max_workers=4, atomic=False):
+        """
+        Параллельно удаляет все таблицы в нескольких базах данных
+        
+        Каждый поток работает через собственное соединение из пула.
+        
+        Args:
+            databases: Список имен баз данных
+            schema: Имя схемы (по умолчанию 'public')
+            max_workers: Максимальное количество одновременно очищаемых баз
+            atomic: Очищать всю схему одной транзакцией (см. wipe_schema)
+            
+        Yields:
+            Словарь с результатом по мере завершения очередной базы:
+            {"database", "success", "elapsed", "error"}
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        def clean(database_name):
+            cleaner = self._spawn(database_name)
+            try:
+                if atomic:
+                    success = cleaner.wipe_schema(database_name, schema)
+                else:
+                    success = cleaner.drop_all_tables_in_database(database_name, schema)
+                return success, cleaner.last_error
+            finally:
+                cleaner.disconnect()
+        
+        return run_parallel(databases, clean, max_workers)
+    
     def drop_database(self, database_name):
         """
         Удаляет указанную базу данных
         
+        На PostgreSQL 13+ используется DROP DATABASE ... WITH (FORCE),
+        на более старых версиях сессии сначала завершаются через pg_terminate_backend.
+        
         Args:
             database_name: Имя базы данных для удаления
             
@@ -217,43 +527,235 @@ class PostgresCleaner:
         """
         if not self.is_connected:
             raise ConnectionError("Not connected to the database server")
+        
+        try:
+            if self.connection.connection.info.dbname == database_name:
+                self.connect_to("postgres")
             
-        current_db = self.connection.connection.info.dbname
+            self._force_drop_database(database_name)
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Ошибка при удалении базы данных {database_name}: {str(e)}")
+            return False
+    
+    def drop_databases(self, databases, max_workers=1):
+        """
+        Удаляет несколько баз данных
+        
+        При max_workers=1 все базы удаляются последовательно через одно
+        административное соединение, иначе каждый поток берет свое соединение из пула.
         
+        Args:
+            databases: Список имен баз данных
+            max_workers: Максимальное количество одновременно удаляемых баз (не больше свободных мест в пуле, см. _worker_limit)
+            
+        Yields:
+            Словарь с результатом по мере завершения очередной базы:
+            {"database", "success", "elapsed", "error"}
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        if self.connection.connection.info.dbname != "postgres":
+            self.connect_to("postgres")
+        
+        max_workers = self._worker_limit(max_workers)
+        if max_workers <= 1:
+            def drop(database_name):
+                return self.drop_database(database_name), self.last_error
+        else:
+            def drop(database_name):
+                cleaner = self._spawn("postgres")
+                try:
+                    return cleaner.drop_database(database_name), cleaner.last_error
+                finally:
+                    cleaner.disconnect()
+        
+        return run_parallel(databases, drop, max_workers)
+    
+    def supports_force_drop(self):
+        """Проверяет, поддерживает ли сервер DROP DATABASE ... WITH (FORCE) (PostgreSQL 13+)"""
+        return self.connection.connection.server_version >= 130000
+    
+    def _force_drop_database(self, database_name):
+        """Удаляет базу данных, принудительно закрывая ее сессии"""
+        if self.supports_force_drop():
+            self.connection.pool.discard_database(database_name)
+            query = sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)")
+        else:
+            self._terminate_sessions(database_name)
+            query = sql.SQL("DROP DATABASE IF EXISTS {}")
+        self._execute_outside_transaction(query.format(sql.Identifier(database_name)))
+    
+    def _execute_outside_transaction(self, query, params=None):
+        """Выполняет запрос в режиме autocommit (нужно для CREATE/DROP DATABASE)"""
+        conn = self.connection.connection
+        old_autocommit = conn.autocommit
+        if not old_autocommit:
+            # autocommit нельзя включить внутри открытой транзакции
+            conn.commit()
+        conn.autocommit = True
         try:
-            if current_db == database_name:
-                self.disconnect()
-                self.connect(database="postgres")
-
-            old_autocommit = self.connection.connection.autocommit
-            self.connection.connection.autocommit = True
+            self.connection.execute_query(query, params)
+        finally:
+            conn.autocommit = old_autocommit
+    
+    def _terminate_sessions(self, database_name):
+        """Закрывает соединения пула и завершает чужие сессии с указанной базой данных"""
+        self.connection.pool.discard_database(database_name)
+        self._execute_outside_transaction("""
+            SELECT pg_terminate_backend(pid)
+            FROM pg_stat_activity
+            WHERE datname = %s
+            AND pid <> pg_backend_pid()
+        """, [database_name])
+    
+    def database_exists(self, database_name):
+        """Проверяет существование базы данных"""
+        result = self.connection.execute_query(
+            "SELECT 1 FROM pg_database WHERE datname = %s", [database_name]
+        )
+        return result is not None and not result.empty
+    
+    def create_template_database(self, template_name, source_database=None, ddl=None):
+        """
+        Создает (или пересоздает) эталонную базу данных для варианта экзамена
+        
+        Эталон копируется из существующей базы или создается пустым и заполняется DDL.
+        После создания база помечается как шаблон (IS_TEMPLATE) и скрывается из списка баз.
+        
+        Args:
+            template_name: Имя эталонной базы данных
+            source_database: База данных, копия которой станет эталоном
+            ddl: SQL для создания объектов в эталоне (если source_database не указана)
             
-            self.connection.execute_query(f"""
-                SELECT pg_terminate_backend(pid)
-                FROM pg_stat_activity
-                WHERE datname = '{database_name}'
-                AND pid <> pg_backend_pid()
-            """, commit=False) 
+        Returns:
+            True если операция успешна, иначе False
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        try:
+            if self.connection.connection.info.dbname != "postgres":
+                self.connect_to("postgres")
             
-
-            query = sql.SQL("DROP DATABASE IF EXISTS {}").format(sql.Identifier(database_name))
-            self.connection.execute_query(query, commit=False) 
+            if self.database_exists(template_name):
+                self._terminate_sessions(template_name)
+                self._execute_outside_transaction(
+                    sql.SQL("ALTER DATABASE {} IS_TEMPLATE false").format(sql.Identifier(template_name))
+                )
+                self._execute_outside_transaction(
+                    sql.SQL("DROP DATABASE {}").format(sql.Identifier(template_name))
+                )
             
-            self.connection.connection.autocommit = old_autocommit
+            if source_database:
+                self._terminate_sessions(source_database)
+                query = sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                    sql.Identifier(template_name),
+                    sql.Identifier(source_database)
+                )
+            else:
+                query = sql.SQL("CREATE DATABASE {}").format(sql.Identifier(template_name))
+            self._execute_outside_transaction(query)
             
+            if ddl and not source_database:
+                template_cleaner = self._spawn(template_name)
+                try:
+                    template_cleaner.connection.execute_query(ddl, commit=True)
+                finally:
+                    template_cleaner.disconnect()
+            
+            # Соединения с эталоном мешают CREATE DATABASE ... TEMPLATE
+            self.connection.pool.discard_database(template_name)
+            self._execute_outside_transaction(
+                sql.SQL("ALTER DATABASE {} IS_TEMPLATE true").format(sql.Identifier(template_name))
+            )
             return True
         except Exception as e:
-            print(f"Ошибка при удалении базы данных {database_name}: {str(e)}")
+            self.last_error = str(e)
+            print(f"Ошибка при создании эталонной базы данных {template_name}: {str(e)}")
+            return False
+    
+    def reset_database_from_template(self, database_name, template_name):
+        """
+        Пересоздает базу данных копией эталона (CREATE DATABASE ... TEMPLATE)
+        
+        Копирование идет на уровне файлов и работает быстрее повторного выполнения DDL.
+        Копия создается под временным именем и заменяет базу только после успешного
+        копирования, поэтому при ошибке (нет шаблона, к нему подключены) старая база остается.
+        
+        Args:
+            database_name: Имя пересоздаваемой базы данных
+            template_name: Имя эталонной базы данных
+            
+        Returns:
+            True если операция успешна, иначе False
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        new_name = f"{database_name}_new"
+        
+        try:
+            if self.connection.connection.info.dbname in (database_name, template_name, new_name):
+                self.connect_to("postgres")
+            
+            if not self.database_exists(template_name):
+                raise ValueError(f"шаблон {template_name} не найден")
+            
+            # Остаток прерванного сброса
+            self._force_drop_database(new_name)
+            self.connection.pool.discard_database(template_name)
+            self._execute_outside_transaction(
+                sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                    sql.Identifier(new_name),
+                    sql.Identifier(template_name)
+                )
+            )
+            
             try:
-                self.connection.connection.autocommit = old_autocommit
-            except:
-                pass
+                self._force_drop_database(database_name)
+            except Exception:
+                self._force_drop_database(new_name)
+                raise
+            
+            self._execute_outside_transaction(
+                sql.SQL("ALTER DATABASE {} RENAME TO {}").format(
+                    sql.Identifier(new_name),
+                    sql.Identifier(database_name)
+                )
+            )
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Ошибка при пересоздании базы данных {database_name} из шаблона {template_name}: {str(e)}")
             return False
-        finally:
-            if current_db != database_name and current_db != "postgres":
-                try:
-                    self.disconnect()
-                    self.connect(database=current_db)
-                except:
-                    pass
+    
+    def reset_databases_from_template(self, databases, template_name, max_workers=4):
+        """
+        Параллельно пересоздает несколько баз данных из эталона
+        
+        Args:
+            databases: Список имен баз данных
+            template_name: Имя эталонной базы данных
+            max_workers: Максимальное количество одновременно пересоздаваемых баз (не больше свободных мест в пуле)
             
+        Yields:
+            Словарь с результатом по мере завершения очередной базы:
+            {"database", "success", "elapsed", "error"}
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to the database server")
+        
+        if self.connection.connection.info.dbname != "postgres":
+            self.connect_to("postgres")
+        
+        def reset(database_name):
+            cleaner = self._spawn("postgres")
+            try:
+                return cleaner.reset_database_from_template(database_name, template_name), cleaner.last_error
+            finally:
+                cleaner.disconnect()
+        
+        return run_parallel(databases, reset, self._worker_limit(max_workers))
@@ -0,0 +1,92 @@
+"""
+Компактный результат SQL запроса
+"""
+
+
+class QueryResult:
+    """Результат запроса: кортежи строк с доступом к колонкам по имени"""
+    
+    __slots__ = ("columns", "rows", "_index")
+    
+    def __init__(self, columns, rows):
+        """
+        Инициализирует результат запроса
+        
+        Args:
+            columns: Имена колонок
+            rows: Список строк (кортежей)
+        """
+        self.columns = tuple(columns)
+        self.rows = rows
+        self._index = {name: i for i, name in enumerate(self.columns)}
+    
+    def __len__(self):
+        return len(self.rows)
+    
+    def __iter__(self):
+        return iter(self.rows)
+    
+    def __getitem__(self, index):
+        return self.rows[index]
+    
+    def __repr__(self):
+        return f"QueryResult(columns={self.columns!r}, rows={len(self.rows)})"
+    
+    @property
+    def empty(self):
+        """True, если запрос не вернул строк"""
+        return not self.rows
+    
+    def _position(self, column):
+        """Возвращает номер колонки по имени или номеру"""
+        if isinstance(column, int):
+            return column
+        try:
+            return self._index[column]
+        except KeyError:
+            raise KeyError(f"Колонка '{column}' отсутствует в результате запроса")
+    
+    def column(self, column):
+        """
+        Возвращает значения одной колонки
+        
+        Args:
+            column: Имя или номер колонки
+            
+        Returns:
+            Список значений
+        """
+        position = self._position(column)
+        return [row[position] for row in self.rows]
+    
+    def first(self, column=0, default=None):
+        """
+        Возвращает значение колонки в первой строке
+        
+        Args:
+            column: Имя или номер колонки
+            default: Значение, если строк нет
+            
+        Returns:
+            Значение колонки или default
+        """
+        if not self.rows:
+            return default
+        return self.rows[0][self._position(column)]
+    
+    def records(self):
+        """Отдает строки в виде словарей {колонка: значение}"""
+        for row in self.rows:
+            yield dict(zip(self.columns, row))
+    
+    def to_dataframe(self):
+        """
+        Преобразует результат в pandas DataFrame
+        
+        pandas импортируется только при вызове этого метода.
+        
+        Returns:
+            pandas.DataFrame
+        """
+        import pandas as pd
+        return pd.DataFrame(self.rows, columns=list(self.columns))
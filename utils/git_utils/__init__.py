@@ -2,5 +2,7 @@
 Модуль утилит для работы с Git
 """
 from .git_utils import GitManager
+from .gitea_storage import GiteaRepositoryStorage
+from .gitea_provisioning import GiteaProvisioner
 
-__all__ = ["GitManager"] 
\ No newline at end of file
+__all__ = ["GitManager", "GiteaRepositoryStorage", "GiteaProvisioner"] 
\ No newline at end of file
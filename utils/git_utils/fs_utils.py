@@ -0,0 +1,26 @@
+import os
+import shutil
+import sys
+
+
+def _make_writable(func, path, _):
+    """Снимает атрибут "только чтение" (объекты git в Windows) и повторяет удаление"""
+    os.chmod(path, 0o700)
+    func(path)
+
+
+def remove_tree(path: str):
+    """
+    Удаляет каталог, снимая атрибут "только чтение" с объектов git (Windows)
+    
+    Начиная с Python 3.12 обработчик передается через onexc, onerror устарел.
+    
+    Args:
+        path: Путь к каталогу (если каталога нет, ничего не делает)
+    """
+    if not os.path.exists(path):
+        return
+    if sys.version_info >= (3, 12):
+        shutil.rmtree(path, onexc=_make_writable)
+    else:
+        shutil.rmtree(path, onerror=_make_writable)
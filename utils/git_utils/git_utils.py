@@ -1,21 +1,107 @@
 import os
+import json
+import posixpath
+import shutil
+import tarfile
+import threading
+import uuid
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Tuple, Dict, Any
-from git import Repo, GitCommandError
+from urllib.parse import urlparse
+from git import Repo, GitCommandError, InvalidGitRepositoryError, NoSuchPathError
+from .http_session import get_session
+from .fs_utils import remove_tree
+
+
+# Максимальный размер страницы API Gitea по умолчанию (MAX_RESPONSE_ITEMS)
+API_PAGE_LIMIT = 50
+# Количество страниц списка, запрашиваемых одновременно
+API_PAGE_WORKERS = 4
+# Режимы клонирования: аргументы git clone для каждого режима
+CLONE_MODES = {
+    "full": {},
+    "shallow": {"depth": 1},
+    "partial": {"filter": "blob:none"},
+}
+# Режим сбора рабочей копии из архива ветки без git clone и каталога .git
+SNAPSHOT_MODE = "snapshot"
+# Таймаут HTTP-запросов при загрузке архивов (подключение, чтение) в секундах
+ARCHIVE_TIMEOUT = (10, 60)
+# Файл в каталоге сбора со временем изменения и параметрами клонирования собранных репозиториев
+MANIFEST_FILE = ".autonekits_manifest.json"
+# Каталог в каталоге сбора с общими хранилищами объектов шаблонов (git clone --reference)
+REFERENCE_CACHE_DIR = ".reference"
+
+
+def extract_archive(fileobj, target_path: str, sparse_paths: List[str] = None) -> int:
+    """
+    Распаковывает поток tar-архива репозитория в каталог
+    
+    Архив читается последовательно, без перемотки, поэтому подходит тело HTTP-ответа.
+    Верхний каталог архива ("<repo>/") отбрасывается. Абсолютные пути и пути с ".." считаются
+    ошибкой; символические ссылки и специальные файлы пропускаются.
+    
+    Args:
+        fileobj: Файловый объект с tar-архивом (сжатие gzip определяется автоматически)
+        target_path: Каталог назначения
+        sparse_paths: Извлечь только эти каталоги
+        
+    Returns:
+        Количество извлеченных файлов
+    """
+    root = os.path.abspath(target_path)
+    prefixes = [path.strip("/") + "/" for path in sparse_paths or []]
+    files = 0
+    
+    os.makedirs(root, exist_ok=True)
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            name = member.name.replace("\\", "/")
+            if name.startswith("/") or ".." in name.split("/"):
+                raise ValueError(f"Недопустимый путь в архиве: {member.name}")
+            
+            relative = posixpath.normpath(name).partition("/")[2]
+            if not relative:
+                continue
+            if prefixes and not any(f"{relative}/".startswith(prefix) for prefix in prefixes):
+                continue
+            
+            path = os.path.abspath(os.path.join(root, *relative.split("/")))
+            if os.path.commonpath([root, path]) != root:
+                raise ValueError(f"Недопустимый путь в архиве: {member.name}")
+            
+            if member.isdir():
+                os.makedirs(path, exist_ok=True)
+            elif member.isfile():
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with archive.extractfile(member) as source, open(path, "wb") as target:
+                    shutil.copyfileobj(source, target)
+                if member.mode & 0o111:
+                    os.chmod(path, 0o755)
+                files += 1
+    
+    return files
+
 
 class GitManager:
     """Класс для управления Git репозиторием"""
     
-    def __init__(self, base_url: str = None, prefix: str = None):
+    def __init__(self, base_url: str = None, prefix: str = None, session: requests.Session = None):
         """
         Инициализация менеджера Git
         
         Args:
             base_url: Базовый URL для Git репозиториев
             prefix: Префикс для имён пользователей (по умолчанию "224-user-")
+            session: HTTP-сессия для API Gitea (по умолчанию общая сессия приложения)
         """
         self.base_url = base_url
         self.prefix = prefix or os.getenv("GIT_PREFIX", "224-user-")
+        self.session = session or get_session()
+        
+        self._host_semaphores = {}
+        self._host_semaphores_lock = threading.Lock()
     
     def set_base_url(self, base_url: str):
         """
@@ -51,14 +137,11 @@ class GitManager:
             base = self.base_url.split(f'/{self.prefix}')[0] if f'/{self.prefix}' in self.base_url else self.base_url
             api_url = f"{base}/api/v1/users/{user_name}/repos"
             
-            response = requests.get(api_url, timeout=10)
+            success, repos_or_error = self._get_all_pages(api_url)
+            if not success:
+                return False, f"Ошибка получения списка репозиториев: {repos_or_error}"
             
-            if response.status_code == 200:
-                repos = response.json()
-                repo_names = [repo['name'] for repo in repos]
-                return True, repo_names
-            else:
-                return False, f"Ошибка получения списка репозиториев: {response.status_code} - {response.reason}"
+            return True, [repo['name'] for repo in repos_or_error]
                 
         except requests.exceptions.ConnectionError as e:
             error_details = str(e)
@@ -69,7 +152,183 @@ class GitManager:
         except Exception as e:
             return False, f"Непредвиденная ошибка: {str(e)}"
     
-    def clone_repository(self, user_number: int, repo_name: str, target_path: str) -> Tuple[bool, str]:
+    def _get_all_pages(self, api_url: str, params: Dict[str, Any] = None,
+                       items_key: str = None) -> Tuple[bool, Any]:
+        """
+        Получает все страницы списка из API Gitea
+        
+        Первая страница запрашивается с максимальным размером страницы, остальные -
+        параллельно, когда общее количество известно из заголовка X-Total-Count.
+        
+        Args:
+            api_url: Адрес метода API
+            params: Дополнительные параметры запроса
+            items_key: Ключ списка в ответе-объекте (например, "data" у методов поиска)
+            
+        Returns:
+            Кортеж (успех, список элементов или "код - причина" ответа с ошибкой)
+        """
+        def fetch(page):
+            response = self.session.get(
+                api_url, params={**(params or {}), "page": page, "limit": API_PAGE_LIMIT}, timeout=10
+            )
+            if response.status_code != 200:
+                return response, None
+            payload = response.json()
+            return response, (payload.get(items_key) or []) if items_key else payload
+        
+        response, items = fetch(1)
+        if items is None:
+            return False, f"{response.status_code} - {response.reason}"
+        
+        # Сервер может ограничить размер страницы меньшим значением (MAX_RESPONSE_ITEMS),
+        # поэтому размер страницы определяется по первому ответу, а не по API_PAGE_LIMIT
+        page_size = len(items)
+        
+        total = response.headers.get("X-Total-Count")
+        if total is None or not total.isdigit():
+            # Старые версии Gitea не сообщают общее количество: читаем страницы, пока они полные
+            page = 1
+            last_page = items
+            while last_page and len(last_page) >= page_size:
+                page += 1
+                response, last_page = fetch(page)
+                if last_page is None:
+                    return False, f"{response.status_code} - {response.reason}"
+                items.extend(last_page)
+            return True, items
+        
+        if not page_size or page_size >= int(total):
+            return True, items
+        
+        pages = range(2, (int(total) + page_size - 1) // page_size + 1)
+        with ThreadPoolExecutor(max_workers=min(API_PAGE_WORKERS, len(pages))) as executor:
+            for response, page_items in executor.map(fetch, pages):
+                if page_items is None:
+                    return False, f"{response.status_code} - {response.reason}"
+                items.extend(page_items)
+        
+        return True, items
+    
+    def search_cabinet_repositories(self, from_user: int, to_user: int) -> Tuple[bool, Any]:
+        """
+        Получает репозитории всех пользователей диапазона одним постраничным поиском
+        
+        Использует /api/v1/repos/search с ключевым словом "<префикс>/", которое Gitea
+        сопоставляет с именем владельца, вместо запроса на каждого пользователя.
+        
+        Args:
+            from_user: Начальный номер пользователя
+            to_user: Конечный номер пользователя
+            
+        Returns:
+            Кортеж (успех, словарь {номер пользователя: список репозиториев} или сообщение об ошибке).
+            Репозиторий описывается словарем с ключами name, size (КБ), updated (время изменения)
+            и branch (ветка по умолчанию)
+        """
+        owners = {f"{self.prefix}{user_num}".lower(): user_num for user_num in range(from_user, to_user + 1)}
+        
+        try:
+            api_url = f"{self._server_url()}/api/v1/repos/search"
+            success, repos_or_error = self._get_all_pages(api_url, {"q": f"{self.prefix}/"}, items_key="data")
+            if not success:
+                return False, f"Ошибка поиска репозиториев: {repos_or_error}"
+        except requests.RequestException as e:
+            return False, f"Ошибка запроса: {str(e)}"
+        
+        repositories = {user_num: [] for user_num in owners.values()}
+        for repo in repos_or_error:
+            user_num = owners.get(repo['owner']['login'].lower())
+            if user_num is not None:
+                repositories[user_num].append({
+                    "name": repo['name'],
+                    "size": repo.get('size'),
+                    "updated": repo.get('updated_at'),
+                    "branch": repo.get('default_branch')
+                })
+        
+        for repos in repositories.values():
+            repos.sort(key=lambda repo: repo["name"])
+        return True, repositories
+    
+    def search_database_repositories(self, from_user: int, to_user: int, db_cleaner) -> Tuple[bool, Any]:
+        """
+        Получает репозитории всех пользователей диапазона одним запросом к базе данных Gitea
+        
+        Args:
+            from_user: Начальный номер пользователя
+            to_user: Конечный номер пользователя
+            db_cleaner: Подключенный GiteaDBCleaner
+            
+        Returns:
+            Кортеж (успех, словарь {номер пользователя: список репозиториев} или сообщение об ошибке)
+        """
+        owners = {f"{self.prefix}{user_num}".lower(): user_num for user_num in range(from_user, to_user + 1)}
+        
+        success, message, rows = db_cleaner.get_repositories_by_owners(owners)
+        if not success:
+            return False, message
+        
+        repositories = {user_num: [] for user_num in owners.values()}
+        for row in rows:
+            user_num = owners.get(row['owner'].lower())
+            if user_num is not None:
+                repositories[user_num].append({
+                    "name": row['name'],
+                    "size": row['size'],
+                    "updated": row['updated_unix'],
+                    "branch": row['default_branch']
+                })
+        return True, repositories
+    
+    def discover_repositories(self, from_user: int, to_user: int, discovery: str = "search",
+                              db_cleaner=None) -> Dict[int, Tuple[bool, Any]]:
+        """
+        Собирает списки репозиториев для диапазона пользователей
+        
+        Args:
+            from_user: Начальный номер пользователя
+            to_user: Конечный номер пользователя
+            discovery: "search" - один постраничный поиск по префиксу (если он не удался или
+                ничего не нашел - по пользователям), "users" - отдельный запрос для каждого
+                пользователя, "database" - один запрос к базе данных Gitea через db_cleaner
+            db_cleaner: Подключенный GiteaDBCleaner для discovery="database"
+            
+        Returns:
+            Словарь {номер пользователя: (успех, список репозиториев или сообщение об ошибке)},
+            репозиторий описывается словарем с ключами name, size, updated и branch
+        """
+        if discovery == "database":
+            success, repositories_or_error = self.search_database_repositories(from_user, to_user, db_cleaner)
+            if not success:
+                return {user_num: (False, repositories_or_error) for user_num in range(from_user, to_user + 1)}
+            return {user_num: (True, repos) for user_num, repos in repositories_or_error.items()}
+        
+        if discovery == "search":
+            success, repositories = self.search_cabinet_repositories(from_user, to_user)
+            # Пустой результат может означать, что версия Gitea не ищет по владельцу
+            if success and any(repositories.values()):
+                return {user_num: (True, repos) for user_num, repos in repositories.items()}
+        
+        discovered = {}
+        for user_num in range(from_user, to_user + 1):
+            success, repos_or_error = self.get_user_repositories(user_num)
+            if success:
+                repos_or_error = [{"name": name, "size": None, "updated": None, "branch": None} for name in repos_or_error]
+            discovered[user_num] = (success, repos_or_error)
+        return discovered
+    
+    def _server_url(self) -> str:
+        """Возвращает адрес сервера Gitea без префикса пользователей"""
+        if f'/{self.prefix}' in self.base_url:
+            return self.base_url.split(f'/{self.prefix}')[0]
+        return self.base_url
+    
+    def clone_repository(self, user_number: int, repo_name: str, target_path: str,
+                         mode: str = "full", single_branch: bool = False,
+                         sparse_paths: List[str] = None, update: bool = False,
+                         reference: str = None, dissociate: bool = False,
+                         branch: str = None) -> Tuple[bool, str]:
         """
         Клонирует конкретный репозиторий пользователя
         
@@ -77,10 +336,24 @@ class GitManager:
             user_number: Номер пользователя
             repo_name: Имя репозитория
             target_path: Путь для клонирования
+            mode: Режим клонирования из CLONE_MODES: "full" - вся история,
+                "shallow" - только последний коммит, "partial" - история без содержимого
+                файлов, которые загружаются при checkout; SNAPSHOT_MODE - только рабочая копия
+                из архива ветки (см. download_snapshot)
+            single_branch: Загружать только ветку по умолчанию
+            sparse_paths: Каталоги, которые нужно извлечь в рабочую копию (sparse checkout)
+            update: Если каталог уже существует - обновить его (см. _update_repository)
+            reference: Локальное хранилище объектов шаблона (см. prepare_reference_cache):
+                общие с шаблоном объекты берутся из него, а не загружаются с сервера
+            dissociate: Скопировать объекты из reference в клон, чтобы клон не зависел от хранилища
+            branch: Ветка для SNAPSHOT_MODE (по умолчанию ветка по умолчанию репозитория)
             
         Returns:
             Кортеж (успех, результат/ошибка)
         """
+        if mode == SNAPSHOT_MODE:
+            return self.download_snapshot(user_number, repo_name, target_path, branch, update, sparse_paths)
+        
         user_name = f"{self.prefix}{user_number}"
         
         try:
@@ -91,7 +364,20 @@ class GitManager:
             else:
                 repo_url = f"{base}/{user_name}/{repo_name}"
             
-            Repo.clone_from(repo_url, target_path)
+            clone_args = dict(CLONE_MODES[mode])
+            if single_branch:
+                clone_args["single_branch"] = True
+            if sparse_paths:
+                clone_args["sparse"] = True
+            if reference:
+                clone_args["reference"] = reference
+                if dissociate:
+                    clone_args["dissociate"] = True
+            
+            if update and os.path.exists(target_path):
+                return self._update_repository(repo_name, repo_url, target_path, clone_args, sparse_paths)
+            
+            self._clone(repo_url, target_path, clone_args, sparse_paths)
             return True, f"Успешно клонирован репозиторий {repo_name}"
         except GitCommandError as e:
             error_str = str(e)
@@ -106,31 +392,238 @@ class GitManager:
         except Exception as e:
             return False, str(e)
     
+    def download_snapshot(self, user_number: int, repo_name: str, target_path: str, branch: str = None,
+                          update: bool = False, sparse_paths: List[str] = None) -> Tuple[bool, str]:
+        """
+        Собирает рабочую копию репозитория из архива ветки без истории
+        
+        Архив /{owner}/{repo}/archive/{branch}.tar.gz читается потоком через общую HTTP-сессию
+        и распаковывается по мере загрузки, не накапливаясь в памяти. Файлы извлекаются во
+        временный каталог, который затем становится target_path.
+        
+        Args:
+            user_number: Номер пользователя
+            repo_name: Имя репозитория
+            target_path: Каталог рабочей копии
+            branch: Ветка (по умолчанию ветка по умолчанию репозитория из API Gitea)
+            update: Если каталог уже существует - заменить его свежим снимком
+            sparse_paths: Извлечь только эти каталоги
+            
+        Returns:
+            Кортеж (успех, результат/ошибка)
+        """
+        user_name = f"{self.prefix}{user_number}"
+        
+        if os.path.exists(target_path) and not update:
+            return False, f"Репозиторий {repo_name} уже существует на вашем ПК в директории {target_path}"
+        
+        suffix = uuid.uuid4().hex[:8]
+        temp_path = f"{target_path}.tmp-{suffix}"
+        
+        try:
+            if not branch:
+                response = self.session.get(
+                    f"{self._server_url()}/api/v1/repos/{user_name}/{repo_name}", timeout=ARCHIVE_TIMEOUT
+                )
+                if response.status_code != 200:
+                    return False, f"Ошибка API: {response.status_code} - {response.text}"
+                branch = response.json().get('default_branch') or "master"
+            
+            archive_url = f"{self._server_url()}/{user_name}/{repo_name}/archive/{branch}.tar.gz"
+            with self.session.get(archive_url, stream=True, timeout=ARCHIVE_TIMEOUT) as response:
+                if response.status_code != 200:
+                    return False, f"Ошибка загрузки архива: {response.status_code} - {response.reason}"
+                response.raw.decode_content = True
+                files = extract_archive(response.raw, temp_path, sparse_paths)
+            
+            if os.path.exists(target_path):
+                old_path = f"{target_path}.old-{suffix}"
+                os.rename(target_path, old_path)
+                os.rename(temp_path, target_path)
+                remove_tree(old_path)
+            else:
+                os.rename(temp_path, target_path)
+            
+            return True, f"Загружен снимок ветки {branch} репозитория {repo_name} ({files} файлов)"
+        except requests.RequestException as e:
+            return False, f"Ошибка запроса: {str(e)}"
+        except (tarfile.TarError, ValueError) as e:
+            return False, f"Ошибка распаковки архива: {str(e)}"
+        except Exception as e:
+            return False, str(e)
+        finally:
+            remove_tree(temp_path)
+    
+    def _clone(self, repo_url: str, target_path: str, clone_args: Dict[str, Any],
+               sparse_paths: List[str] = None) -> Repo:
+        """Клонирует репозиторий с аргументами git clone и настраивает sparse checkout"""
+        repo = Repo.clone_from(repo_url, target_path, **clone_args)
+        
+        if sparse_paths:
+            repo.git.sparse_checkout("set", *sparse_paths)
+        return repo
+    
+    def _update_repository(self, repo_name: str, repo_url: str, target_path: str,
+                           clone_args: Dict[str, Any], sparse_paths: List[str] = None) -> Tuple[bool, str]:
+        """
+        Обновляет уже собранный репозиторий
+        
+        Если каталог - клон того же репозитория, загружаются только новые объекты и рабочая
+        копия сбрасывается на состояние удаленной ветки. Иначе репозиторий клонируется во
+        временный каталог, который затем подменяет существующий.
+        
+        Returns:
+            Кортеж (успех, результат/ошибка)
+        """
+        existing = self._open_clone_of(target_path, repo_url)
+        
+        if existing is not None:
+            fetch_args = {"depth": clone_args["depth"]} if "depth" in clone_args else {}
+            existing.git.fetch("origin", prune=True, **fetch_args)
+            existing.git.reset("--hard", self._remote_head(existing))
+            existing.git.clean("-ffd")
+            if sparse_paths:
+                existing.git.sparse_checkout("set", *sparse_paths)
+            return True, f"Обновлен репозиторий {repo_name}"
+        
+        suffix = uuid.uuid4().hex[:8]
+        temp_path = f"{target_path}.tmp-{suffix}"
+        old_path = f"{target_path}.old-{suffix}"
+        
+        try:
+            self._clone(repo_url, temp_path, clone_args, sparse_paths)
+        except Exception:
+            remove_tree(temp_path)
+            raise
+        
+        os.rename(target_path, old_path)
+        os.rename(temp_path, target_path)
+        remove_tree(old_path)
+        return True, f"Каталог {target_path} заменен свежей копией репозитория {repo_name}"
+    
+    @staticmethod
+    def _open_clone_of(path: str, repo_url: str):
+        """Возвращает Repo, если каталог - клон репозитория repo_url, иначе None"""
+        try:
+            repo = Repo(path)
+            origin_url = repo.remotes.origin.url
+        except (InvalidGitRepositoryError, NoSuchPathError, AttributeError, ValueError):
+            return None
+        
+        def normalize(url):
+            url = url.rstrip("/")
+            return url[:-4] if url.endswith(".git") else url
+        
+        return repo if normalize(origin_url) == normalize(repo_url) else None
+    
+    @staticmethod
+    def _remote_head(repo: Repo) -> str:
+        """Возвращает ветку origin, на которую нужно сбросить рабочую копию"""
+        try:
+            tracking = repo.active_branch.tracking_branch()
+        except TypeError:
+            # Отсоединенный HEAD
+            tracking = None
+        
+        if tracking is not None:
+            return tracking.name
+        
+        repo.git.remote("set-head", "origin", "--auto")
+        return "origin/HEAD"
+    
+    def prepare_reference_cache(self, templates: List[str], cache_root: str) -> Tuple[Dict[str, str], List[str]]:
+        """
+        Готовит локальные хранилища объектов шаблонов для клонирования с --reference
+        
+        Для каждого шаблона поддерживается bare-зеркало в cache_root: при первом вызове оно
+        клонируется, при следующих - только дополняется новыми объектами. Репозитории студентов,
+        созданные из шаблона, берут общую историю из зеркала и загружают с сервера только свои коммиты.
+        
+        Args:
+            templates: Шаблоны "владелец/репозиторий" на сервере Gitea
+            cache_root: Каталог хранилищ
+            
+        Returns:
+            Кортеж (словарь имя репозитория -> путь к хранилищу, список ошибок)
+        """
+        references = {}
+        errors = []
+        
+        for template in templates:
+            owner, _, name = template.strip().strip("/").rpartition("/")
+            if not owner or not name:
+                errors.append(f"Некорректный шаблон {template}: ожидается \"владелец/репозиторий\"")
+                continue
+            
+            template_url = f"{self._server_url()}/{owner}/{name}"
+            cache_path = os.path.abspath(os.path.join(cache_root, owner.lower(), f"{name.lower()}.git"))
+            
+            try:
+                mirror = self._open_clone_of(cache_path, template_url)
+                if mirror is not None:
+                    mirror.git.fetch("origin", prune=True)
+                else:
+                    remove_tree(cache_path)
+                    Repo.clone_from(template_url, cache_path, mirror=True)
+                references[name.lower()] = cache_path
+            except Exception as e:
+                errors.append(f"Шаблон {owner}/{name}: {str(e)}")
+        
+        return references, errors
+    
     def batch_clone_user_repositories(self, from_user: int, to_user: int, base_path: str, 
-                                     progress_callback=None) -> List[Dict[str, Any]]:
+                                     progress_callback=None, max_workers: int = 1,
+                                     per_host_limit: int = None,
+                                     discovery: str = "search", db_cleaner=None,
+                                     skip_unchanged: bool = False,
+                                     clone_options: Dict[str, Any] = None,
+                                     references: Dict[str, str] = None) -> List[Dict[str, Any]]:
         """
         Клонирует все репозитории для диапазона пользователей
         
+        Сначала собирается список репозиториев всех пользователей (см. discover_repositories),
+        затем репозитории клонируются пулом из max_workers потоков, начиная с самых больших.
+        Прогресс сообщается по мере завершения каждого клонирования.
+        
+        С skip_unchanged репозитории, которые не менялись с прошлого сбора, пропускаются:
+        время изменения каждого собранного репозитория и параметры клонирования запоминаются
+        в файле MANIFEST_FILE в base_path. Если параметры изменились (например, вместо снимка
+        нужен полный клон), репозиторий собирается заново.
+        
         Args:
             from_user: Начальный номер пользователя
             to_user: Конечный номер пользователя
             base_path: Базовый путь для сохранения репозиториев
             progress_callback: Функция обратного вызова для отчета о прогрессе
+            max_workers: Количество одновременных клонирований
+            per_host_limit: Максимум одновременных клонирований с одного сервера (None - max_workers)
+            discovery: Способ получения списков репозиториев ("search", "users" или "database")
+            db_cleaner: Подключенный GiteaDBCleaner для discovery="database"
+            skip_unchanged: Пропускать репозитории, не изменившиеся с прошлого сбора
+            clone_options: Аргументы clone_repository: mode, single_branch, sparse_paths, update, dissociate
+            references: Хранилища объектов шаблонов по имени репозитория (см. prepare_reference_cache)
             
         Returns:
             Список результатов клонирования
         """
         results = []
         total_users = to_user - from_user + 1
+        if per_host_limit is None:
+            per_host_limit = max_workers
         processed = 0
         total_repos = 0
         cloned_repos = 0
         
+        remaining = {}
+        work = []
+        
+        discovered = self.discover_repositories(from_user, to_user, discovery, db_cleaner)
+        manifest = self._load_manifest(base_path)
+        
         for user_num in range(from_user, to_user + 1):
-            user_name = f"{self.prefix}{user_num}"
             computer_folder = f"Компьютер {user_num}"
             
-            success, repos_or_error = self.get_user_repositories(user_num)
+            success, repos_or_error = discovered[user_num]
             
             if not success:
                 results.append({
@@ -144,45 +637,134 @@ class GitManager:
                 if progress_callback:
                     progress_callback(processed, total_users, cloned_repos, total_repos)
                 continue
-            else:
-                repos = repos_or_error
-                total_repos += len(repos)
-
-                # Создаем папку только если у пользователя есть репозитории
-                if repos:
-                    user_folder = os.path.join(base_path, computer_folder)
-                    if not os.path.exists(user_folder):
-                        try:
-                            os.makedirs(user_folder)
-                        except Exception as e:
-                            results.append({
-                                "user_number": user_num,
-                                "repo_name": None,
-                                "success": False,
-                                "message": f"Ошибка создания директории: {str(e)}"
-                            })
-                            processed += 1
-                            if progress_callback:
-                                progress_callback(processed, total_users, cloned_repos, total_repos)
-                            continue
-
-                    for repo_name in repos:
-                        repo_path = os.path.join(user_folder, repo_name)
-                        
-                        success, message = self.clone_repository(user_num, repo_name, repo_path)
-                        
-                        results.append({
-                            "user_number": user_num,
-                            "repo_name": repo_name,
-                            "success": success,
-                            "message": message
-                        })
-                        
-                        if success:
-                            cloned_repos += 1
-            
-            processed += 1
+            
+            repos = repos_or_error
+            total_repos += len(repos)
+            
+            # Создаем папку только если у пользователя есть репозитории
+            if not repos:
+                processed += 1
+                if progress_callback:
+                    progress_callback(processed, total_users, cloned_repos, total_repos)
+                continue
+            
+            user_folder = os.path.join(base_path, computer_folder)
+            if not os.path.exists(user_folder):
+                try:
+                    os.makedirs(user_folder)
+                except Exception as e:
+                    results.append({
+                        "user_number": user_num,
+                        "repo_name": None,
+                        "success": False,
+                        "message": f"Ошибка создания директории: {str(e)}"
+                    })
+                    processed += 1
+                    if progress_callback:
+                        progress_callback(processed, total_users, cloned_repos, total_repos)
+                    continue
+            
+            remaining[user_num] = len(repos)
+            work.extend((user_num, repo, os.path.join(user_folder, repo["name"])) for repo in repos)
+        
+        # Большие репозитории запускаются первыми, чтобы не остаться последними в очереди
+        work.sort(key=lambda item: item[1]["size"] or 0, reverse=True)
+        
+        def finish(result, manifest_key, manifest_entry):
+            nonlocal processed, cloned_repos
+            results.append(result)
+            
+            if result["success"]:
+                cloned_repos += 1
+                if manifest_entry is not None:
+                    manifest[manifest_key] = manifest_entry
+            
+            remaining[result["user_number"]] -= 1
+            if not remaining[result["user_number"]]:
+                processed += 1
+            
             if progress_callback:
                 progress_callback(processed, total_users, cloned_repos, total_repos)
         
-        return results
\ No newline at end of file
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = {}
+            
+            for user_num, repo, repo_path in work:
+                repo_options = dict(clone_options or {})
+                if references and repo["name"].lower() in references:
+                    repo_options["reference"] = references[repo["name"].lower()]
+                if repo_options.get("mode") == SNAPSHOT_MODE and repo.get("branch"):
+                    repo_options["branch"] = repo["branch"]
+                
+                manifest_key = f"Компьютер {user_num}/{repo['name']}"
+                manifest_entry = None
+                if repo["updated"] is not None:
+                    manifest_entry = {
+                        "updated": repo["updated"],
+                        "options": {key: value for key, value in repo_options.items() if key != "update"}
+                    }
+                
+                if (skip_unchanged and manifest_entry is not None and os.path.isdir(repo_path)
+                        and manifest.get(manifest_key) == manifest_entry):
+                    finish({
+                        "user_number": user_num,
+                        "repo_name": repo["name"],
+                        "success": True,
+                        "message": "Без изменений с прошлого сбора"
+                    }, manifest_key, manifest_entry)
+                    continue
+                
+                future = executor.submit(
+                    self._clone_with_host_limit, per_host_limit, user_num, repo["name"], repo_path,
+                    repo_options
+                )
+                futures[future] = (manifest_key, manifest_entry)
+            
+            for future in as_completed(futures):
+                finish(future.result(), *futures[future])
+        
+        self._save_manifest(base_path, manifest)
+        
+        results.sort(key=lambda result: (result["user_number"], result["repo_name"] or ""))
+        return results
+    
+    @staticmethod
+    def _load_manifest(base_path: str) -> Dict[str, Any]:
+        """Читает время изменения репозиториев на момент прошлого сбора"""
+        try:
+            with open(os.path.join(base_path, MANIFEST_FILE), "r", encoding="utf-8") as manifest_file:
+                return json.load(manifest_file)
+        except (OSError, ValueError):
+            return {}
+    
+    @staticmethod
+    def _save_manifest(base_path: str, manifest: Dict[str, Any]):
+        """Сохраняет время изменения собранных репозиториев"""
+        manifest_path = os.path.join(base_path, MANIFEST_FILE)
+        try:
+            with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as manifest_file:
+                json.dump(manifest, manifest_file, ensure_ascii=False, indent=2)
+            os.replace(f"{manifest_path}.tmp", manifest_path)
+        except OSError:
+            pass
+    
+    def _clone_with_host_limit(self, per_host_limit: int, user_num: int, repo_name: str,
+                               repo_path: str, clone_options: Dict[str, Any]) -> Dict[str, Any]:
+        """Клонирует репозиторий, ограничивая число одновременных клонирований с одного сервера"""
+        host = urlparse(self.base_url).netloc
+        
+        with self._host_semaphores_lock:
+            key = (host, per_host_limit)
+            if key not in self._host_semaphores:
+                self._host_semaphores[key] = threading.BoundedSemaphore(max(1, per_host_limit))
+            semaphore = self._host_semaphores[key]
+        
+        with semaphore:
+            success, message = self.clone_repository(user_num, repo_name, repo_path, **clone_options)
+        
+        return {
+            "user_number": user_num,
+            "repo_name": repo_name,
+            "success": success,
+            "message": message
+        }
@@ -0,0 +1,179 @@
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Iterable, Optional
+from .http_session import get_session
+
+
+class GiteaProvisioner:
+    """Класс для массового создания пользователей кабинета и их репозиториев через API Gitea"""
+    
+    def __init__(self, base_url: str, token: str, max_workers: int = 8,
+                 session: Optional[requests.Session] = None, timeout: int = 10):
+        """
+        Инициализация
+        
+        Args:
+            base_url: Адрес сервера Gitea (например, http://localhost:3000)
+            token: Токен администратора Gitea
+            max_workers: Количество одновременно обрабатываемых пользователей
+            session: HTTP-сессия (по умолчанию общая сессия приложения)
+            timeout: Таймаут запроса в секундах
+        """
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"token {token}"}
+        self.max_workers = max(1, max_workers)
+        self.session = session or get_session()
+        self.timeout = timeout
+    
+    def provision_users(self, prefix: str, from_user: int, to_user: int, password: str,
+                        repositories: Iterable[str] = (), reset_passwords: bool = False,
+                        email_domain: str = "gitea.local", progress_callback=None) -> List[Dict[str, Any]]:
+        """
+        Создает недостающих пользователей диапазона и их репозитории
+        
+        Повторный запуск безопасен: существующие пользователи и репозитории не пересоздаются.
+        
+        Args:
+            prefix: Префикс имени пользователя (например, "224-user-")
+            from_user: Начальный номер пользователя
+            to_user: Конечный номер пользователя
+            password: Пароль новых пользователей
+            repositories: Репозитории каждого пользователя: имя ("lab1") для пустого репозитория
+                или "владелец/шаблон" для репозитория из шаблона Gitea
+            reset_passwords: Сбрасывать пароль уже существующим пользователям
+            email_domain: Домен адресов почты новых пользователей
+            progress_callback: Функция progress_callback(processed, total, result) после каждого пользователя
+        
+        Returns:
+            Список результатов по пользователям
+        """
+        repositories = list(repositories)
+        user_names = [f"{prefix}{number}" for number in range(from_user, to_user + 1)]
+        results = []
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(
+                    self.provision_user, user_name, password, repositories, reset_passwords, email_domain
+                )
+                for user_name in user_names
+            ]
+            
+            for future in as_completed(futures):
+                results.append(future.result())
+                if progress_callback:
+                    progress_callback(len(results), len(user_names), results[-1])
+        
+        return results
+    
+    def provision_user(self, user_name: str, password: str, repositories: Iterable[str] = (),
+                       reset_passwords: bool = False, email_domain: str = "gitea.local") -> Dict[str, Any]:
+        """
+        Приводит пользователя и его репозитории к нужному состоянию
+        
+        Returns:
+            Результат: user, success, message, created_user, created_repos
+        """
+        result = {
+            "user": user_name,
+            "success": False,
+            "message": "",
+            "created_user": False,
+            "created_repos": []
+        }
+        
+        try:
+            response = self._request("GET", f"/api/v1/users/{user_name}")
+            
+            if response.status_code == 404:
+                self._check(self._request("POST", "/api/v1/admin/users", json={
+                    "username": user_name,
+                    "email": f"{user_name}@{email_domain}",
+                    "password": password,
+                    "must_change_password": False
+                }), f"создание пользователя {user_name}")
+                result["created_user"] = True
+            else:
+                self._check(response, f"получение пользователя {user_name}")
+                if reset_passwords:
+                    self._check(self._request("PATCH", f"/api/v1/admin/users/{user_name}", json={
+                        "login_name": user_name,
+                        "source_id": 0,
+                        "password": password,
+                        "must_change_password": False
+                    }), f"сброс пароля {user_name}")
+            
+            for repository in repositories:
+                if self._ensure_repository(user_name, repository):
+                    result["created_repos"].append(repository.split("/")[-1])
+            
+            result["success"] = True
+            result["message"] = self._describe(result, reset_passwords)
+        except requests.RequestException as e:
+            result["message"] = f"Ошибка запроса: {str(e)}"
+        except Exception as e:
+            result["message"] = str(e)
+        
+        return result
+    
+    def _ensure_repository(self, user_name: str, repository: str) -> bool:
+        """
+        Создает репозиторий пользователя, если его еще нет
+        
+        Returns:
+            True, если репозиторий был создан
+        """
+        template_owner, _, name = repository.rpartition("/")
+        
+        response = self._request("GET", f"/api/v1/repos/{user_name}/{name}")
+        if response.status_code != 404:
+            self._check(response, f"получение репозитория {user_name}/{name}")
+            return False
+        
+        if template_owner:
+            response = self._request("POST", f"/api/v1/repos/{template_owner}/{name}/generate", json={
+                "owner": user_name,
+                "name": name,
+                "git_content": True,
+                "private": False
+            })
+        else:
+            response = self._request("POST", f"/api/v1/admin/users/{user_name}/repos", json={
+                "name": name,
+                "auto_init": True,
+                "private": False
+            })
+        
+        self._check(response, f"создание репозитория {user_name}/{name}")
+        return True
+    
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Выполняет запрос к API Gitea через общую сессию"""
+        return self.session.request(
+            method, f"{self.base_url}{path}", headers=self.headers, timeout=self.timeout, **kwargs
+        )
+    
+    @staticmethod
+    def _check(response: requests.Response, action: str):
+        """Проверяет ответ API и выбрасывает исключение с описанием ошибки"""
+        if response.status_code >= 400:
+            try:
+                details = response.json().get("message", response.reason)
+            except ValueError:
+                details = response.reason
+            raise RuntimeError(f"Ошибка API ({action}): {response.status_code} - {details}")
+    
+    @staticmethod
+    def _describe(result: Dict[str, Any], reset_passwords: bool) -> str:
+        """Формирует сообщение о выполненных изменениях"""
+        parts = []
+        if result["created_user"]:
+            parts.append("пользователь создан")
+        elif reset_passwords:
+            parts.append("пароль сброшен")
+        if result["created_repos"]:
+            parts.append(f"созданы репозитории: {', '.join(result['created_repos'])}")
+        if not parts:
+            return "Без изменений"
+        message = ", ".join(parts)
+        return message[0].upper() + message[1:]
@@ -0,0 +1,141 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Tuple, Dict, Any
+from .fs_utils import remove_tree
+
+
+class GiteaRepositoryStorage:
+    """Класс для удаления каталогов репозиториев Gitea на диске"""
+    
+    def __init__(self, root: str, max_workers: int = 4):
+        """
+        Инициализация хранилища репозиториев
+        
+        Args:
+            root: Корневой каталог репозиториев Gitea (ROOT в секции [repository] app.ini)
+            max_workers: Количество параллельных потоков
+        """
+        self.root = os.path.abspath(root)
+        self.max_workers = max(1, max_workers)
+    
+    def repository_paths(self, owner: str, name: str) -> List[str]:
+        """
+        Возвращает каталоги репозитория на диске: сам репозиторий и его wiki
+        
+        Gitea хранит репозитории как <root>/<owner>/<name>.git в нижнем регистре.
+        
+        Args:
+            owner: Имя владельца
+            name: Имя репозитория
+        
+        Returns:
+            Список путей
+        """
+        owner_path = os.path.join(self.root, owner.lower())
+        paths = [
+            os.path.join(owner_path, f"{name.lower()}.git"),
+            os.path.join(owner_path, f"{name.lower()}.wiki.git")
+        ]
+        
+        for path in paths:
+            if os.path.commonpath([self.root, os.path.abspath(path)]) != self.root:
+                raise ValueError(f"Путь репозитория {owner}/{name} выходит за пределы {self.root}")
+        return paths
+    
+    def measure(self, repositories: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Оценивает объем каталогов репозиториев без удаления (пробный запуск)
+        
+        Args:
+            repositories: Пары (owner, name)
+        
+        Returns:
+            Отчет: found, missing, bytes, files, errors
+        """
+        return self._run(repositories, self._measure_repository)
+    
+    def remove(self, repositories: Iterable[Tuple[str, str]], dry_run: bool = False,
+               progress_callback=None) -> Dict[str, Any]:
+        """
+        Удаляет каталоги репозиториев параллельно
+        
+        Args:
+            repositories: Пары (owner, name)
+            dry_run: Только посчитать освобождаемый объем, ничего не удаляя
+            progress_callback: Функция progress_callback(processed, total, result) после каждого репозитория
+        
+        Returns:
+            Отчет: found, missing, bytes, files, errors
+        """
+        worker = self._measure_repository if dry_run else self._remove_repository
+        return self._run(repositories, worker, progress_callback)
+    
+    def _run(self, repositories, worker, progress_callback=None) -> Dict[str, Any]:
+        """Выполняет worker для каждого репозитория в пуле потоков и собирает отчет"""
+        repositories = list(repositories)
+        report = {"found": [], "missing": [], "bytes": 0, "files": 0, "errors": []}
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for processed, result in enumerate(executor.map(lambda repo: worker(*repo), repositories), 1):
+                name = f"{result['owner']}/{result['name']}"
+                if result["error"]:
+                    report["errors"].append(f"{name}: {result['error']}")
+                elif result["exists"]:
+                    report["found"].append(name)
+                else:
+                    report["missing"].append(name)
+                report["bytes"] += result["bytes"]
+                report["files"] += result["files"]
+                
+                if progress_callback:
+                    progress_callback(processed, len(repositories), result)
+        
+        return report
+    
+    def _measure_repository(self, owner: str, name: str) -> Dict[str, Any]:
+        """Считает размер и количество файлов каталогов репозитория"""
+        result = {"owner": owner, "name": name, "exists": False, "bytes": 0, "files": 0, "error": None}
+        
+        try:
+            for path in self.repository_paths(owner, name):
+                if not os.path.isdir(path):
+                    continue
+                result["exists"] = True
+                size, files = self._directory_size(path)
+                result["bytes"] += size
+                result["files"] += files
+        except Exception as e:
+            result["error"] = str(e)
+        
+        return result
+    
+    def _remove_repository(self, owner: str, name: str) -> Dict[str, Any]:
+        """Удаляет каталоги репозитория, предварительно посчитав их размер"""
+        result = self._measure_repository(owner, name)
+        if result["error"] or not result["exists"]:
+            return result
+        
+        try:
+            for path in self.repository_paths(owner, name):
+                if os.path.isdir(path):
+                    remove_tree(path)
+        except Exception as e:
+            result["error"] = str(e)
+        
+        return result
+    
+    @staticmethod
+    def _directory_size(path: str) -> Tuple[int, int]:
+        """Возвращает (размер в байтах, количество файлов) каталога"""
+        total_size = 0
+        total_files = 0
+        
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total_size += os.lstat(os.path.join(dirpath, filename)).st_size
+                    total_files += 1
+                except OSError:
+                    pass
+        
+        return total_size, total_files
@@ -0,0 +1,41 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int = 16, retries: int = 2) -> requests.Session:
+    """
+    Создает HTTP-сессию с пулом keep-alive соединений
+    
+    Args:
+        pool_size: Максимальное количество соединений с одним хостом
+        retries: Количество повторов идемпотентных запросов при обрыве соединения и ответах 502/503/504
+        
+    Returns:
+        Сессия requests
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504)
+    )
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Возвращает общую для приложения HTTP-сессию для запросов к Gitea"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session()
+        return _session
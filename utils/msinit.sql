@@ -1,6 +1,7 @@
 DECLARE @counter INT = 1;
 DECLARE @dbname NVARCHAR(50);
 DECLARE @sql NVARCHAR(MAX);
+DECLARE @sep NCHAR(1);
 
 WHILE @counter <= 20
 BEGIN
@@ -58,6 +59,25 @@ BEGIN
     );';
     
     EXEC sp_executesql @sql;
-    
+
+    -- Снимок базы для быстрого сброса (RESTORE DATABASE ... FROM DATABASE_SNAPSHOT)
+    SELECT @sep = CASE WHEN CHARINDEX('\', physical_name) > 0 THEN '\' ELSE '/' END
+    FROM sys.master_files
+    WHERE database_id = DB_ID(@dbname) AND type = 0;
+
+    -- По одной записи (NAME, FILENAME) на каждый файл данных базы
+    SET @sql = 'CREATE DATABASE [' + @dbname + '_snapshot] ON '
+        + STUFF((
+            SELECT ', (NAME = [' + name + '], FILENAME = '''
+                + LEFT(physical_name, LEN(physical_name) - CHARINDEX(@sep, REVERSE(physical_name)) + 1)
+                + @dbname + '_snapshot_' + name + '.ss'')'
+            FROM sys.master_files
+            WHERE database_id = DB_ID(@dbname) AND type = 0
+            FOR XML PATH(''), TYPE
+        ).value('.', 'NVARCHAR(MAX)'), 1, 2, '')
+        + ' AS SNAPSHOT OF [' + @dbname + ']';
+
+    EXEC sp_executesql @sql;
+
     SET @counter = @counter + 1;
 END
\ No newline at end of file
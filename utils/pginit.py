@@ -50,6 +50,41 @@ CREATE TABLE OrderDetails (
 );
 """
 
+TEMPLATE_DB = os.getenv("PG_TEMPLATE_DB", "user224-template")
+
+
+def ensure_schema(db_name):
+    """
+    Создает таблицы лабораторной в базе, если их там еще нет
+    
+    Нужна для баз, оставшихся от прерванного запуска: они уже существуют,
+    но могут быть пустыми.
+    
+    Returns:
+        bool: True, если схема была создана сейчас
+    """
+    db_conn = psycopg2.connect(
+        host=PG_HOST,
+        port=PG_PORT,
+        user=PG_USER,
+        password=PG_PASSWORD,
+        dbname=db_name
+    )
+    db_conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    try:
+        db_cursor = db_conn.cursor()
+        db_cursor.execute("SELECT to_regclass('public.users')")
+        if db_cursor.fetchone()[0] is not None:
+            db_cursor.close()
+            return False
+        
+        db_cursor.execute(create_tables_sql)
+        db_cursor.close()
+        return True
+    finally:
+        db_conn.close()
+
+
 try:
     conn = psycopg2.connect(
         host=PG_HOST,
@@ -62,15 +97,33 @@ try:
     
     cursor = conn.cursor()
     
-    print("Создание баз данных...")
+    print("Создание эталонной базы данных...")
+    cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", [TEMPLATE_DB])
+    if cursor.fetchone():
+        print(f"Эталонная база данных {TEMPLATE_DB} уже существует, пропускаем создание")
+        if ensure_schema(TEMPLATE_DB):
+            print(f"В эталонную базу данных {TEMPLATE_DB} добавлены таблицы")
+    else:
+        cursor.execute(f'CREATE DATABASE "{TEMPLATE_DB}"')
+        ensure_schema(TEMPLATE_DB)
+        
+        # Шаблон не показывается в списке баз и защищен от случайного удаления
+        cursor.execute(f'ALTER DATABASE "{TEMPLATE_DB}" IS_TEMPLATE true')
+        print(f"Эталонная база данных {TEMPLATE_DB} успешно создана")
+    
+    print("\nСоздание баз данных из эталона...")
     for i in range(1, 21):
         db_name = f"user224-{i}"
         try:
             cursor.execute(f"SELECT 1 FROM pg_database WHERE datname = '{db_name}'")
             if cursor.fetchone():
                 print(f"База данных {db_name} уже существует, пропускаем создание")
+                # База могла остаться пустой после прерванного запуска
+                if ensure_schema(db_name):
+                    print(f"В базу данных {db_name} добавлены таблицы")
             else:
-                cursor.execute(f'CREATE DATABASE "{db_name}"')
+                # Копия эталона на уровне файлов, DDL повторно не выполняется
+                cursor.execute(f'CREATE DATABASE "{db_name}" TEMPLATE "{TEMPLATE_DB}"')
                 print(f"База данных {db_name} успешно создана")
         except Exception as e:
             print(f"Ошибка при создании базы данных {db_name}: {e}")
@@ -78,30 +131,6 @@ try:
     cursor.close()
     conn.close()
     
-    print("\nСоздание таблиц в каждой базе данных...")
-    for i in range(1, 21):
-        db_name = f"user224-{i}"
-        try:
-            conn = psycopg2.connect(
-                host=PG_HOST,
-                port=PG_PORT,
-                user=PG_USER,
-                password=PG_PASSWORD,
-                dbname=db_name
-            )
-            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-            
-            cursor = conn.cursor()
-            
-            cursor.execute(create_tables_sql)
-            
-            print(f"Таблицы в базе данных {db_name} успешно созданы")
-            
-            cursor.close()
-            conn.close()
-        except Exception as e:
-            print(f"Ошибка при создании таблиц в базе данных {db_name}: {e}")
-    
     print("\nПроцесс завершен успешно!")
     
 except Exception as e: